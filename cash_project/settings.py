@@ -46,11 +46,13 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "cashbox_app",
     "rest_framework",
+    "rest_framework.authtoken",  # Токены терминалов для TokenAuthentication.
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "cashbox_app.sessions.SessionRefreshMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -94,6 +96,19 @@ DATABASES = {
     }
 }
 
+# Хеширование паролей (cashbox_app.hashers). Число итераций PBKDF2 - не меньше
+# значения Django по умолчанию (оно же используется без переменной окружения);
+# число воркеров под него подбирается командой bench_login.
+# Хеши с другим числом итераций пересчитываются при входе пользователя.
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 0)) or None
+PASSWORD_HASHERS = [
+    "cashbox_app.hashers.TunablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -144,6 +159,27 @@ REST_FRAMEWORK = {
     },
 }
 
+# Лента изменений API (cashbox_app.changes): строки, измененные за последние
+# секунды, отдаются со следующим опросом. Окно должно быть больше самой
+# долгой транзакции записи, иначе клиент может пропустить строку.
+CHANGE_FEED_SETTLE_SECONDS = 120
+
+# Общий для всех процессов кэш. Через него процессы узнают о смене цен на металл.
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
+    },
+    # Сессии - отдельно: вытеснение сессий при переполнении не должно
+    # затрагивать версии цен и данных адресов.
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache", "sessions"),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
@@ -158,11 +194,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Использовать кастомную модель юзера.
 AUTH_USER_MODEL = "cashbox_app.CustomUser"
 
-SESSION_ENGINE = "django.contrib.sessions.backends.db"
-SESSION_SAVE_EVERY_REQUEST = True
+# Сессии читаются из кэша, в БД пишутся только при изменении.
+# "django.contrib.sessions.backends.signed_cookies" - сессия целиком в
+# подписанной cookie, без обращений к БД и кэшу.
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE", "django.contrib.sessions.backends.cached_db"
+)
+SESSION_CACHE_ALIAS = "sessions"
+SESSION_SAVE_EVERY_REQUEST = False
+# Сессия продлевается не чаще раза в 15 минут (cashbox_app.sessions).
+SESSION_REFRESH_INTERVAL = 15 * 60
 SESSION_COOKIE_DOMAIN = None
 SESSION_COOKIE_SECURE = False  # В продакшене изменить на True
-SESSION_SAVE_EVERY_REQUEST = True
 
 CSRF_COOKIE_SAMESITE = "Lax"
 CSRF_COOKIE_HTTPONLY = True
@@ -16,6 +16,11 @@ https://docs.djangoproject.com/en/5.0/topics/http/urls/.
 
 from django.contrib import admin
 from django.urls import path
+from cashbox_app.api import (
+    CashReportBatchAPIView,
+    ChangeFeedAPIView,
+    SecretRoomBatchAPIView,
+)
 from cashbox_app.views import (
     CustomLoginView,
     AddressSelectionView,
@@ -26,6 +31,8 @@ from cashbox_app.views import (
     CountVisitsBriefView,
     CountVisitsFullView,
     SupervisorCashReportView,
+    CashReportExportView,
+    BalanceBreaksView,
     CorrectedView,
     SavedView,
     ClosedView,
@@ -81,6 +88,16 @@ urlpatterns = [
         SupervisorCashReportView.as_view(),
         name="supervisor_cash_report",
     ),  # Отчет "Кассы"
+    path(
+        "cash_report/export",
+        CashReportExportView.as_view(),
+        name="cash_report_export",
+    ),  # Выгрузка кассовых отчетов в CSV
+    path(
+        "cash_report/breaks",
+        BalanceBreaksView.as_view(),
+        name="balance_breaks",
+    ),  # Разрывы остатков касс
     path(
         "price_changes",
         PriceChangesView.as_view(),
@@ -101,4 +118,19 @@ urlpatterns = [
         HarvestPrintViews.as_view(),
         name="harvest_views",
     ),  # Собрать урожай
+    path(
+        "api/cash_reports",
+        CashReportBatchAPIView.as_view(),
+        name="api_cash_reports",
+    ),  # API: пакет отчетов касс
+    path(
+        "api/secret_room",
+        SecretRoomBatchAPIView.as_view(),
+        name="api_secret_room",
+    ),  # API: пакет скупок
+    path(
+        "api/changes/<str:feed>",
+        ChangeFeedAPIView.as_view(),
+        name="api_changes",
+    ),  # API: лента изменений
 ]
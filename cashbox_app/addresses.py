@@ -0,0 +1,205 @@
+"""Справочник адресов в памяти процесса."""
+
+import threading
+import time
+
+from django import forms
+from django.core.cache import cache
+from django.db import transaction
+from django.forms.models import ModelChoiceIterator
+
+from cashbox_app.models import Address
+
+
+class AddressDirectory:
+    """
+    Кэш адресов: id → Address и упорядоченный список для выбора.
+
+    Адреса хранятся в памяти процесса вместе с номером версии. Номер версии
+    лежит в общем кэше (settings.CACHES) и меняется после фиксации любого
+    изменения адреса (сигналы post_save/post_delete модели Address, в том
+    числе из админки), поэтому все процессы перечитывают адреса на первом
+    обращении после изменения. Справочник читается для каждой строки
+    отчетов, поэтому версия проверяется не чаще раза в check_interval секунд.
+    """
+
+    version_key = "address_directory_version"
+    check_interval = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._addresses = None
+        self._by_id = {}
+        self._checked_at = 0.0
+
+    def _current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = self.bump()
+        return version
+
+    def bump(self):
+        """Меняет версию справочника, чтобы все процессы перечитали адреса."""
+        try:
+            return cache.incr(self.version_key)
+        except ValueError:
+            # Версии в кэше нет (первый запуск или вытеснение): начинаем
+            # с уникального значения, чтобы не совпасть со старой версией.
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            return cache.get(self.version_key)
+
+    def _load(self, version):
+        addresses = list(Address.objects.all())
+        with self._lock:
+            self._addresses = addresses
+            self._by_id = {address.pk: address for address in addresses}
+            self._version = version
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._addresses is not None and now - self._checked_at < self.check_interval:
+            return
+        # Версия читается до адресов: изменение, зафиксированное во время
+        # загрузки, сменит версию уже после нее.
+        version = self._current_version()
+        if self._addresses is None or version != self._version:
+            self._load(version)
+        self._checked_at = now
+
+    def all(self):
+        """Возвращает все адреса в порядке Address.Meta.ordering."""
+        self._ensure_fresh()
+        return self._addresses
+
+    def get(self, address_id):
+        """Возвращает адрес по id или None, если такого адреса нет."""
+        try:
+            address_id = int(address_id)
+        except (TypeError, ValueError):
+            return None
+        self._ensure_fresh()
+        return self._by_id.get(address_id)
+
+    def clear(self):
+        """
+        Сбрасывает справочник в текущем процессе сразу, в остальных - сменой
+        версии после фиксации транзакции.
+        """
+        with self._lock:
+            self._addresses = None
+            self._by_id = {}
+        transaction.on_commit(self.bump)
+
+
+address_directory = AddressDirectory()
+
+
+def selected_address(request):
+    """
+    Адрес, выбранный сотрудником (selected_address_id в сессии).
+
+    Вычисляется не больше одного раза за запрос и берется из справочника,
+    поэтому обычно не требует запросов к БД.
+    """
+    if not hasattr(request, "_selected_address"):
+        address_id = request.session.get("selected_address_id")
+        request._selected_address = (
+            address_directory.get(address_id) if address_id else None
+        )
+    return request._selected_address
+
+
+class AddressChoiceIterator(ModelChoiceIterator):
+    """Перебирает адреса поля из справочника вместо запроса к БД."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for address in self.field.get_addresses():
+            yield self.choice(address)
+
+    def __len__(self):
+        return len(self.field.get_addresses()) + (
+            1 if self.field.empty_label is not None else 0
+        )
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.get_addresses())
+
+
+class AddressChoiceField(forms.ModelChoiceField):
+    """
+    Поле выбора адреса на основе справочника адресов.
+
+    Чтобы ограничить выбор, присвойте полю addresses список адресов.
+    """
+
+    iterator = AddressChoiceIterator
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", Address.objects.all())
+        super().__init__(**kwargs)
+        self.addresses = None
+
+    def get_addresses(self):
+        if self.addresses is not None:
+            return self.addresses
+        return address_directory.all()
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, Address):
+            value = value.pk
+
+        address = address_directory.get(value)
+        if address is None or address not in self.get_addresses():
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return address
+
+
+class AddressMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """Поле выбора нескольких адресов на основе справочника адресов."""
+
+    iterator = AddressChoiceIterator
+    widget = forms.CheckboxSelectMultiple
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", Address.objects.all())
+        super().__init__(**kwargs)
+        self.addresses = None
+
+    def get_addresses(self):
+        if self.addresses is not None:
+            return self.addresses
+        return address_directory.all()
+
+    def clean(self, value):
+        if not value:
+            if self.required:
+                raise forms.ValidationError(
+                    self.error_messages["required"], code="required"
+                )
+            return []
+        if not isinstance(value, (list, tuple)):
+            raise forms.ValidationError(
+                self.error_messages["invalid_list"], code="invalid_list"
+            )
+
+        addresses = []
+        for item in value:
+            address = address_directory.get(item)
+            if address is None or address not in self.get_addresses():
+                raise forms.ValidationError(
+                    self.error_messages["invalid_choice"],
+                    code="invalid_choice",
+                    params={"value": item},
+                )
+            if address not in addresses:
+                addresses.append(address)
+        return addresses
@@ -0,0 +1,83 @@
+"""
+API для терминалов филиалов (Django REST framework).
+
+Терминал передает работу за один или несколько дней одним запросом:
+пакет записывается одной транзакцией, ошибка в любой записи отменяет
+весь пакет. Изменения на сервере терминал забирает из ленты изменений.
+Авторизация - по токену (Authorization: Token <ключ>).
+"""
+
+from django.http import Http404
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from cashbox_app.changes import FEEDS, changes_page
+from cashbox_app.harvest import decode_cursor
+from cashbox_app.serializers import (
+    MAX_BATCH_SIZE,
+    CashReportSerializer,
+    SecretRoomSerializer,
+)
+
+
+class BatchCreateAPIView(APIView):
+    """
+    POST: список записей serializer_class, автор - текущий пользователь.
+
+    :return: 201 и записанные записи с id или 400 с ошибками по записям.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=MAX_BATCH_SIZE,
+            context={"request": request},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(author=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class CashReportBatchAPIView(BatchCreateAPIView):
+    """Пакетная запись отчетов касс (cashbox_app.balances.save_cash_reports)."""
+
+    serializer_class = CashReportSerializer
+
+
+class SecretRoomBatchAPIView(BatchCreateAPIView):
+    """Пакетная запись скупок."""
+
+    serializer_class = SecretRoomSerializer
+
+
+class ChangeFeedAPIView(APIView):
+    """
+    GET: строки ленты изменений (cashbox_app.changes) после курсора.
+
+    Параметры: since - курсор из поля next прошлого ответа (без него -
+    с начала), address - id адреса, limit - количество строк.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, feed, *args, **kwargs):
+        if feed not in FEEDS:
+            raise Http404
+        cursor = request.query_params.get("since") or None
+        if cursor is not None and decode_cursor(cursor) is None:
+            raise ValidationError({"since": "Неверный курсор."})
+        try:
+            address = request.query_params.get("address")
+            address_id = int(address) if address else None
+            limit = int(request.query_params.get("limit", 500))
+        except ValueError:
+            raise ValidationError("address и limit должны быть числами.")
+        return Response(changes_page(feed, cursor, address_id, limit))
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CashboxAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cashbox_app'
+
+    def ready(self):
+        # Регистрируем обработчики сигналов.
+        from cashbox_app import signals  # noqa: F401
+
+        # Регистрируем проверку настройки хеширования паролей.
+        from cashbox_app import hashers  # noqa: F401
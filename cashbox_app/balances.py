@@ -0,0 +1,246 @@
+"""Последние отчеты касс, снимки текущих балансов и итоги касс за день."""
+
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from cashbox_app.models import (
+    FLOW_FIELDS,
+    CashReport,
+    DailyRegisterTotals,
+    MonthlyRollup,
+    RegisterBalance,
+)
+from cashbox_app.versions import address_versions
+
+# Денежные поля отчета, которые заполняет сотрудник.
+REPORT_FIELDS = ("cash_balance_beginning", *FLOW_FIELDS, "cash_register_end")
+
+
+def latest_reports_queryset(address_ids=None):
+    """
+    QuerySet последних по updated_at отчетов каждой кассы.
+
+    Использует PostgreSQL DISTINCT ON (id_address, cas_register), поэтому
+    подходит как для одного адреса, так и для всех филиалов сразу.
+
+    :param address_ids: список id адресов или None для всех адресов.
+    """
+    # Порядок по id адреса, а не по "id_address": иначе Django подставит
+    # Address.Meta.ordering, и ORDER BY не совпадет с DISTINCT ON.
+    reports = CashReport.objects.order_by(
+        "id_address_id", "cas_register", F("updated_at").desc(nulls_last=True), "-id"
+    ).distinct("id_address_id", "cas_register")
+    if address_ids is not None:
+        reports = reports.filter(id_address_id__in=address_ids)
+    return reports
+
+
+def latest_reports(address_ids=None):
+    """
+    Загружает последний отчет каждой кассы одним запросом.
+
+    :param address_ids: список id адресов или None для всех адресов.
+    :return: dict
+        Словарь {(id адреса, касса): CashReport}.
+    """
+    return {
+        (report.id_address_id, report.cas_register): report
+        for report in latest_reports_queryset(address_ids)
+    }
+
+
+def save_cash_reports(reports):
+    """
+    Записывает отчеты касс одной транзакцией.
+
+    Отчет определяется адресом, кассой и днем смены (ограничение
+    cash_report_shift_uniq), поэтому отчеты любого числа смен записываются
+    одним INSERT ... ON CONFLICT DO UPDATE. В той же транзакции обновляются
+    снимки балансов, итоги касс за день и размораживаются итоги прошедших
+    месяцев, в которые попали отчеты.
+
+    :param reports: список несохраненных CashReport с заполненным shift_day.
+    :return: list
+        Те же отчеты с заполненными id.
+    """
+    with transaction.atomic():
+        CashReport.objects.bulk_create(
+            reports,
+            update_conflicts=True,
+            unique_fields=["id_address_id", "cas_register", "shift_day"],
+            update_fields=[*REPORT_FIELDS, "author", "status", "updated_at"],
+        )
+        RegisterBalance.update_from_reports(reports)
+        DailyRegisterTotals.update_from_reports(reports)
+        current_month = date.today().replace(day=1)
+        past_months = {
+            report.shift_day.replace(day=1)
+            for report in reports
+            if report.shift_day < current_month
+        }
+        if past_months:
+            MonthlyRollup.objects.filter(month__in=past_months).delete()
+        address_versions.bump_on_commit(report.id_address_id for report in reports)
+    return reports
+
+
+def rebuild_register_balances():
+    """
+    Пересобирает таблицу RegisterBalance по истории CashReport.
+
+    :return: int
+        Количество записанных снимков.
+    """
+    with transaction.atomic():
+        reports = list(latest_reports().values())
+        RegisterBalance.objects.all().delete()
+        RegisterBalance.update_from_reports(reports)
+    return len(reports)
+
+
+def check_register_balances():
+    """
+    Сравнивает снимки RegisterBalance с историей CashReport.
+
+    :return: list
+        Список расхождений. Каждое расхождение - словарь с ключами
+        id_address, cas_register, snapshot и history (остатки на конец дня
+        либо None, если записи нет).
+    """
+    history = latest_reports()
+    snapshots = {
+        (balance.id_address_id, balance.cas_register): balance
+        for balance in RegisterBalance.objects.all()
+    }
+
+    mismatches = []
+    for key in sorted(history.keys() | snapshots.keys()):
+        report = history.get(key)
+        balance = snapshots.get(key)
+        if (
+            report is not None
+            and balance is not None
+            and report.pk == balance.report_id
+            and report.cash_register_end == balance.cash_register_end
+        ):
+            continue
+        mismatches.append(
+            {
+                "id_address": key[0],
+                "cas_register": key[1],
+                "snapshot": balance.cash_register_end if balance else None,
+                "history": report.cash_register_end if report else None,
+            }
+        )
+    return mismatches
+
+
+def rebuild_daily_register_totals(chunk_size=2000):
+    """
+    Пересобирает таблицу DailyRegisterTotals по истории CashReport.
+
+    :return: int
+        Количество записанных дней.
+    """
+    count = 0
+    with transaction.atomic():
+        DailyRegisterTotals.objects.all().delete()
+        rows = []
+        pair = None
+        # Сортировка по id адреса, а не по "id_address": иначе Django
+        # подставляет Address.Meta.ordering, и кассы одинаковых адресов
+        # перемешиваются, сбрасывая нарастающие итоги.
+        for report in CashReport.objects.order_by(
+            "id_address_id", "cas_register", "shift_day"
+        ).iterator(chunk_size=chunk_size):
+            if (report.id_address_id, report.cas_register) != pair:
+                pair = (report.id_address_id, report.cas_register)
+                totals = {field: 0 for field in FLOW_FIELDS}
+            row = DailyRegisterTotals(
+                day=report.shift_day,
+                id_address_id=report.id_address_id,
+                cas_register=report.cas_register,
+                cash_balance_beginning=report.cash_balance_beginning,
+                cash_register_end=report.cash_register_end,
+            )
+            for field in FLOW_FIELDS:
+                value = getattr(report, field) or 0
+                totals[field] += value
+                setattr(row, field, value)
+                setattr(row, f"cum_{field}", totals[field])
+            rows.append(row)
+            if len(rows) >= chunk_size:
+                DailyRegisterTotals.objects.bulk_create(rows)
+                count += len(rows)
+                rows = []
+        DailyRegisterTotals.objects.bulk_create(rows)
+        count += len(rows)
+    return count
+
+
+def register_totals(date_from, date_to):
+    """
+    Итоги всех касс всех адресов за период.
+
+    Для каждой кассы берутся три строки DailyRegisterTotals: первая и
+    последняя в периоде и последняя до него (по индексу, без просмотра
+    истории). Обороты периода - разность нарастающих итогов. Два запроса
+    независимо от длины периода и истории.
+
+    :return: list
+        Словари с ключами id_address, cas_register, cash_balance_beginning,
+        cash_register_end и оборотами FLOW_FIELDS.
+    """
+    days = DailyRegisterTotals.objects.filter(
+        id_address=OuterRef("id_address"), cas_register=OuterRef("cas_register")
+    )
+    pairs = list(
+        RegisterBalance.objects.annotate(
+            first_id=Subquery(
+                days.filter(day__range=(date_from, date_to))
+                .order_by("day")
+                .values("id")[:1]
+            ),
+            last_id=Subquery(
+                days.filter(day__lte=date_to).order_by("-day").values("id")[:1]
+            ),
+            before_id=Subquery(
+                days.filter(day__lt=date_from).order_by("-day").values("id")[:1]
+            ),
+        )
+        .values("id_address", "cas_register", "first_id", "last_id", "before_id")
+        .order_by("id_address_id", "cas_register")
+    )
+    ids = {
+        pair[key]
+        for pair in pairs
+        for key in ("first_id", "last_id", "before_id")
+        if pair[key]
+    }
+    rows = DailyRegisterTotals.objects.in_bulk(ids)
+
+    totals = []
+    for pair in pairs:
+        first = rows.get(pair["first_id"])
+        last = rows.get(pair["last_id"])
+        before = rows.get(pair["before_id"])
+        if last is None:
+            continue
+        total = {
+            "id_address": pair["id_address"],
+            "cas_register": pair["cas_register"],
+            # Если в периоде отчетов не было, остаток переносится с прошлого дня.
+            "cash_balance_beginning": (
+                first.cash_balance_beginning if first else last.cash_register_end
+            ),
+            "cash_register_end": last.cash_register_end,
+        }
+        for field in FLOW_FIELDS:
+            cum_field = f"cum_{field}"
+            total[field] = getattr(last, cum_field) - (
+                getattr(before, cum_field) if before else 0
+            )
+        totals.append(total)
+    return totals
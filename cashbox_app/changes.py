@@ -0,0 +1,177 @@
+"""
+Лента изменений для терминалов филиалов и выгрузки в 1С.
+
+Клиент запоминает курсор (дата изменения, id) последней полученной строки
+и при следующем обращении получает только строки, измененные после него,
+в порядке (дата изменения, id). Выборка идет по индексу (updated_at, id),
+поэтому стоимость опроса зависит от количества изменений, а не от размера
+таблицы. Удаленные строки всех лент отдаются отдельной лентой deleted
+(модель DeletedRow, записи создаются сигналами post_delete).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+
+from cashbox_app.harvest import decode_cursor, encode_cursor
+from cashbox_app.models import (
+    CashReport,
+    DeletedRow,
+    GoldStandard,
+    Schedule,
+    SecretRoom,
+)
+
+
+def settle_seconds():
+    """
+    Строки, измененные за последние секунды, отдаются со следующим опросом:
+    дата изменения присваивается до фиксации транзакции, и более ранняя
+    по дате, но позже зафиксированная строка иначе оказалась бы до курсора.
+    Окно (CHANGE_FEED_SETTLE_SECONDS) должно быть больше самой долгой
+    транзакции записи: пакета API, сбора урожая, порции recompute_converters.
+    """
+    return getattr(settings, "CHANGE_FEED_SETTLE_SECONDS", 120)
+
+
+# Наибольшее количество строк в ответе.
+MAX_LIMIT = 1000
+
+# Лента: модель, поле даты изменения, поле адреса, выгружаемые поля.
+FEEDS = {
+    "cash_reports": (
+        CashReport,
+        "updated_at",
+        "id_address_id",
+        [
+            "id",
+            "id_address_id",
+            "cas_register",
+            "shift_day",
+            "shift_date",
+            "cash_balance_beginning",
+            "introduced",
+            "interest_return",
+            "loans_issued",
+            "used_farming",
+            "boss_took_it",
+            "cash_register_end",
+            "author_id",
+            "status",
+            "updated_at",
+        ],
+    ),
+    "secret_room": (
+        SecretRoom,
+        "updated_at",
+        "id_address_id",
+        [
+            "id",
+            "id_address_id",
+            "shift_date",
+            "client",
+            "nomenclature",
+            "gold_standard",
+            "price",
+            "weight_clean",
+            "weight_fact",
+            "sum",
+            "converter585",
+            "converter925",
+            "not_standard",
+            "status",
+            "author_id",
+            "harvest_manifest_id",
+            "updated_at",
+        ],
+    ),
+    # Цены и расписания - небольшие таблицы, отдельный индекс им не нужен.
+    "prices": (
+        GoldStandard,
+        "shift_date",
+        None,
+        ["id", "gold_standard", "price_rubles", "shift_date"],
+    ),
+    "schedule": (
+        Schedule,
+        "updated_at",
+        "address_id",
+        [
+            "id",
+            "address_id",
+            "day_of_week",
+            "opening_time",
+            "closing_time",
+            "updated_at",
+        ],
+    ),
+    "deleted": (
+        DeletedRow,
+        "deleted_at",
+        "address_id",
+        ["id", "feed", "object_id", "address_id", "deleted_at"],
+    ),
+}
+
+# Ленты, удаление строк которых записывается в DeletedRow.
+DELETION_FEEDS = {
+    model: (feed, address_field)
+    for feed, (model, _, address_field, _) in FEEDS.items()
+    if model is not DeletedRow
+}
+
+
+def record_deletion(instance):
+    """Записывает удаление строки одной из лент FEEDS."""
+    feed, address_field = DELETION_FEEDS[type(instance)]
+    DeletedRow.objects.create(
+        feed=feed,
+        object_id=instance.pk,
+        address_id=getattr(instance, address_field) if address_field else None,
+    )
+
+
+def changes_queryset(feed, cursor=None, address_id=None):
+    """
+    Строки ленты feed после курсора в порядке (дата изменения, id).
+
+    :param feed: ключ FEEDS.
+    :param cursor: курсор последней полученной строки или None - с начала.
+    :param address_id: id адреса или None для всех адресов.
+    """
+    model, changed_field, address_field, fields = FEEDS[feed]
+    rows = model.objects.filter(
+        **{f"{changed_field}__lt": now() - timedelta(seconds=settle_seconds())}
+    )
+    after = decode_cursor(cursor)
+    if after is not None:
+        changed_at, row_id = after
+        # Условие >= по первому полю индекса задает начало диапазона,
+        # второе отбрасывает уже полученные строки с той же датой.
+        rows = rows.filter(
+            Q(**{f"{changed_field}__gte": changed_at}),
+            Q(**{f"{changed_field}__gt": changed_at}) | Q(id__gt=row_id),
+        )
+    if address_id is not None and address_field is not None:
+        rows = rows.filter(**{address_field: address_id})
+    return rows.values(*fields).order_by(changed_field, "id")
+
+
+def changes_page(feed, cursor=None, address_id=None, limit=500):
+    """
+    :return: dict
+        results - строки, next - курсор для следующего обращения (прежний,
+        если изменений нет), has_more - есть ли еще строки после next.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    rows = list(changes_queryset(feed, cursor, address_id)[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changed_field = FEEDS[feed][1]
+    return {
+        "results": rows,
+        "next": encode_cursor(rows[-1], changed_field) if rows else cursor,
+        "has_more": has_more,
+    }
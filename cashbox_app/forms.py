@@ -6,7 +6,11 @@ from cashbox_app.models import (
     CashRegisterChoices,
     SecretRoom,
     GoldStandard, GoldStandardChoices,
+    LocationStatusChoices,
 )
+from cashbox_app.addresses import AddressChoiceField, AddressMultipleChoiceField
+from cashbox_app.balances import save_cash_reports
+from cashbox_app.prices import price_table
 from datetime import datetime, timedelta
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
@@ -47,13 +51,24 @@ class AddressForm(forms.ModelForm):
 class AddressSelectionForm(forms.Form):
     """Форма для выбора адреса."""
 
-    addresses = forms.ModelChoiceField(
-        queryset=Address.objects.all(),
+    addresses = AddressChoiceField(
         empty_label="Выберите адрес ломбарда",
         label="Адреса",
     )
 
 
+# Поля отчета, которые вводятся в формах по каждой кассе.
+REPORT_FORM_FIELDS = (
+    "cash_balance_beginning",
+    "introduced",
+    "interest_return",
+    "loans_issued",
+    "used_farming",
+    "boss_took_it",
+    "cash_register_end",
+)
+
+
 def calculate_cash_register_end(cleaned_data, register_type):
     """Функция для подсчета баланса с учетом изменений."""
     fields = [
@@ -75,7 +90,7 @@ class MultiCashReportForm(forms.Form):
     """Объединяет несколько типов отчетов (покупки, ломбард, техника) в одну форму."""
 
     author = forms.ModelChoiceField(queryset=CustomUser.objects.all())
-    id_address = forms.ModelChoiceField(queryset=Address.objects.all())
+    id_address = AddressChoiceField()
     data = forms.CharField(widget=forms.Textarea(attrs={"rows": 1}), required=False)
 
     # Формы для скупки.
@@ -161,167 +176,35 @@ class MultiCashReportForm(forms.Form):
     )
 
     def save(self):
+        """
+        Сохраняет отчеты по трем кассам одной транзакцией.
+
+        Все три кассы записываются одним INSERT ... ON CONFLICT DO UPDATE
+        (cashbox_app.balances.save_cash_reports).
+        """
         shift_date = datetime.now()
-        print(f"\n{self.cleaned_data['author']} сохраняет данные. Дата: {shift_date}")
+        author = self.cleaned_data["author"]
+        print(f"\n{author} сохраняет данные. Дата: {shift_date}")
         print(f"-------------------")
 
-        try:
-            # Проверяем, существуют ли отчеты с такой датой и автором
-            existing_reports = CashReport.objects.filter(
-                updated_at__date=shift_date.date(), author=self.cleaned_data["author"]
+        reports = []
+        for register in CashRegisterChoices:
+            suffix = register.value.lower()
+            report = CashReport(
+                shift_date=shift_date,
+                shift_day=shift_date.date(),
+                id_address=self.cleaned_data["id_address"],
+                cas_register=self.cleaned_data[f"cas_register_{suffix}"],
+                author=author,
+                status=self.cleaned_data["status"],
             )
+            for field in REPORT_FORM_FIELDS:
+                setattr(report, field, self.cleaned_data[f"{field}_{suffix}"])
+            reports.append(report)
+
+        save_cash_reports(reports)
 
-            # Buying Up report
-            buying_up_report = existing_reports.filter(
-                cas_register=self.cleaned_data["cas_register_buying_up"]
-            ).first()
-            if buying_up_report:
-                # Обновляем существующий отчет Buying Up
-                buying_up_report.cash_balance_beginning = self.cleaned_data[
-                    "cash_balance_beginning_buying_up"
-                ]
-                buying_up_report.introduced = self.cleaned_data["introduced_buying_up"]
-                buying_up_report.interest_return = self.cleaned_data[
-                    "interest_return_buying_up"
-                ]
-                buying_up_report.loans_issued = self.cleaned_data[
-                    "loans_issued_buying_up"
-                ]
-                buying_up_report.used_farming = self.cleaned_data[
-                    "used_farming_buying_up"
-                ]
-                buying_up_report.boss_took_it = self.cleaned_data[
-                    "boss_took_it_buying_up"
-                ]
-                buying_up_report.cash_register_end = self.cleaned_data[
-                    "cash_register_end_buying_up"
-                ]
-                buying_up_report.status = self.cleaned_data["status"]
-                buying_up_report.save()
-                print(f"Buying Up report обновлен: {buying_up_report}")
-            else:
-                # Создаем новую запись Buying Up
-                buying_up_report = CashReport(
-                    shift_date=shift_date,
-                    id_address=self.cleaned_data["id_address"],
-                    author=self.cleaned_data["author"],
-                    cas_register=self.cleaned_data["cas_register_buying_up"],
-                    cash_balance_beginning=self.cleaned_data[
-                        "cash_balance_beginning_buying_up"
-                    ],
-                    introduced=self.cleaned_data["introduced_buying_up"],
-                    interest_return=self.cleaned_data["interest_return_buying_up"],
-                    loans_issued=self.cleaned_data["loans_issued_buying_up"],
-                    used_farming=self.cleaned_data["used_farming_buying_up"],
-                    boss_took_it=self.cleaned_data["boss_took_it_buying_up"],
-                    cash_register_end=self.cleaned_data["cash_register_end_buying_up"],
-                    status=self.cleaned_data["status"],
-                )
-                buying_up_report.save()
-                print(f"Buying Up report создан: {buying_up_report}")
-
-            # Pawnshop report
-            pawnshop_report = existing_reports.filter(
-                cas_register=self.cleaned_data["cas_register_pawnshop"]
-            ).first()
-            if pawnshop_report:
-                # Обновляем существующий отчет Pawnshop
-                pawnshop_report.cash_balance_beginning = self.cleaned_data[
-                    "cash_balance_beginning_pawnshop"
-                ]
-                pawnshop_report.introduced = self.cleaned_data["introduced_pawnshop"]
-                pawnshop_report.interest_return = self.cleaned_data[
-                    "interest_return_pawnshop"
-                ]
-                pawnshop_report.loans_issued = self.cleaned_data[
-                    "loans_issued_pawnshop"
-                ]
-                pawnshop_report.used_farming = self.cleaned_data[
-                    "used_farming_pawnshop"
-                ]
-                pawnshop_report.boss_took_it = self.cleaned_data[
-                    "boss_took_it_pawnshop"
-                ]
-                pawnshop_report.cash_register_end = self.cleaned_data[
-                    "cash_register_end_pawnshop"
-                ]
-                pawnshop_report.status = self.cleaned_data["status"]
-                pawnshop_report.save()
-                print(f"Pawnshop report обновлен: {pawnshop_report}")
-            else:
-                # Создаем новую запись Pawnshop
-                pawnshop_report = CashReport(
-                    shift_date=shift_date,
-                    id_address=self.cleaned_data["id_address"],
-                    author=self.cleaned_data["author"],
-                    cas_register=self.cleaned_data["cas_register_pawnshop"],
-                    cash_balance_beginning=self.cleaned_data[
-                        "cash_balance_beginning_pawnshop"
-                    ],
-                    introduced=self.cleaned_data["introduced_pawnshop"],
-                    interest_return=self.cleaned_data["interest_return_pawnshop"],
-                    loans_issued=self.cleaned_data["loans_issued_pawnshop"],
-                    used_farming=self.cleaned_data["used_farming_pawnshop"],
-                    boss_took_it=self.cleaned_data["boss_took_it_pawnshop"],
-                    cash_register_end=self.cleaned_data["cash_register_end_pawnshop"],
-                    status=self.cleaned_data["status"],
-                )
-                pawnshop_report.save()
-                print(f"Pawnshop report создан: {pawnshop_report}")
-
-            # Technique report
-            technique_report = existing_reports.filter(
-                cas_register=self.cleaned_data["cas_register_technique"]
-            ).first()
-            if technique_report:
-                # Обновляем существующий отчет Technique
-                technique_report.cash_balance_beginning = self.cleaned_data[
-                    "cash_balance_beginning_technique"
-                ]
-                technique_report.introduced = self.cleaned_data["introduced_technique"]
-                technique_report.interest_return = self.cleaned_data[
-                    "interest_return_technique"
-                ]
-                technique_report.loans_issued = self.cleaned_data[
-                    "loans_issued_technique"
-                ]
-                technique_report.used_farming = self.cleaned_data[
-                    "used_farming_technique"
-                ]
-                technique_report.boss_took_it = self.cleaned_data[
-                    "boss_took_it_technique"
-                ]
-                technique_report.cash_register_end = self.cleaned_data[
-                    "cash_register_end_technique"
-                ]
-                technique_report.status = self.cleaned_data["status"]
-                technique_report.save()
-                print(f"Technique report обновлен: {technique_report}")
-            else:
-                # Создаем новую запись Technique
-                technique_report = CashReport(
-                    shift_date=shift_date,
-                    id_address=self.cleaned_data["id_address"],
-                    author=self.cleaned_data["author"],
-                    cas_register=self.cleaned_data["cas_register_technique"],
-                    cash_balance_beginning=self.cleaned_data[
-                        "cash_balance_beginning_technique"
-                    ],
-                    introduced=self.cleaned_data["introduced_technique"],
-                    interest_return=self.cleaned_data["interest_return_technique"],
-                    loans_issued=self.cleaned_data["loans_issued_technique"],
-                    used_farming=self.cleaned_data["used_farming_technique"],
-                    boss_took_it=self.cleaned_data["boss_took_it_technique"],
-                    cash_register_end=self.cleaned_data["cash_register_end_technique"],
-                    status=self.cleaned_data["status"],
-                )
-                technique_report.save()
-                print(f"Technique report создан: {technique_report}")
-
-            print("\nВсе отчеты успешно сохранены или обновлены.")
-
-        except Exception as e:
-            print(f"Ошибка при сохранении данных: {e}")
+        print("\nВсе отчеты успешно сохранены или обновлены.")
 
     def clean(self):
         cleaned_data = super().clean()
@@ -338,7 +221,7 @@ class SavedForm(forms.Form):
     """Объединяет несколько типов отчетов (покупки, ломбард, техника) в одну форму."""
 
     author = forms.ModelChoiceField(queryset=CustomUser.objects.all())
-    id_address = forms.ModelChoiceField(queryset=Address.objects.all())
+    id_address = AddressChoiceField()
     data = forms.CharField(widget=forms.Textarea(attrs={"rows": 1}), required=False)
 
     # Формы для скупки.
@@ -419,67 +302,86 @@ class YearMonthForm(forms.Form):
 
 class ScheduleForm(forms.Form):
 
-    addresses = forms.ModelChoiceField(
-        queryset=Address.objects.all(), empty_label="Выберите адрес"
-    )
+    addresses = AddressChoiceField(empty_label="Все адреса", required=False)
 
-    year = forms.IntegerField(
-        label="Год", min_value=1900, max_value=2100, required=True
+    date_from = forms.DateField(
+        label="С", widget=forms.DateInput(attrs={"type": "date"}), required=True
     )
 
-    month = forms.IntegerField(label="Месяц", min_value=1, max_value=12, required=True)
+    date_to = forms.DateField(
+        label="По", widget=forms.DateInput(attrs={"type": "date"}), required=True
+    )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Получаем текущую дату
-        today = datetime.now()
+        # По умолчанию отчет строится за предыдущий месяц.
+        last_day = datetime.now().date().replace(day=1) - timedelta(days=1)
+        self.fields["date_from"].initial = last_day.replace(day=1)
+        self.fields["date_to"].initial = last_day
 
-        # Устанавливаем текущий год в поле 'year'
-        self.fields["year"].initial = today.year
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("Дата начала периода позже даты окончания.")
+        return cleaned_data
 
-        # Вычисляем предыдущий месяц
-        previous_month = today.replace(day=1) - timedelta(days=1)
+    class Meta:
+        fields = ["addresses", "date_from", "date_to"]
 
-        # Устанавливаем предыдущий месяц в поле 'month'
-        self.fields["month"].initial = previous_month.month
 
-    class Meta:
-        fields = ["addresses", "year", "month"]
+class CashDashboardForm(forms.Form):
+    """
+    Форма выбора дня или периода для кассового отчета руководителя.
+    Используется в SupervisorCashReportView.
+    """
+
+    date_from = forms.DateField(
+        label="С", widget=forms.DateInput(attrs={"type": "date"}), required=True
+    )
+
+    date_to = forms.DateField(
+        label="По", widget=forms.DateInput(attrs={"type": "date"}), required=True
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # По умолчанию отчет строится за сегодня.
+        today = datetime.now().date()
+        self.fields["date_from"].initial = today
+        self.fields["date_to"].initial = today
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("Дата начала периода позже даты окончания.")
+        return cleaned_data
+
+
+class CashReportExportForm(ScheduleForm):
+    """
+    Форма выгрузки кассовых отчетов: адрес (или все адреса) и период.
+    Используется в CashReportExportView.
+    """
 
 
 def price_changes():
     """
     Функция для получения цен на лом ювелирных изделий в разрезе проб.
 
-    Возвращает словарь, где ключами являются пробы (например, "gold750", "silver925"), а значениями -
-     актуальные цены в рублях на эти стандарты.
-
-    Функция выполняет следующие действия:
-    1. Создает словарь с базовыми типами стандартов и значением None для каждой из них.
-    2. Для каждого типа стандарта:
-       - Получает QuerySet объектов GoldStandard, отсортированных по дате изменения.
-       - Если QuerySet не пуст, берет последний объект и сохраняет его цену в словаре.
-    3. Возвращает заполненный словарь с ценами.
+    Возвращает словарь, где ключами являются пробы (значения GoldStandardChoices),
+    а значениями - актуальные цены в рублях. Цены берутся из таблицы цен
+    в памяти (cashbox_app.prices.price_table) и обычно не требуют запросов к БД.
 
     :return: dict
         Словарь, где ключи - пробы, значения - актуальные цены.
     """
-    gold_standard = {
-        GoldStandardChoices.GOLD750: None,
-        GoldStandardChoices.GOLD585: None,
-        GoldStandardChoices.GOLD500: None,
-        GoldStandardChoices.GOLD375: None,
-        GoldStandardChoices.SILVER925: None,
-        GoldStandardChoices.SILVER875: None,
-    }
-
-    for standard_type in gold_standard.keys():
-        obj_list = GoldStandard.objects.filter(gold_standard=standard_type).order_by("shift_date")
-
-        if obj_list:
-            latest_obj = obj_list.last()
-            gold_standard[standard_type] = latest_obj.price_rubles
+    gold_standard = price_table.prices()
 
     print(f"Актуальные цены: {gold_standard}")
 
@@ -487,60 +389,98 @@ def price_changes():
 
 
 class PriceChangesForm(forms.Form):
+    """Форма изменения цен. Текущие цены подставляются при создании формы."""
+
     gold_375 = forms.DecimalField(
         max_digits=10,
         decimal_places=2,
         required=False,
-        initial=GoldStandard.objects.filter(gold_standard=375).first().price_rubles if GoldStandard.objects.filter(
-            gold_standard=375).exists() else None,
         label="золото 375",
     )
     gold_500 = forms.DecimalField(
         max_digits=10,
         decimal_places=2,
         required=False,
-        initial=GoldStandard.objects.filter(gold_standard=500).first().price_rubles if GoldStandard.objects.filter(
-            gold_standard=500).exists() else None,
         label="золото 500",
     )
     gold_585 = forms.DecimalField(
         max_digits=10,
         decimal_places=2,
         required=False,
-        initial=GoldStandard.objects.filter(gold_standard=585).first().price_rubles if GoldStandard.objects.filter(
-            gold_standard=585).exists() else None,
         label="золото 585",
     )
     gold_750 = forms.DecimalField(
         max_digits=10,
         decimal_places=2,
         required=False,
-        initial=GoldStandard.objects.filter(gold_standard=750).first().price_rubles if GoldStandard.objects.filter(
-            gold_standard=750).exists() else None,
         label="золото 750",
     )
     silver_875 = forms.DecimalField(
         max_digits=10,
         decimal_places=2,
         required=False,
-        initial=GoldStandard.objects.filter(gold_standard=875).first().price_rubles if GoldStandard.objects.filter(
-            gold_standard=875).exists() else None,
         label="серебро 875",
     )
     silver_925 = forms.DecimalField(
         max_digits=10,
         decimal_places=2,
         required=False,
-        initial=GoldStandard.objects.filter(gold_standard=925).first().price_rubles if GoldStandard.objects.filter(
-            gold_standard=925).exists() else None,
         label="серебро 925",
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Цены берутся при каждом создании формы, а не при импорте модуля.
+        prices = price_table.prices()
+        for name, field in self.fields.items():
+            field.initial = prices.get(int(name.split("_")[1]))
+
+
+class HarvestFilterForm(forms.Form):
+    """
+    Фильтр урожая: статус скупки, адрес и период.
+    Используется в HarvestPrintViews, все поля необязательные.
+    """
+
+    status = forms.ChoiceField(
+        label="Статус",
+        choices=[("", "Все статусы"), *LocationStatusChoices.choices],
+        required=False,
+    )
+
+    addresses = AddressChoiceField(empty_label="Все адреса", required=False)
+
+    date_from = forms.DateField(
+        label="С", widget=forms.DateInput(attrs={"type": "date"}), required=False
+    )
+
+    date_to = forms.DateField(
+        label="По", widget=forms.DateInput(attrs={"type": "date"}), required=False
+    )
+
+
+class HarvestRunForm(forms.Form):
+    """
+    Сбор урожая: адреса маршрута и переход статуса скупок.
+    Используется в HarvestView.
+    """
+
+    from_status = forms.ChoiceField(
+        label="Перевести",
+        choices=[
+            (LocationStatusChoices.LOCAL, "В ФИЛИАЛЕ → СОБРАНО"),
+            (LocationStatusChoices.GATHER, "СОБРАНО → ВЫДАНО"),
+        ],
+    )
+
+    addresses = AddressMultipleChoiceField(label="Адреса маршрута")
+
 
 class SecretRoomForm(forms.ModelForm):
 
     author = forms.ModelChoiceField(queryset=CustomUser.objects.all())
-    id_address = forms.ModelChoiceField(queryset=Address.objects.all())
+    id_address = AddressChoiceField()
     data = forms.CharField(widget=forms.Textarea(attrs={"rows": 1}), required=False)
 
     class Meta:
@@ -0,0 +1,297 @@
+"""
+Урожай: выборка скупок (SecretRoom) с фильтрами и постраничным выводом,
+сбор скупок с адресов маршрута (HarvestManifest).
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import now
+
+from cashbox_app.addresses import address_directory
+from cashbox_app.models import (
+    METAL_SUM_FIELDS,
+    HarvestManifest,
+    HarvestManifestLine,
+    LocationStatusChoices,
+    MetalStock,
+    SecretRoom,
+)
+from cashbox_app.versions import address_versions
+
+HARVEST_COLUMNS = [
+    ("shift_date", "Дата смены"),
+    ("address", "Адрес"),
+    ("client", "Клиент"),
+    ("nomenclature", "Наименование"),
+    ("gold_standard", "Проба"),
+    ("price", "Цена за грамм"),
+    ("weight_clean", "Чистый вес"),
+    ("weight_fact", "Фактический вес"),
+    ("sum", "Выдано денег"),
+    ("status", "Статус скупки"),
+    ("author__username", "Сотрудник смены"),
+]
+
+# Поля выборки: адрес берется из справочника, сотрудник - тем же запросом.
+HARVEST_FIELDS = [
+    "id",
+    "id_address_id",
+    *[key for key, _ in HARVEST_COLUMNS if key != "address"],
+]
+
+
+def harvest_queryset(status=None, address_ids=None, date_from=None, date_to=None):
+    """
+    Скупки по статусу, адресам и периоду, от новых к старым.
+
+    Порядок (shift_date, id) по убыванию совпадает с индексами
+    secret_room_*_date_idx и используется для постраничного вывода.
+    """
+    purchases = SecretRoom.objects.all()
+    if status:
+        purchases = purchases.filter(status=status)
+    if address_ids:
+        purchases = purchases.filter(id_address_id__in=address_ids)
+    # Границы по shift_date, а не по shift_date__date, чтобы работал индекс.
+    if date_from:
+        purchases = purchases.filter(shift_date__gte=datetime.combine(date_from, time.min))
+    if date_to:
+        purchases = purchases.filter(
+            shift_date__lt=datetime.combine(date_to + timedelta(days=1), time.min)
+        )
+    return purchases.values(*HARVEST_FIELDS).order_by("-shift_date", "-id")
+
+
+def harvest_rows(rows):
+    """Добавляет к строкам скупок адрес из справочника адресов."""
+    for row in rows:
+        row["address"] = address_directory.get(row["id_address_id"])
+        yield row
+
+
+def encode_cursor(row, field="shift_date"):
+    """Курсор страницы: дата (shift_date) и id последней показанной строки."""
+    return f"{row[field].isoformat()}_{row['id']}"
+
+
+def decode_cursor(cursor):
+    """
+    :return: tuple
+        (дата, id) или None, если курсор не указан или поврежден.
+    """
+    try:
+        moment, row_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(moment), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def harvest_page(purchases, cursor=None, size=100):
+    """
+    Страница скупок после курсора (keyset-пагинация по (shift_date, id)).
+
+    Время выборки не зависит от номера страницы: OFFSET не используется.
+
+    :return: tuple
+        (строки страницы, курсор следующей страницы или None).
+    """
+    after = decode_cursor(cursor)
+    if after is not None:
+        shift_date, purchase_id = after
+        purchases = purchases.filter(
+            Q(shift_date__lt=shift_date) | Q(shift_date=shift_date, id__lt=purchase_id)
+        )
+    rows = list(purchases[: size + 1])
+    next_cursor = encode_cursor(rows[size - 1]) if len(rows) > size else None
+    return list(harvest_rows(rows[:size])), next_cursor
+
+
+# Допустимые переходы статуса скупки при сборе урожая.
+HARVEST_TRANSITIONS = {
+    LocationStatusChoices.LOCAL: LocationStatusChoices.GATHER,
+    LocationStatusChoices.GATHER: LocationStatusChoices.ISSUED,
+}
+
+
+def move_purchases(manifest, address_ids, purchase_ids=None):
+    """
+    Переводит скупки адресов из manifest.from_status в manifest.to_status
+    одним UPDATE ... RETURNING (PostgreSQL, SQLite 3.35+).
+
+    Условие на статус проверяется в том же UPDATE, поэтому скупка, которую
+    одновременно собирают два сотрудника, попадет только в один манифест.
+
+    :param purchase_ids: id выбранных скупок или None - все скупки адресов.
+    :return: list
+        Кортежи (id адреса, проба, *METAL_SUM_FIELDS) перенесенных скупок.
+    """
+    quote = connection.ops.quote_name
+    meta = SecretRoom._meta
+
+    def column(name):
+        return quote(meta.get_field(name).column)
+
+    conditions = [
+        f"{column('status')} = %s",
+        f"{column('id_address')} IN ({', '.join(['%s'] * len(address_ids))})",
+    ]
+    params = [
+        manifest.to_status,
+        manifest.id,
+        now(),
+        manifest.from_status,
+        *address_ids,
+    ]
+    if purchase_ids is not None:
+        conditions.append(
+            f"{column('id')} IN ({', '.join(['%s'] * len(purchase_ids))})"
+        )
+        params.extend(purchase_ids)
+
+    returning = ", ".join(
+        column(name) for name in ("id_address", "gold_standard", *METAL_SUM_FIELDS)
+    )
+    sql = (
+        f"UPDATE {quote(meta.db_table)} "
+        f"SET {column('status')} = %s, {column('harvest_manifest')} = %s, "
+        f"{column('updated_at')} = %s "
+        f"WHERE {' AND '.join(conditions)} "
+        f"RETURNING {returning}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def to_decimal(value):
+    return None if value is None else Decimal(str(value))
+
+
+def manifest_lines(manifest, moved):
+    """Итоги перенесенных скупок по (адрес, проба)."""
+    lines = {}
+    for address_id, gold_standard, *values in moved:
+        line = lines.get((address_id, gold_standard))
+        if line is None:
+            line = lines[(address_id, gold_standard)] = HarvestManifestLine(
+                manifest=manifest, id_address_id=address_id, gold_standard=gold_standard
+            )
+        line.items += 1
+        for field, value in zip(METAL_SUM_FIELDS, map(to_decimal, values)):
+            if value is not None:
+                setattr(line, field, (getattr(line, field) or 0) + value)
+    return sorted(
+        lines.values(), key=lambda line: (line.id_address_id, line.gold_standard)
+    )
+
+
+def stock_deltas(manifest, lines):
+    """Приращения остатков металла: итоги манифеста переходят между статусами."""
+    deltas = {}
+    for line in lines:
+        values = {field: getattr(line, field) for field in METAL_SUM_FIELDS}
+        for status, sign in ((manifest.from_status, -1), (manifest.to_status, 1)):
+            key = (line.id_address_id, line.gold_standard, status)
+            MetalStock.add_delta(deltas, key, line.items, values, sign)
+    return deltas
+
+
+def collect_harvest(
+    address_ids, from_status=LocationStatusChoices.LOCAL, author=None, purchase_ids=None
+):
+    """
+    Собирает скупки адресов маршрута: переводит их в следующий статус
+    (HARVEST_TRANSITIONS) и записывает манифест с итогами по адресам и пробам.
+
+    Скупки переводятся одним UPDATE, итоги считаются по его RETURNING в той
+    же транзакции, поэтому сбор с любого числа адресов - пять запросов
+    независимо от количества скупок (включая обновление MetalStock).
+
+    :param address_ids: id адресов маршрута.
+    :param from_status: текущий статус собираемых скупок.
+    :param author: сотрудник, выполнивший сбор.
+    :param purchase_ids: id выбранных скупок или None - все скупки адресов.
+    :return: HarvestManifest или None, если переводить было нечего.
+    """
+    if from_status not in HARVEST_TRANSITIONS:
+        raise ValueError(f"Скупки в статусе {from_status} не собираются.")
+    if not address_ids or purchase_ids == []:
+        return None
+
+    with transaction.atomic():
+        manifest = HarvestManifest.objects.create(
+            author=author,
+            from_status=from_status,
+            to_status=HARVEST_TRANSITIONS[from_status],
+        )
+        moved = move_purchases(manifest, list(address_ids), purchase_ids)
+        if not moved:
+            transaction.set_rollback(True)
+            return None
+
+        lines = HarvestManifestLine.objects.bulk_create(manifest_lines(manifest, moved))
+        MetalStock.apply_deltas(stock_deltas(manifest, lines))
+        address_versions.bump_on_commit(line.id_address_id for line in lines)
+        manifest.items = len(moved)
+        for field in ("weight_clean", "weight_fact", "sum"):
+            setattr(manifest, field, sum(getattr(line, field) for line in lines))
+        manifest.save(update_fields=["items", "weight_clean", "weight_fact", "sum"])
+    return manifest
+
+
+def rebuild_metal_stock():
+    """
+    Пересчитывает остатки металла по всем скупкам.
+
+    :return: int
+        Количество строк MetalStock.
+    """
+    totals = (
+        SecretRoom.objects.values("id_address_id", "gold_standard", "status")
+        .annotate(
+            items=Count("id"), **{field: Sum(field) for field in METAL_SUM_FIELDS}
+        )
+        .order_by()
+    )
+    stock = [
+        MetalStock(
+            **{
+                **row,
+                **{field: row[field] or 0 for field in METAL_SUM_FIELDS},
+            }
+        )
+        for row in totals
+    ]
+    with transaction.atomic():
+        MetalStock.objects.all().delete()
+        MetalStock.objects.bulk_create(stock)
+    return len(stock)
+
+
+# Колонки таблицы остатков металла в филиалах.
+METAL_STOCK_COLUMNS = [
+    ("address", "Адрес"),
+    ("status", "Статус скупки"),
+    ("gold_standard", "Проба"),
+    ("items", "Скупок"),
+    ("weight_clean", "Чистый вес"),
+    ("weight_fact", "Фактический вес"),
+    ("sum", "Выдано денег"),
+    ("converter585", "В 585 пробе"),
+    ("converter925", "В 925 пробе"),
+]
+
+
+def metal_stock_rows(
+    statuses=(LocationStatusChoices.LOCAL, LocationStatusChoices.GATHER)
+):
+    """Остатки металла по адресам (строки MetalStock, без суммирования скупок)."""
+    stock = MetalStock.objects.filter(status__in=statuses, items__gt=0).values(
+        "id_address_id", *[key for key, _ in METAL_STOCK_COLUMNS[1:]]
+    )
+    for row in stock:
+        row["address"] = address_directory.get(row["id_address_id"])
+        yield row
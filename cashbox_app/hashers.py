@@ -0,0 +1,46 @@
+"""
+Хешер паролей с настраиваемым числом итераций PBKDF2.
+
+Хеширование пароля - самая затратная по процессору операция приложения,
+а в начале смены сотрудники входят почти одновременно. Число итераций
+задается настройкой PASSWORD_HASH_ITERATIONS (не меньше значения Django),
+количество воркеров для него подбирается командой bench_login. Имя
+алгоритма совпадает со стандартным pbkdf2_sha256, поэтому существующие
+хеши проверяются этим же хешером, а хеш с другим числом итераций
+пересчитывается при следующем входе (check_password, must_update).
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.checks import Error, Tags, register
+
+# Меньше итераций, чем по умолчанию в Django, не допускается: хеш с другим
+# числом итераций пересчитывается при входе, и заниженная настройка
+# ослабила бы пароли всех пользователей.
+MIN_ITERATIONS = PBKDF2PasswordHasher.iterations
+
+
+def configured_iterations():
+    return getattr(settings, "PASSWORD_HASH_ITERATIONS", None) or MIN_ITERATIONS
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 с числом итераций из настройки PASSWORD_HASH_ITERATIONS."""
+
+    iterations = max(configured_iterations(), MIN_ITERATIONS)
+
+
+@register(Tags.security)
+def check_password_hash_iterations(app_configs, **kwargs):
+    """Заниженное PASSWORD_HASH_ITERATIONS - ошибка конфигурации."""
+    if configured_iterations() >= MIN_ITERATIONS:
+        return []
+    return [
+        Error(
+            f"PASSWORD_HASH_ITERATIONS={configured_iterations()} меньше "
+            f"{MIN_ITERATIONS} (значение Django по умолчанию).",
+            hint="Увеличьте число воркеров вместо снижения стоимости хеша "
+            "(см. команду bench_login).",
+            id="cashbox_app.E001",
+        )
+    ]
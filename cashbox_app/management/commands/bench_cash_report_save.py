@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from cashbox_app.forms import MultiCashReportForm
+from cashbox_app.models import Address, CashRegisterChoices, CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет количество запросов и время MultiCashReportForm.save(). "
+        "Все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=50, help="Количество сохранений."
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+
+        with transaction.atomic():
+            address = Address.objects.create(city="bench", street="bench", home="0")
+            author = CustomUser.objects.create(username="bench_cash_report_save")
+
+            data = {
+                "author": author.pk,
+                "id_address": address.pk,
+                "status": "OPEN",
+            }
+            for register in CashRegisterChoices:
+                suffix = register.value.lower()
+                data[f"cas_register_{suffix}"] = register.value
+                data[f"cash_balance_beginning_{suffix}"] = "1000.00"
+                data[f"introduced_{suffix}"] = "10.00"
+                data[f"interest_return_{suffix}"] = "5.00"
+                data[f"loans_issued_{suffix}"] = "3.00"
+                data[f"used_farming_{suffix}"] = "2.00"
+                data[f"boss_took_it_{suffix}"] = "1.00"
+
+            results = {}
+            for name, count in (("create", 1), ("update", iterations)):
+                queries = 0
+                elapsed = 0.0
+                for _ in range(count):
+                    form = MultiCashReportForm(data)
+                    form.is_valid()
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        form.save()
+                        elapsed += time.perf_counter() - started
+                    queries += len(captured)
+                results[name] = (queries / count, elapsed / count * 1000)
+
+            transaction.set_rollback(True)
+
+        for name, (queries, ms) in results.items():
+            self.stdout.write(f"{name}: {queries:.1f} запросов, {ms:.2f} мс на сохранение")
@@ -0,0 +1,100 @@
+import math
+import time
+from unittest import mock
+
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from cashbox_app.hashers import MIN_ITERATIONS, TunablePBKDF2PasswordHasher
+from cashbox_app.models import CustomUser
+
+PASSWORD = "bench_login_password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время входа и число хеширований пароля на вход, а также "
+        "количество воркеров, нужное для пикового потока входов при разном "
+        "числе итераций PBKDF2. "
+        "Все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--logins", type=int, default=10, help="Количество входов."
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=2.0,
+            help="Входов в секунду в пик (начало смены).",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            nargs="*",
+            help="Варианты числа итераций PBKDF2 не меньше значения Django "
+            "(по умолчанию - текущее и двойное).",
+        )
+
+    def handle(self, *args, **options):
+        logins = options["logins"]
+        rate = options["rate"]
+        variants = options["iterations"] or [
+            TunablePBKDF2PasswordHasher.iterations,
+            TunablePBKDF2PasswordHasher.iterations * 2,
+        ]
+        too_low = [value for value in variants if value < MIN_ITERATIONS]
+        if too_low:
+            raise CommandError(
+                f"Число итераций меньше {MIN_ITERATIONS} не допускается: "
+                f"{', '.join(map(str, too_low))}."
+            )
+
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username="bench_login", password=PASSWORD
+            )
+            hashes = elapsed = 0
+            verify = TunablePBKDF2PasswordHasher.verify
+            for _ in range(logins):
+                client = Client()
+                with mock.patch.object(
+                    TunablePBKDF2PasswordHasher,
+                    "verify",
+                    autospec=True,
+                    side_effect=verify,
+                ) as counter:
+                    started = time.perf_counter()
+                    response = client.post(
+                        "/login/", {"username": user.username, "password": PASSWORD}
+                    )
+                    elapsed += time.perf_counter() - started
+                if response.status_code != 302:
+                    self.stderr.write(f"Вход не выполнен: код {response.status_code}")
+                    return
+                hashes += counter.call_count
+                client.logout()
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"вход: {elapsed / logins * 1000:.1f} мс, "
+            f"{hashes / logins:.1f} хеширований пароля на вход"
+        )
+
+        hasher = get_hasher()
+        salt = hasher.salt()
+        for iterations in variants:
+            started = time.perf_counter()
+            hasher.encode(PASSWORD, salt, iterations=iterations)
+            seconds = time.perf_counter() - started
+            mark = " (текущее)" if iterations == hasher.iterations else ""
+            # Воркер занят хешем seconds секунд на вход.
+            workers = max(1, math.ceil(rate * seconds))
+            self.stdout.write(
+                f"{iterations} итераций{mark}: {seconds * 1000:.1f} мс на хеш, "
+                f"до {1 / seconds:.1f} входов/с на воркер, "
+                f"для {rate:g} входов/с нужно воркеров: {workers}"
+            )
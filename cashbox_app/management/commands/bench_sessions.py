@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from cashbox_app.models import Address, CustomUser
+
+# Режимы хранения сессий: название, SESSION_ENGINE, SESSION_SAVE_EVERY_REQUEST.
+MODES = [
+    ("db, запись на каждом запросе", "django.contrib.sessions.backends.db", True),
+    ("db", "django.contrib.sessions.backends.db", False),
+    ("cached_db", "django.contrib.sessions.backends.cached_db", False),
+    ("signed_cookies", "django.contrib.sessions.backends.signed_cookies", False),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет чтения и записи сессии на один просмотр страницы "
+        "для разных хранилищ сессий. Все изменения в БД откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--views", type=int, default=50, help="Количество просмотров страницы."
+        )
+        parser.add_argument(
+            "--url", default="/secret_room/", help="Страница сотрудника филиала."
+        )
+
+    def handle(self, *args, **options):
+        views = options["views"]
+
+        with transaction.atomic():
+            address = Address.objects.create(city="bench", street="bench", home="0")
+            user = CustomUser.objects.create(username="bench_sessions")
+
+            results = []
+            for name, engine, save_every_request in MODES:
+                with override_settings(
+                    SESSION_ENGINE=engine,
+                    SESSION_SAVE_EVERY_REQUEST=save_every_request,
+                ):
+                    results.append(
+                        (name, *self.measure(user, address, options["url"], views))
+                    )
+
+            transaction.set_rollback(True)
+
+        for name, reads, writes, saves in results:
+            self.stdout.write(
+                f"{name}: на просмотр {reads / views:.2f} чтений и "
+                f"{writes / views:.2f} записей django_session, "
+                f"{saves / views:.2f} сохранений сессии"
+            )
+
+    def measure(self, user, address, url, views):
+        """
+        :return: tuple
+            (запросы SELECT к django_session, запросы записи в django_session,
+            ответы, в которых сессия сохранялась и cookie отправлялась заново).
+        """
+        client = Client()
+        client.force_login(user)
+        session = client.session
+        session["selected_address_id"] = address.pk
+        session.save()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        # Первый просмотр записывает в сессию CSRF-токен и время продления.
+        client.get(url)
+
+        reads = writes = saves = 0
+        for _ in range(views):
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url)
+            for query in captured:
+                if "django_session" in query["sql"]:
+                    if query["sql"].lstrip().upper().startswith("SELECT"):
+                        reads += 1
+                    else:
+                        writes += 1
+            saves += settings.SESSION_COOKIE_NAME in response.cookies
+
+        client.logout()
+        return reads, writes, saves
@@ -0,0 +1,76 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Тяжелые библиотеки, которые не должны загружаться в веб-воркер при старте.
+HEAVY_MODULES = ("pandas", "numpy")
+
+# Выполняется в отдельном процессе, чтобы замерить "холодный" импорт.
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+import django
+from django.db import connection
+
+django.setup()
+connection.force_debug_cursor = True
+started = time.perf_counter()
+import {urlconf}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "queries": [q["sql"] for q in connection.queries],
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy_modules": [name for name in {heavy_modules!r} if name in sys.modules],
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время импорта ROOT_URLCONF в новом процессе, пиковую память "
+        "процесса и количество запросов к БД во время импорта. Завершается с "
+        "ошибкой, если при импорте выполняются запросы или загружаются "
+        "тяжелые библиотеки (pandas, numpy)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runs", type=int, default=3, help="Количество запусков процесса."
+        )
+
+    def handle(self, *args, **options):
+        script = STARTUP_SCRIPT.format(
+            urlconf=settings.ROOT_URLCONF, heavy_modules=HEAVY_MODULES
+        )
+
+        results = []
+        for _ in range(options["runs"]):
+            completed = subprocess.run(
+                [sys.executable, "-c", script],
+                capture_output=True,
+                text=True,
+                cwd=settings.BASE_DIR,
+            )
+            if completed.returncode != 0:
+                raise CommandError(completed.stderr)
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+        best = min(result["seconds"] for result in results)
+        max_rss_kb = max(result["max_rss_kb"] for result in results)
+        queries = results[-1]["queries"]
+        heavy_modules = results[-1]["heavy_modules"]
+        self.stdout.write(f"Импорт {settings.ROOT_URLCONF}: {best * 1000:.0f} мс")
+        self.stdout.write(f"Пиковая память процесса: {max_rss_kb / 1024:.1f} МБ")
+        self.stdout.write(f"Запросов к БД при импорте: {len(queries)}")
+
+        if queries:
+            for sql in queries:
+                self.stdout.write(f"  {sql}")
+            raise CommandError("При импорте модулей выполняются запросы к БД.")
+        if heavy_modules:
+            raise CommandError(
+                f"При импорте загружаются тяжелые библиотеки: {', '.join(heavy_modules)}."
+            )
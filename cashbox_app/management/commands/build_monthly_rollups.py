@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cashbox_app.models import CashReport, MonthlyRollup
+from cashbox_app.rollups import freeze_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Замораживает итоги прошедших месяцев, все отчеты которых закрыты "
+        "(таблица monthly_rollup). Уже замороженные месяцы пропускаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month",
+            help="Пересчитать итоги одного месяца (ГГГГ-ММ), даже если они уже есть.",
+        )
+
+    def handle(self, *args, **options):
+        if options["month"]:
+            try:
+                months = [datetime.strptime(options["month"], "%Y-%m").date()]
+            except ValueError:
+                raise CommandError("Месяц указывается в формате ГГГГ-ММ.")
+        else:
+            frozen = set(
+                MonthlyRollup.objects.values_list("month", flat=True).distinct()
+            )
+            months = [
+                month
+                for month in CashReport.objects.dates("shift_day", "month")
+                if month not in frozen
+            ]
+
+        for month in months:
+            if freeze_month(month):
+                self.stdout.write(f"{month:%m.%Y}: итоги сохранены.")
+            else:
+                self.stdout.write(f"{month:%m.%Y}: месяц не закрыт, пропущен.")
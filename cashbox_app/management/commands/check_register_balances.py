@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cashbox_app.balances import check_register_balances
+
+
+class Command(BaseCommand):
+    help = "Сверяет текущие балансы касс (RegisterBalance) с историей отчетов."
+
+    def handle(self, *args, **options):
+        mismatches = check_register_balances()
+        for mismatch in mismatches:
+            self.stdout.write(
+                f"Адрес {mismatch['id_address']}, касса {mismatch['cas_register']}: "
+                f"снимок {mismatch['snapshot']}, история {mismatch['history']}"
+            )
+
+        if mismatches:
+            raise CommandError(
+                f"Найдено расхождений: {len(mismatches)}. "
+                f"Выполните rebuild_register_balances."
+            )
+
+        self.stdout.write(self.style.SUCCESS("Расхождений не найдено."))
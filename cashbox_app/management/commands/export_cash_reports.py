@@ -0,0 +1,47 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cashbox_app.reports import CASH_REPORT_EXPORT_COLUMNS, cash_report_export_rows
+from cashbox_app.tables import ReportTable
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает кассовые отчеты за период в CSV (в файл или в stdout). "
+        "Отчеты читаются из БД порциями, память не зависит от длины периода."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from", dest="date_from", required=True, help="Первый день (ГГГГ-ММ-ДД)."
+        )
+        parser.add_argument(
+            "--to", dest="date_to", required=True, help="Последний день (ГГГГ-ММ-ДД)."
+        )
+        parser.add_argument(
+            "--address", type=int, action="append", help="id адреса (можно несколько)."
+        )
+        parser.add_argument("--output", help="Файл CSV. По умолчанию stdout.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000, help="Размер порции чтения из БД."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options["date_from"])
+            date_to = date.fromisoformat(options["date_to"])
+        except ValueError:
+            raise CommandError("Даты указываются в формате ГГГГ-ММ-ДД.")
+
+        rows = cash_report_export_rows(
+            date_from, date_to, options["address"], chunk_size=options["chunk_size"]
+        )
+        table = ReportTable(CASH_REPORT_EXPORT_COLUMNS, rows)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as file:
+                table.write_csv(file)
+        else:
+            table.write_csv(sys.stdout)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from cashbox_app.balances import rebuild_daily_register_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает итоги касс за день и нарастающие итоги "
+        "(DailyRegisterTotals) по истории отчетов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000, help="Размер порции."
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_daily_register_totals(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Записано дней касс: {count}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from cashbox_app.harvest import rebuild_metal_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает остатки металла по адресам, пробам и статусам "
+        "(MetalStock) по всем скупкам."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_metal_stock()
+        self.stdout.write(self.style.SUCCESS(f"Записано строк остатков: {count}"))
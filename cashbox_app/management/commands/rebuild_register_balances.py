@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cashbox_app.balances import rebuild_register_balances
+
+
+class Command(BaseCommand):
+    help = "Пересобирает текущие балансы касс (RegisterBalance) по истории отчетов."
+
+    def handle(self, *args, **options):
+        count = rebuild_register_balances()
+        self.stdout.write(self.style.SUCCESS(f"Записано балансов касс: {count}"))
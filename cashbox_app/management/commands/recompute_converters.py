@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from cashbox_app.models import METAL_SUM_FIELDS, MetalStock, SecretRoom
+from cashbox_app.versions import address_versions
+from functions import probe_converter_many
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает converter585/converter925 всех скупок порциями "
+        "(постранично по id) и сохраняет изменения через bulk_update, "
+        "обновляя остатки металла (MetalStock)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000, help="Размер порции."
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать расхождения, ничего не записывать.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        checked = 0
+        changed = 0
+        last_id = 0
+
+        while True:
+            # Порция читается, пересчитывается и записывается в одной
+            # транзакции: приращения остатков считаются по тем же значениям,
+            # которые перезаписываются.
+            with transaction.atomic():
+                purchases = (
+                    SecretRoom.objects.filter(id__gt=last_id)
+                    .order_by("id")
+                    .only(
+                        "id", "id_address", "status", "gold_standard", *METAL_SUM_FIELDS
+                    )
+                )
+                if not options["dry_run"]:
+                    purchases = purchases.select_for_update()
+                chunk = list(purchases[:chunk_size])
+                if not chunk:
+                    break
+
+                converter585, converter925 = probe_converter_many(
+                    [purchase.weight_clean for purchase in chunk],
+                    [purchase.gold_standard for purchase in chunk],
+                )
+
+                to_update = []
+                new_values = []
+                for purchase, values in zip(chunk, zip(converter585, converter925)):
+                    if (purchase.converter585, purchase.converter925) != values:
+                        to_update.append(purchase)
+                        new_values.append(values)
+
+                if to_update and not options["dry_run"]:
+                    # Остатки металла: старые конвертеры вычитаются, новые прибавляются.
+                    deltas = MetalStock.purchase_deltas(to_update, sign=-1)
+                    for purchase, (value585, value925) in zip(to_update, new_values):
+                        purchase.converter585 = value585
+                        purchase.converter925 = value925
+                        purchase.updated_at = now()
+                    MetalStock.purchase_deltas(to_update, deltas=deltas)
+
+                    SecretRoom.objects.bulk_update(
+                        to_update, ["converter585", "converter925", "updated_at"]
+                    )
+                    MetalStock.apply_deltas(deltas)
+                    address_versions.bump_on_commit(
+                        purchase.id_address_id for purchase in to_update
+                    )
+
+            checked += len(chunk)
+            changed += len(to_update)
+            last_id = chunk[-1].id
+            self.stdout.write(f"Проверено: {checked}, изменено: {changed}")
+
+        action = "Требуют пересчета" if options["dry_run"] else "Пересчитано"
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} скупок: {changed} из {checked}.")
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cashbox_app.models import BalanceBreak
+from cashbox_app.reconciliation import run_reconciliation
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет, что остаток на начало каждой смены равен остатку на конец "
+        "предыдущей смены той же кассы адреса (LAG() по cash_report). "
+        "По умолчанию проверяются только отчеты, измененные после прошлой сверки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Проверить всю историю."
+        )
+        parser.add_argument(
+            "--fail-on-breaks",
+            action="store_true",
+            help="Завершиться с ошибкой, если есть разрывы.",
+        )
+
+    def handle(self, *args, **options):
+        run = run_reconciliation(full=options["full"])
+        if run.full:
+            self.stdout.write("Проверена вся история.")
+        else:
+            self.stdout.write(
+                f"Проверены отчеты, измененные после {run.checked_since:%d.%m.%Y %H:%M:%S}."
+            )
+        self.stdout.write(
+            f"Проверено касс: {run.checked_registers}, новых разрывов: {run.breaks_found}"
+        )
+
+        breaks = BalanceBreak.objects.select_related("id_address")
+        for item in breaks:
+            self.stdout.write(
+                f"{item.id_address}, {item.cas_register}, {item.shift_day:%d.%m.%Y}: "
+                f"на начало {item.actual}, на конец {item.previous_day:%d.%m.%Y} "
+                f"{item.expected}"
+            )
+
+        if breaks and options["fail_on_breaks"]:
+            raise CommandError(f"Найдено разрывов остатков: {len(breaks)}.")
+        if not breaks:
+            self.stdout.write(self.style.SUCCESS("Разрывов не найдено."))
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def fill_register_balances(apps, schema_editor):
+    """Заполняет балансы касс последними отчетами из истории."""
+    CashReport = apps.get_model("cashbox_app", "CashReport")
+    RegisterBalance = apps.get_model("cashbox_app", "RegisterBalance")
+
+    latest_id = (
+        CashReport.objects.filter(
+            id_address=OuterRef("id_address"), cas_register=OuterRef("cas_register")
+        )
+        .order_by(F("updated_at").desc(nulls_last=True), "-id")
+        .values("id")[:1]
+    )
+    RegisterBalance.objects.bulk_create(
+        [
+            RegisterBalance(
+                id_address_id=report.id_address_id,
+                cas_register=report.cas_register,
+                cash_register_end=report.cash_register_end,
+                report_id=report.id,
+                updated_at=report.updated_at,
+            )
+            for report in CashReport.objects.filter(id=Subquery(latest_id)).order_by()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0002_alter_goldstandard_shift_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegisterBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cas_register', models.CharField(choices=[('BUYING_UP', 'Скупка'), ('PAWNSHOP', 'Ломбард'), ('TECHNIQUE', 'Техника')], max_length=10)),
+                ('cash_register_end', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Остаток на конец дня')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата изменения отчета')),
+                ('id_address', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cashbox_app.address', verbose_name='Адрес')),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='cashbox_app.cashreport', verbose_name='Последний отчет')),
+            ],
+            options={
+                'verbose_name': 'Баланс кассы',
+                'verbose_name_plural': 'Балансы касс',
+                'db_table': 'register_balance',
+                'unique_together': {('id_address', 'cas_register')},
+            },
+        ),
+        migrations.RunPython(fill_register_balances, migrations.RunPython.noop),
+    ]
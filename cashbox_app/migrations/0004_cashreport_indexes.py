@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0003_registerbalance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cashreport',
+            index=models.Index(fields=['id_address', 'cas_register', '-updated_at'], name='cash_report_addr_reg_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashreport',
+            index=models.Index(fields=['cas_register', 'updated_at'], name='cash_report_reg_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashreport',
+            index=models.Index(condition=models.Q(('status', 'OPEN')), fields=['id_address', 'author'], name='cash_report_open_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:22
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0004_cashreport_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='cashreport',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='cashreport',
+            name='shift_day',
+            field=models.DateField(default=datetime.date.today, verbose_name='День смены'),
+        ),
+    ]
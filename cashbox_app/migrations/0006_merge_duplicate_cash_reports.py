@@ -0,0 +1,101 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:22
+
+from django.db import migrations
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+
+# Поля, по которым дубли должны совпадать, чтобы их можно было объединить.
+DATA_FIELDS = (
+    "cash_balance_beginning",
+    "introduced",
+    "interest_return",
+    "loans_issued",
+    "used_farming",
+    "boss_took_it",
+    "cash_register_end",
+    "author_id",
+    "status",
+)
+
+
+def report_data(report):
+    return tuple(getattr(report, field) for field in DATA_FIELDS)
+
+
+def fill_shift_day_and_merge_duplicates(apps, schema_editor):
+    """
+    Заполняет день смены и объединяет дубли отчетов за один день.
+
+    Объединяются только дубли с одинаковыми суммами, автором и статусом
+    (повторная отправка той же формы): остается последний по updated_at
+    отчет с самым ранним shift_date (время открытия смены), снимки балансов
+    переводятся на него. Если отчеты кассы за день различаются, миграция
+    прерывается со списком id: какой из них верный, решает человек.
+    """
+    CashReport = apps.get_model("cashbox_app", "CashReport")
+    RegisterBalance = apps.get_model("cashbox_app", "RegisterBalance")
+
+    CashReport.objects.update(shift_day=TruncDate("shift_date"))
+
+    duplicates = (
+        CashReport.objects.values("id_address", "cas_register", "shift_day")
+        .annotate(reports_count=Count("id"))
+        .filter(reports_count__gt=1)
+        .order_by()
+    )
+
+    groups = []
+    conflicts = []
+    for group in duplicates:
+        reports = list(
+            CashReport.objects.filter(
+                id_address=group["id_address"],
+                cas_register=group["cas_register"],
+                shift_day=group["shift_day"],
+            ).order_by(F("updated_at").asc(nulls_first=True), "id")
+        )
+        if len({report_data(report) for report in reports}) > 1:
+            conflicts.append(
+                f"адрес {group['id_address']}, касса {group['cas_register']}, "
+                f"{group['shift_day']}: id {', '.join(str(r.id) for r in reports)}"
+            )
+        groups.append(reports)
+
+    if conflicts:
+        raise RuntimeError(
+            "Разные кассовые отчеты за один день одной кассы. Оставьте по одному "
+            "отчету в каждой группе и повторите миграцию:\n" + "\n".join(conflicts)
+        )
+
+    merged = 0
+    for reports in groups:
+        keep = reports[-1]
+        duplicate_ids = [report.id for report in reports[:-1]]
+
+        keep.shift_date = min(report.shift_date for report in reports)
+        keep.save(update_fields=["shift_date"])
+
+        RegisterBalance.objects.filter(report_id__in=duplicate_ids).update(
+            report_id=keep.id,
+            cash_register_end=keep.cash_register_end,
+            updated_at=keep.updated_at,
+        )
+        CashReport.objects.filter(id__in=duplicate_ids).delete()
+        merged += len(duplicate_ids)
+
+    if merged:
+        print(f"\nУдалено повторов кассовых отчетов с теми же данными: {merged}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0005_cashreport_shift_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_shift_day_and_merge_duplicates, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0006_merge_duplicate_cash_reports'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='cashreport',
+            constraint=models.UniqueConstraint(fields=('id_address', 'cas_register', 'shift_day'), name='cash_report_shift_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:28
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def merge_duplicate_schedules(apps, schema_editor):
+    """Оставляет по одному (последнему добавленному) расписанию на день недели адреса."""
+    Schedule = apps.get_model("cashbox_app", "Schedule")
+
+    schedules = Schedule.objects.filter(address__isnull=False)
+    keep_ids = (
+        schedules.values("address", "day_of_week")
+        .annotate(keep_id=Max("id"))
+        .values_list("keep_id", flat=True)
+    )
+    schedules.exclude(id__in=list(keep_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0007_cashreport_shift_uniq'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_schedules, migrations.RunPython.noop),
+    ]
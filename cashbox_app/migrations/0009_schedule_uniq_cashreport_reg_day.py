@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0008_merge_duplicate_schedules'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cashreport',
+            index=models.Index(fields=['cas_register', 'shift_day'], name='cash_report_reg_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('address', 'day_of_week'), name='schedule_address_day_uniq'),
+        ),
+    ]
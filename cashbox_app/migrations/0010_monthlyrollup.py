@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:33
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0009_schedule_uniq_cashreport_reg_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц (первое число)')),
+                ('attendance', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Посещаемость')),
+                ('schedule', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Соблюдение расписания')),
+                ('flows', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Обороты по кассам')),
+                ('created_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчета')),
+                ('id_address', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cashbox_app.address', verbose_name='Адрес')),
+            ],
+            options={
+                'verbose_name': 'Итоги месяца',
+                'verbose_name_plural': 'Итоги месяцев',
+                'db_table': 'monthly_rollup',
+                'unique_together': {('month', 'id_address')},
+            },
+        ),
+    ]
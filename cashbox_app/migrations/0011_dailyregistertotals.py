@@ -0,0 +1,82 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FLOW_FIELDS = (
+    "introduced",
+    "interest_return",
+    "loans_issued",
+    "used_farming",
+    "boss_took_it",
+)
+
+
+def fill_daily_register_totals(apps, schema_editor):
+    """Заполняет итоги касс за день и нарастающие итоги по истории отчетов."""
+    CashReport = apps.get_model("cashbox_app", "CashReport")
+    DailyRegisterTotals = apps.get_model("cashbox_app", "DailyRegisterTotals")
+
+    rows = []
+    pair = None
+    for report in CashReport.objects.order_by(
+        "id_address", "cas_register", "shift_day"
+    ).iterator(chunk_size=2000):
+        if (report.id_address_id, report.cas_register) != pair:
+            pair = (report.id_address_id, report.cas_register)
+            totals = {field: 0 for field in FLOW_FIELDS}
+        row = DailyRegisterTotals(
+            day=report.shift_day,
+            id_address_id=report.id_address_id,
+            cas_register=report.cas_register,
+            cash_balance_beginning=report.cash_balance_beginning,
+            cash_register_end=report.cash_register_end,
+        )
+        for field in FLOW_FIELDS:
+            value = getattr(report, field) or 0
+            totals[field] += value
+            setattr(row, field, value)
+            setattr(row, f"cum_{field}", totals[field])
+        rows.append(row)
+        if len(rows) >= 2000:
+            DailyRegisterTotals.objects.bulk_create(rows)
+            rows = []
+    DailyRegisterTotals.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0010_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRegisterTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('cas_register', models.CharField(choices=[('BUYING_UP', 'Скупка'), ('PAWNSHOP', 'Ломбард'), ('TECHNIQUE', 'Техника')], max_length=10)),
+                ('cash_balance_beginning', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Остаток на начало дня')),
+                ('cash_register_end', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Остаток на конец дня')),
+                ('introduced', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Внесено в кассу')),
+                ('interest_return', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Проценты и возврат займов')),
+                ('loans_issued', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выдано займов')),
+                ('used_farming', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='На хоз. нужды, оплату труда')),
+                ('boss_took_it', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выемка руководителем')),
+                ('cum_introduced', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Внесено, нарастающим итогом')),
+                ('cum_interest_return', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Проценты и возврат, нарастающим итогом')),
+                ('cum_loans_issued', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выдано займов, нарастающим итогом')),
+                ('cum_used_farming', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Хоз. нужды, нарастающим итогом')),
+                ('cum_boss_took_it', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выемка, нарастающим итогом')),
+                ('id_address', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cashbox_app.address', verbose_name='Адрес')),
+            ],
+            options={
+                'verbose_name': 'Итоги кассы за день',
+                'verbose_name_plural': 'Итоги касс за день',
+                'db_table': 'daily_register_totals',
+                'unique_together': {('id_address', 'cas_register', 'day')},
+            },
+        ),
+        migrations.RunPython(fill_daily_register_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0011_dailyregistertotals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Начало')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание')),
+                ('full', models.BooleanField(default=False, verbose_name='Вся история')),
+                ('checked_since', models.DateTimeField(blank=True, null=True, verbose_name='Проверены отчеты, измененные после')),
+                ('checked_registers', models.PositiveIntegerField(default=0, verbose_name='Проверено касс')),
+                ('breaks_found', models.PositiveIntegerField(default=0, verbose_name='Найдено разрывов')),
+            ],
+            options={
+                'verbose_name': 'Сверка остатков',
+                'verbose_name_plural': 'Сверки остатков',
+                'db_table': 'reconciliation_run',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceBreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cas_register', models.CharField(choices=[('BUYING_UP', 'Скупка'), ('PAWNSHOP', 'Ломбард'), ('TECHNIQUE', 'Техника')], max_length=10)),
+                ('shift_day', models.DateField(verbose_name='День смены')),
+                ('previous_day', models.DateField(verbose_name='День предыдущей смены')),
+                ('expected', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Остаток на конец предыдущей смены')),
+                ('actual', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Остаток на начало смены')),
+                ('id_address', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cashbox_app.address', verbose_name='Адрес')),
+                ('previous_report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cashbox_app.cashreport', verbose_name='Предыдущий отчет')),
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance_break', to='cashbox_app.cashreport', verbose_name='Отчет')),
+                ('run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='cashbox_app.reconciliationrun', verbose_name='Сверка')),
+            ],
+            options={
+                'verbose_name': 'Разрыв остатков',
+                'verbose_name_plural': 'Разрывы остатков',
+                'db_table': 'balance_break',
+                'ordering': ['id_address', 'cas_register', 'shift_day'],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0012_balance_reconciliation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='secretroom',
+            index=models.Index(fields=['status', '-shift_date', '-id'], name='secret_room_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='secretroom',
+            index=models.Index(fields=['id_address', '-shift_date', '-id'], name='secret_room_addr_date_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0013_secretroom_harvest_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HarvestManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата сбора')),
+                ('from_status', models.CharField(choices=[('В ФИЛИАЛЕ', 'Local'), ('СОБРАНО', 'Gather'), ('ВЫДАНО', 'Issued')], max_length=15, verbose_name='Из статуса')),
+                ('to_status', models.CharField(choices=[('В ФИЛИАЛЕ', 'Local'), ('СОБРАНО', 'Gather'), ('ВЫДАНО', 'Issued')], max_length=15, verbose_name='В статус')),
+                ('items', models.PositiveIntegerField(default=0, verbose_name='Скупок')),
+                ('weight_clean', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Чистый вес')),
+                ('weight_fact', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Фактический вес')),
+                ('sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выдано денег')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Сотрудник')),
+            ],
+            options={
+                'verbose_name': 'Сбор урожая',
+                'verbose_name_plural': 'Сборы урожая',
+                'db_table': 'harvest_manifest',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='secretroom',
+            name='harvest_manifest',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchases', to='cashbox_app.harvestmanifest', verbose_name='Последний сбор'),
+        ),
+        migrations.CreateModel(
+            name='HarvestManifestLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gold_standard', models.IntegerField(choices=[(750, 'ЗОЛОТО 750'), (585, 'ЗОЛОТО 585'), (500, 'ЗОЛОТО 500'), (375, 'ЗОЛОТО 375'), (925, 'СЕРЕБРО 925'), (875, 'СЕРЕБРО 875')], verbose_name='Проба')),
+                ('items', models.PositiveIntegerField(default=0, verbose_name='Скупок')),
+                ('weight_clean', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Чистый вес')),
+                ('weight_fact', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Фактический вес')),
+                ('sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выдано денег')),
+                ('converter585', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Конвертер 585 проба')),
+                ('converter925', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Конвертер 925 проба')),
+                ('id_address', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cashbox_app.address', verbose_name='Адрес')),
+                ('manifest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='cashbox_app.harvestmanifest', verbose_name='Сбор')),
+            ],
+            options={
+                'verbose_name': 'Итоги сбора по адресу',
+                'verbose_name_plural': 'Итоги сбора по адресам',
+                'db_table': 'harvest_manifest_line',
+                'ordering': ['manifest', 'id_address', 'gold_standard'],
+                'unique_together': {('manifest', 'id_address', 'gold_standard')},
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+METAL_SUM_FIELDS = (
+    "weight_clean",
+    "weight_fact",
+    "sum",
+    "converter585",
+    "converter925",
+)
+
+
+def fill_metal_stock(apps, schema_editor):
+    """Заполняет остатки металла по существующим скупкам."""
+    SecretRoom = apps.get_model("cashbox_app", "SecretRoom")
+    MetalStock = apps.get_model("cashbox_app", "MetalStock")
+
+    totals = (
+        SecretRoom.objects.values("id_address_id", "gold_standard", "status")
+        .annotate(
+            items=Count("id"), **{field: Sum(field) for field in METAL_SUM_FIELDS}
+        )
+        .order_by()
+    )
+    MetalStock.objects.bulk_create(
+        [
+            MetalStock(
+                **{**row, **{field: row[field] or 0 for field in METAL_SUM_FIELDS}}
+            )
+            for row in totals
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0014_harvest_manifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetalStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gold_standard', models.IntegerField(choices=[(750, 'ЗОЛОТО 750'), (585, 'ЗОЛОТО 585'), (500, 'ЗОЛОТО 500'), (375, 'ЗОЛОТО 375'), (925, 'СЕРЕБРО 925'), (875, 'СЕРЕБРО 875')], verbose_name='Проба')),
+                ('status', models.CharField(choices=[('В ФИЛИАЛЕ', 'Local'), ('СОБРАНО', 'Gather'), ('ВЫДАНО', 'Issued')], max_length=15, verbose_name='Статус скупки')),
+                ('items', models.IntegerField(default=0, verbose_name='Скупок')),
+                ('weight_clean', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Чистый вес')),
+                ('weight_fact', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Фактический вес')),
+                ('sum', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выдано денег')),
+                ('converter585', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Конвертер 585 проба')),
+                ('converter925', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Конвертер 925 проба')),
+                ('id_address', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cashbox_app.address', verbose_name='Адрес')),
+            ],
+            options={
+                'verbose_name': 'Остаток металла',
+                'verbose_name_plural': 'Остатки металла',
+                'db_table': 'metal_stock',
+                'ordering': ['id_address', 'status', 'gold_standard'],
+                'unique_together': {('id_address', 'gold_standard', 'status')},
+            },
+        ),
+        migrations.RunPython(fill_metal_stock, migrations.RunPython.noop),
+    ]
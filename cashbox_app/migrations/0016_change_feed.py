@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:48
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    """Дата изменения строк без нее, чтобы они попали в ленту изменений."""
+    CashReport = apps.get_model("cashbox_app", "CashReport")
+    SecretRoom = apps.get_model("cashbox_app", "SecretRoom")
+    Schedule = apps.get_model("cashbox_app", "Schedule")
+
+    CashReport.objects.filter(updated_at__isnull=True).update(updated_at=F("shift_date"))
+    SecretRoom.objects.filter(updated_at__isnull=True).update(updated_at=F("shift_date"))
+    Schedule.objects.filter(updated_at__isnull=True).update(updated_at=datetime.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0015_metalstock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='secretroom',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cashreport',
+            index=models.Index(fields=['updated_at', 'id'], name='cash_report_upd_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='secretroom',
+            index=models.Index(fields=['updated_at', 'id'], name='secret_room_upd_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0016_change_feed'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='monthlyrollup',
+            name='flows',
+        ),
+    ]
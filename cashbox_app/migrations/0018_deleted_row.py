@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashbox_app', '0017_remove_monthlyrollup_flows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(max_length=20, verbose_name='Лента')),
+                ('object_id', models.BigIntegerField(verbose_name='id удаленной строки')),
+                ('address_id', models.BigIntegerField(blank=True, null=True, verbose_name='id адреса')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удаленная строка',
+                'verbose_name_plural': 'Удаленные строки',
+                'db_table': 'deleted_row',
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='deleted_row_del_id_idx')],
+            },
+        ),
+    ]
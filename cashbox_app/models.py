@@ -1,11 +1,21 @@
-from django.db import models
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
-from functions import probe_converter_gold, probe_converter_silver
+from cashbox_app.versions import address_versions
+from functions import (
+    GOLD_STANDARDS,
+    SILVER_STANDARDS,
+    probe_converter_gold,
+    probe_converter_silver,
+)
 
 
 class Address(models.Model):
@@ -55,6 +65,9 @@ class Schedule(models.Model):
     )
     opening_time = models.TimeField(verbose_name="Время открытия")
     closing_time = models.TimeField(verbose_name="Время закрытия")
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата изменения", null=True
+    )
 
     objects = models.Manager()
 
@@ -65,6 +78,13 @@ class Schedule(models.Model):
         db_table = "schedule"
         verbose_name = "Расписание"
         ordering = ["address"]
+        constraints = [
+            # Одно расписание на день недели адреса: отчет соблюдения
+            # расписания присоединяет его к сменам по (адрес, день недели).
+            models.UniqueConstraint(
+                fields=["address", "day_of_week"], name="schedule_address_day_uniq"
+            ),
+        ]
 
 
 class CustomUserManager(BaseUserManager):  # Переопределяю методы для CustomUser
@@ -180,6 +200,7 @@ class CashReport(models.Model):
     """Модель кассового отчета."""
 
     shift_date = models.DateTimeField(auto_now_add=True, verbose_name="Дата смены")
+    shift_day = models.DateField(default=date.today, verbose_name="День смены")
     id_address = models.ForeignKey(
         Address, on_delete=models.CASCADE, verbose_name="Адрес"
     )
@@ -278,23 +299,438 @@ class CashReport(models.Model):
         return "\n".join(fields)
 
     class Meta:
-        unique_together = (
-            "shift_date",
-            "id_address",
-            "cas_register",
-            "cash_balance_beginning",
-            "introduced",
-            "interest_return",
-            "loans_issued",
-            "used_farming",
-            "boss_took_it",
-            "cash_register_end",
-        )
+        constraints = [
+            # Один отчет на кассу адреса за день смены.
+            models.UniqueConstraint(
+                fields=["id_address", "cas_register", "shift_day"],
+                name="cash_report_shift_uniq",
+            ),
+        ]
+        indexes = [
+            # Последний отчет по кассе адреса и отчеты адреса за период.
+            models.Index(
+                fields=["id_address", "cas_register", "-updated_at"],
+                name="cash_report_addr_reg_upd_idx",
+            ),
+            # Отчеты посещаемости: касса и период.
+            models.Index(
+                fields=["cas_register", "updated_at"],
+                name="cash_report_reg_upd_idx",
+            ),
+            # Открытые отчеты сотрудника на адресе.
+            models.Index(
+                fields=["id_address", "author"],
+                condition=models.Q(status="OPEN"),
+                name="cash_report_open_idx",
+            ),
+            # Смены кассы всех адресов за период (отчет по расписанию).
+            models.Index(
+                fields=["cas_register", "shift_day"],
+                name="cash_report_reg_day_idx",
+            ),
+            # Лента изменений для терминалов (cashbox_app.changes).
+            models.Index(
+                fields=["updated_at", "id"],
+                name="cash_report_upd_id_idx",
+            ),
+        ]
         db_table = "cash_report"
         verbose_name = "Кассовый отчет"
         verbose_name_plural = "Кассовый отчеты"
         ordering = ["shift_date"]
 
+    def save(self, *args, **kwargs):
+        # День смены берется из shift_date только при создании отчета: у отчетов,
+        # переданных задним числом через API, shift_date - время записи, и
+        # пересчет при следующем сохранении перенес бы отчет на другой день.
+        if self._state.adding and self.shift_date:
+            self.shift_day = self.shift_date.date()
+        # Снимок баланса кассы обновляется в той же транзакции, что и сам отчет.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            RegisterBalance.update_from_reports([self])
+            DailyRegisterTotals.update_from_reports([self])
+            address_versions.bump_on_commit([self.id_address_id])
+            # Исправление отчета прошлого месяца размораживает итоги месяца.
+            month = self.shift_day.replace(day=1)
+            if month < date.today().replace(day=1):
+                MonthlyRollup.objects.filter(month=month).delete()
+
+
+class RegisterBalance(models.Model):
+    """
+    Текущий баланс кассы по адресу.
+
+    Хранит по одной строке на пару адрес × касса и обновляется при каждой
+    записи CashReport, чтобы не искать последний отчет по всей истории.
+    """
+
+    id_address = models.ForeignKey(
+        Address, on_delete=models.CASCADE, verbose_name="Адрес"
+    )
+    cas_register = models.CharField(
+        max_length=10,
+        choices=CashRegisterChoices.choices,
+    )
+    cash_register_end = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Остаток на конец дня",
+        blank=True,
+        null=True,
+    )
+    report = models.ForeignKey(
+        CashReport,
+        on_delete=models.SET_NULL,
+        verbose_name="Последний отчет",
+        blank=True,
+        null=True,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения отчета", blank=True, null=True
+    )
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.id_address} {self.cas_register}: {self.cash_register_end}"
+
+    class Meta:
+        unique_together = ("id_address", "cas_register")
+        db_table = "register_balance"
+        verbose_name = "Баланс кассы"
+        verbose_name_plural = "Балансы касс"
+
+    @classmethod
+    def update_from_reports(cls, reports):
+        """
+        Записывает в снимок последние по updated_at отчеты.
+
+        Выполняется одним INSERT ... ON CONFLICT, поэтому подходит и для
+        одиночного save(), и для пакетной записи отчетов.
+        """
+        def order_key(report):
+            return report.updated_at or datetime.min, report.pk or 0
+
+        latest = {}
+        for report in reports:
+            key = (report.id_address_id, report.cas_register)
+            if key not in latest or order_key(report) >= order_key(latest[key]):
+                latest[key] = report
+
+        if not latest:
+            return
+
+        cls.objects.bulk_create(
+            [
+                cls(
+                    id_address_id=report.id_address_id,
+                    cas_register=report.cas_register,
+                    cash_register_end=report.cash_register_end,
+                    report_id=report.pk,
+                    updated_at=report.updated_at,
+                )
+                for report in latest.values()
+            ],
+            update_conflicts=True,
+            unique_fields=["id_address", "cas_register"],
+            update_fields=["cash_register_end", "report", "updated_at"],
+        )
+
+    @classmethod
+    def update_after_delete(cls, address_id, register):
+        """
+        Переводит снимок кассы на последний оставшийся отчет после удаления
+        отчета. Если отчетов кассы не осталось, снимок удаляется.
+        """
+        latest = (
+            CashReport.objects.filter(id_address_id=address_id, cas_register=register)
+            .order_by(models.F("updated_at").desc(nulls_last=True), "-id")
+            .first()
+        )
+        if latest is None:
+            cls.objects.filter(id_address_id=address_id, cas_register=register).delete()
+        else:
+            cls.update_from_reports([latest])
+
+
+# Поля отчета, которые складываются за период (обороты кассы).
+FLOW_FIELDS = (
+    "introduced",
+    "interest_return",
+    "loans_issued",
+    "used_farming",
+    "boss_took_it",
+)
+
+
+def flow_field(verbose_name):
+    return models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name=verbose_name
+    )
+
+
+class DailyRegisterTotals(models.Model):
+    """
+    Итоги кассы адреса за день.
+
+    Кроме оборотов дня хранит нарастающие итоги (cum_*) с начала истории,
+    поэтому обороты за любой период считаются по двум строкам на кассу:
+    последней в периоде и последней до него. Обновляется при каждой
+    записи CashReport.
+    """
+
+    day = models.DateField(verbose_name="День")
+    id_address = models.ForeignKey(
+        Address, on_delete=models.CASCADE, verbose_name="Адрес"
+    )
+    cas_register = models.CharField(
+        max_length=10,
+        choices=CashRegisterChoices.choices,
+    )
+    cash_balance_beginning = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Остаток на начало дня",
+        blank=True,
+        null=True,
+    )
+    cash_register_end = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Остаток на конец дня",
+        blank=True,
+        null=True,
+    )
+    introduced = flow_field("Внесено в кассу")
+    interest_return = flow_field("Проценты и возврат займов")
+    loans_issued = flow_field("Выдано займов")
+    used_farming = flow_field("На хоз. нужды, оплату труда")
+    boss_took_it = flow_field("Выемка руководителем")
+    cum_introduced = flow_field("Внесено, нарастающим итогом")
+    cum_interest_return = flow_field("Проценты и возврат, нарастающим итогом")
+    cum_loans_issued = flow_field("Выдано займов, нарастающим итогом")
+    cum_used_farming = flow_field("Хоз. нужды, нарастающим итогом")
+    cum_boss_took_it = flow_field("Выемка, нарастающим итогом")
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.day} {self.id_address} {self.cas_register}"
+
+    class Meta:
+        unique_together = ("id_address", "cas_register", "day")
+        db_table = "daily_register_totals"
+        verbose_name = "Итоги кассы за день"
+        verbose_name_plural = "Итоги касс за день"
+
+    @classmethod
+    def update_from_reports(cls, reports, deleted=()):
+        """
+        Записывает дни отчетов, удаляет дни удаленных отчетов и
+        пересчитывает нарастающие итоги.
+
+        Читает строки касс начиная с самого раннего измененного дня и
+        последнюю строку перед ним одним запросом, пишет одним
+        INSERT ... ON CONFLICT. Для отчета за сегодня это одна-две строки
+        на кассу.
+
+        :param deleted: ключи (id адреса, касса, день) удаленных отчетов.
+        """
+        days = {}
+        for report in reports:
+            days[(report.id_address_id, report.cas_register, report.shift_day)] = report
+        removed = set(deleted) - days.keys()
+        if not days and not removed:
+            return
+
+        first_day = {}
+        for address_id, register, day in [*days, *removed]:
+            key = (address_id, register)
+            first_day[key] = min(day, first_day.get(key, day))
+
+        conditions = models.Q()
+        for (address_id, register), day in first_day.items():
+            pair = cls.objects.filter(id_address_id=address_id, cas_register=register)
+            conditions |= models.Q(
+                id=models.Subquery(pair.filter(day__lt=day).order_by("-day").values("id")[:1])
+            )
+            conditions |= models.Q(
+                id_address_id=address_id, cas_register=register, day__gte=day
+            )
+
+        rows = {}
+        removed_ids = []
+        for row in cls.objects.filter(conditions):
+            if (row.id_address_id, row.cas_register, row.day) in removed:
+                removed_ids.append(row.id)
+                continue
+            rows.setdefault((row.id_address_id, row.cas_register), []).append(row)
+
+        for (address_id, register, day), report in days.items():
+            row = next(
+                (row for row in rows.get((address_id, register), []) if row.day == day),
+                None,
+            )
+            if row is None:
+                row = cls(id_address_id=address_id, cas_register=register, day=day)
+                rows.setdefault((address_id, register), []).append(row)
+            row.cash_balance_beginning = report.cash_balance_beginning
+            row.cash_register_end = report.cash_register_end
+            for field in FLOW_FIELDS:
+                setattr(row, field, getattr(report, field) or 0)
+
+        changed = []
+        for key, pair_rows in rows.items():
+            pair_rows.sort(key=lambda row: row.day)
+            totals = {field: 0 for field in FLOW_FIELDS}
+            for row in pair_rows:
+                if row.day < first_day[key]:
+                    # Строка перед первым днем отчетов: итоги берутся как есть.
+                    totals = {field: getattr(row, f"cum_{field}") for field in FLOW_FIELDS}
+                    continue
+                for field in FLOW_FIELDS:
+                    totals[field] += getattr(row, field)
+                    setattr(row, f"cum_{field}", totals[field])
+                changed.append(row)
+
+        if removed_ids:
+            cls.objects.filter(id__in=removed_ids).delete()
+        cls.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["id_address", "cas_register", "day"],
+            update_fields=[
+                "cash_balance_beginning",
+                "cash_register_end",
+                *FLOW_FIELDS,
+                *[f"cum_{field}" for field in FLOW_FIELDS],
+            ],
+        )
+
+
+class ReconciliationRun(models.Model):
+    """Запуск сверки непрерывности остатков касс (cashbox_app.reconciliation)."""
+
+    started_at = models.DateTimeField(verbose_name="Начало")
+    finished_at = models.DateTimeField(verbose_name="Окончание", null=True, blank=True)
+    full = models.BooleanField(default=False, verbose_name="Вся история")
+    checked_since = models.DateTimeField(
+        verbose_name="Проверены отчеты, измененные после", null=True, blank=True
+    )
+    checked_registers = models.PositiveIntegerField(
+        default=0, verbose_name="Проверено касс"
+    )
+    breaks_found = models.PositiveIntegerField(default=0, verbose_name="Найдено разрывов")
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.started_at:%d.%m.%Y %H:%M}: {self.breaks_found}"
+
+    class Meta:
+        db_table = "reconciliation_run"
+        verbose_name = "Сверка остатков"
+        verbose_name_plural = "Сверки остатков"
+        ordering = ["-started_at"]
+
+
+class BalanceBreak(models.Model):
+    """
+    Разрыв цепочки остатков: остаток на начало смены не равен остатку
+    на конец предыдущей смены той же кассы адреса.
+    """
+
+    report = models.OneToOneField(
+        CashReport,
+        on_delete=models.CASCADE,
+        related_name="balance_break",
+        verbose_name="Отчет",
+    )
+    previous_report = models.ForeignKey(
+        CashReport,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        verbose_name="Предыдущий отчет",
+        null=True,
+        blank=True,
+    )
+    id_address = models.ForeignKey(
+        Address, on_delete=models.CASCADE, verbose_name="Адрес"
+    )
+    cas_register = models.CharField(
+        max_length=10,
+        choices=CashRegisterChoices.choices,
+    )
+    shift_day = models.DateField(verbose_name="День смены")
+    previous_day = models.DateField(verbose_name="День предыдущей смены")
+    expected = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Остаток на конец предыдущей смены",
+        null=True,
+        blank=True,
+    )
+    actual = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Остаток на начало смены",
+        null=True,
+        blank=True,
+    )
+    run = models.ForeignKey(
+        ReconciliationRun,
+        on_delete=models.SET_NULL,
+        verbose_name="Сверка",
+        null=True,
+        blank=True,
+    )
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.shift_day} {self.id_address} {self.cas_register}"
+
+    class Meta:
+        db_table = "balance_break"
+        verbose_name = "Разрыв остатков"
+        verbose_name_plural = "Разрывы остатков"
+        ordering = ["id_address", "cas_register", "shift_day"]
+
+
+class MonthlyRollup(models.Model):
+    """
+    Итоги закрытого месяца по адресу.
+
+    Когда все отчеты месяца закрыты (CLOSED), его показатели больше не
+    меняются. Отчеты посещений и соблюдения расписания за такие месяцы
+    читаются отсюда, а не пересчитываются по cash_report. Наличие строк
+    за месяц означает, что месяц заморожен (см. cashbox_app.rollups).
+    """
+
+    month = models.DateField(verbose_name="Месяц (первое число)")
+    id_address = models.ForeignKey(
+        Address, on_delete=models.CASCADE, verbose_name="Адрес"
+    )
+    attendance = models.JSONField(
+        encoder=DjangoJSONEncoder, default=list, verbose_name="Посещаемость"
+    )
+    schedule = models.JSONField(
+        encoder=DjangoJSONEncoder, default=list, verbose_name="Соблюдение расписания"
+    )
+    created_at = models.DateTimeField(auto_now=True, verbose_name="Дата расчета")
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.month:%m.%Y} {self.id_address}"
+
+    class Meta:
+        unique_together = ("month", "id_address")
+        db_table = "monthly_rollup"
+        verbose_name = "Итоги месяца"
+        verbose_name_plural = "Итоги месяцев"
+
 
 class GoldStandardChoices(models.IntegerChoices):
     """Разновидность пробы."""
@@ -339,6 +775,39 @@ class LocationStatusChoices(models.TextChoices):
     ISSUED = "ВЫДАНО"
 
 
+# Поля, от которых зависят converter585 и converter925.
+CONVERTER_SOURCE_FIELDS = {"weight_clean", "gold_standard"}
+
+
+# Поля скупки, от которых зависят остатки металла (MetalStock).
+METAL_STOCK_SOURCE_FIELDS = {
+    "id_address",
+    "gold_standard",
+    "status",
+    "weight_clean",
+    "weight_fact",
+    "sum",
+    "converter585",
+    "converter925",
+}
+
+
+class SecretRoomQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Пакетная запись скупок: конвертеры считаются без вызова save(),
+        остатки металла обновляются одним запросом на всю пачку.
+        """
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_converters()
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            MetalStock.apply_deltas(MetalStock.purchase_deltas(objs))
+            address_versions.bump_on_commit(obj.id_address_id for obj in objs)
+        return objs
+
+
 class SecretRoom(models.Model):
     """Модель для тайной комнаты."""
 
@@ -397,8 +866,19 @@ class SecretRoom(models.Model):
         blank=False,
         null=True,
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата изменения", null=True
+    )
+    harvest_manifest = models.ForeignKey(
+        "HarvestManifest",
+        on_delete=models.SET_NULL,
+        related_name="purchases",
+        verbose_name="Последний сбор",
+        null=True,
+        blank=True,
+    )
 
-    objects = models.Manager()
+    objects = SecretRoomQuerySet.as_manager()
 
     def __str__(self):
         return (
@@ -417,21 +897,322 @@ class SecretRoom(models.Model):
         verbose_name = "Скупка"
         verbose_name_plural = "Скупки"
         ordering = ["id_address"]
+        indexes = [
+            # Урожай: скупки по статусу или адресу от новых к старым.
+            models.Index(
+                fields=["status", "-shift_date", "-id"],
+                name="secret_room_status_date_idx",
+            ),
+            models.Index(
+                fields=["id_address", "-shift_date", "-id"],
+                name="secret_room_addr_date_idx",
+            ),
+            # Лента изменений для терминалов (cashbox_app.changes).
+            models.Index(
+                fields=["updated_at", "id"],
+                name="secret_room_upd_id_idx",
+            ),
+        ]
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        gold_standards = (750, 585, 500, 375)
-        silver_standards = (925, 875)
-
-        if self.gold_standard in gold_standards:
+    def fill_converters(self):
+        """Пересчитывает вес в 585 пробе (золото) или в 925 пробе (серебро)."""
+        self.converter585 = None
+        self.converter925 = None
+        if self.gold_standard in GOLD_STANDARDS:
             self.converter585 = probe_converter_gold(
                 self.weight_clean, self.gold_standard
             )
-        elif self.gold_standard in silver_standards:
+        elif self.gold_standard in SILVER_STANDARDS:
             self.converter925 = probe_converter_silver(
                 self.weight_clean, self.gold_standard
             )
 
-        # Сохраняем модель еще раз, чтобы обновить новые поля.
-        self.save()
+    def save(self, *args, **kwargs):
+        # Конвертеры считаются до записи, чтобы сохранять скупку одним запросом.
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self.fill_converters()
+        else:
+            # Любое изменение попадает в ленту изменений (cashbox_app.changes).
+            kwargs["update_fields"] = {*update_fields, "updated_at"}
+            if CONVERTER_SOURCE_FIELDS.intersection(update_fields):
+                self.fill_converters()
+                kwargs["update_fields"] |= {"converter585", "converter925"}
+
+        if update_fields is not None and METAL_STOCK_SOURCE_FIELDS.isdisjoint(
+            update_fields
+        ):
+            super().save(*args, **kwargs)
+            address_versions.bump_on_commit([self.id_address_id])
+            return
+
+        # Остатки металла меняются на разницу между прежней и новой скупкой.
+        with transaction.atomic():
+            previous = []
+            if not self._state.adding:
+                previous = SecretRoom.objects.filter(pk=self.pk).only(
+                    *METAL_STOCK_SOURCE_FIELDS
+                )
+            deltas = MetalStock.purchase_deltas(previous, sign=-1)
+            super().save(*args, **kwargs)
+            MetalStock.apply_deltas(MetalStock.purchase_deltas([self], deltas=deltas))
+            address_versions.bump_on_commit(
+                [self.id_address_id, *(p.id_address_id for p in previous)]
+            )
+
+
+# Суммируемые поля скупки в остатках металла и манифестах сбора.
+METAL_SUM_FIELDS = (
+    "weight_clean",
+    "weight_fact",
+    "sum",
+    "converter585",
+    "converter925",
+)
+
+
+class MetalStock(models.Model):
+    """
+    Остаток металла по адресу, пробе и статусу скупки.
+
+    Поддерживается приращениями: запись скупки (save, bulk_create),
+    сбор урожая (cashbox_app.harvest.collect_harvest) и удаление скупки
+    меняют только свои строки. Поэтому остатки по всем филиалам читаются
+    без суммирования secret_poom. QuerySet.update() скупок остатки не
+    меняет - после таких правок нужна команда rebuild_metal_stock.
+    """
+
+    id_address = models.ForeignKey(
+        Address, on_delete=models.CASCADE, verbose_name="Адрес"
+    )
+    gold_standard = models.IntegerField(
+        choices=GoldStandardChoices.choices, verbose_name="Проба"
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=LocationStatusChoices.choices,
+        verbose_name="Статус скупки",
+    )
+    items = models.IntegerField(default=0, verbose_name="Скупок")
+    weight_clean = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Чистый вес"
+    )
+    weight_fact = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Фактический вес"
+    )
+    sum = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Выдано денег"
+    )
+    converter585 = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Конвертер 585 проба"
+    )
+    converter925 = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Конвертер 925 проба"
+    )
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.id_address} {self.gold_standard} {self.status}: {self.items}"
+
+    class Meta:
+        unique_together = ("id_address", "gold_standard", "status")
+        db_table = "metal_stock"
+        verbose_name = "Остаток металла"
+        verbose_name_plural = "Остатки металла"
+        ordering = ["id_address", "status", "gold_standard"]
+
+    @staticmethod
+    def add_delta(deltas, key, items, values, sign=1):
+        """
+        Прибавляет к приращению остатка key = (id адреса, проба, статус)
+        items скупок и суммы values ({поле: значение}) со знаком sign.
+        """
+        delta = deltas.setdefault(
+            key, {"items": 0, **{field: Decimal(0) for field in METAL_SUM_FIELDS}}
+        )
+        delta["items"] += sign * items
+        for field, value in values.items():
+            if value is not None:
+                # Конвертеры от целого веса приходят из functions как float.
+                delta[field] += sign * Decimal(str(value))
+        return deltas
+
+    @classmethod
+    def purchase_deltas(cls, purchases, sign=1, deltas=None):
+        """Приращения остатков от добавления (sign=-1 - удаления) скупок."""
+        deltas = {} if deltas is None else deltas
+        for purchase in purchases:
+            cls.add_delta(
+                deltas,
+                (purchase.id_address_id, purchase.gold_standard, purchase.status),
+                1,
+                {field: getattr(purchase, field) for field in METAL_SUM_FIELDS},
+                sign,
+            )
+        return deltas
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Прибавляет приращения к остаткам одним INSERT ... ON CONFLICT DO UPDATE.
+        Нулевые приращения (скупка изменена без влияния на остатки) пропускаются.
+        """
+        rows = [
+            (*key, delta["items"], *[delta[field] for field in METAL_SUM_FIELDS])
+            for key, delta in deltas.items()
+            if any(delta.values())
+        ]
+        if not rows:
+            return
+
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        key_columns = [
+            quote(cls._meta.get_field(name).column)
+            for name in ("id_address", "gold_standard", "status")
+        ]
+        sum_columns = [quote(name) for name in ("items", *METAL_SUM_FIELDS)]
+        placeholders = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+        sql = (
+            f"INSERT INTO {table} ({', '.join(key_columns + sum_columns)}) "
+            f"VALUES {', '.join([placeholders] * len(rows))} "
+            f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+            + ", ".join(
+                f"{column} = {table}.{column} + EXCLUDED.{column}"
+                for column in sum_columns
+            )
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [value for row in rows for value in row])
+
+
+class HarvestManifest(models.Model):
+    """
+    Сбор урожая: перевод скупок адресов маршрута из одного статуса в другой
+    (В ФИЛИАЛЕ → СОБРАНО или СОБРАНО → ВЫДАНО) с итогами по перенесенным
+    скупкам. Итоги по адресам и пробам - в HarvestManifestLine.
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата сбора")
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        verbose_name="Сотрудник",
+        null=True,
+        blank=True,
+    )
+    from_status = models.CharField(
+        max_length=15,
+        choices=LocationStatusChoices.choices,
+        verbose_name="Из статуса",
+    )
+    to_status = models.CharField(
+        max_length=15,
+        choices=LocationStatusChoices.choices,
+        verbose_name="В статус",
+    )
+    items = models.PositiveIntegerField(default=0, verbose_name="Скупок")
+    weight_clean = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Чистый вес"
+    )
+    weight_fact = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Фактический вес"
+    )
+    sum = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Выдано денег"
+    )
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return (
+            f"Сбор {self.id} от {self.created_at:%d.%m.%Y %H:%M}: "
+            f"{self.from_status} → {self.to_status}, скупок {self.items}"
+        )
+
+    class Meta:
+        db_table = "harvest_manifest"
+        verbose_name = "Сбор урожая"
+        verbose_name_plural = "Сборы урожая"
+        ordering = ["-created_at", "-id"]
+
+
+class HarvestManifestLine(models.Model):
+    """Итоги сбора урожая по адресу и пробе."""
+
+    manifest = models.ForeignKey(
+        HarvestManifest,
+        on_delete=models.CASCADE,
+        related_name="lines",
+        verbose_name="Сбор",
+    )
+    id_address = models.ForeignKey(
+        Address, on_delete=models.CASCADE, verbose_name="Адрес"
+    )
+    gold_standard = models.IntegerField(
+        choices=GoldStandardChoices.choices, verbose_name="Проба"
+    )
+    items = models.PositiveIntegerField(default=0, verbose_name="Скупок")
+    weight_clean = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Чистый вес"
+    )
+    weight_fact = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Фактический вес"
+    )
+    sum = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Выдано денег"
+    )
+    converter585 = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Конвертер 585 проба",
+    )
+    converter925 = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Конвертер 925 проба",
+    )
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.manifest_id}: {self.id_address} {self.gold_standard}"
+
+    class Meta:
+        unique_together = ("manifest", "id_address", "gold_standard")
+        db_table = "harvest_manifest_line"
+        verbose_name = "Итоги сбора по адресу"
+        verbose_name_plural = "Итоги сбора по адресам"
+        ordering = ["manifest", "id_address", "gold_standard"]
+
+
+class DeletedRow(models.Model):
+    """
+    Запись об удалении строки для ленты изменений (cashbox_app.changes).
+
+    Адрес хранится числом, а не внешним ключом: при удалении адреса записи
+    об удалении его отчетов и скупок должны остаться.
+    """
+
+    feed = models.CharField(max_length=20, verbose_name="Лента")
+    object_id = models.BigIntegerField(verbose_name="id удаленной строки")
+    address_id = models.BigIntegerField(null=True, blank=True, verbose_name="id адреса")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата удаления")
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.feed} {self.object_id}: {self.deleted_at:%d.%m.%Y %H:%M}"
+
+    class Meta:
+        db_table = "deleted_row"
+        verbose_name = "Удаленная строка"
+        verbose_name_plural = "Удаленные строки"
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="deleted_row_del_id_idx"),
+        ]
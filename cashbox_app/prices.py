@@ -0,0 +1,81 @@
+"""Таблица актуальных цен на металл в памяти процесса."""
+
+import threading
+import time
+
+from django.core.cache import cache
+
+from cashbox_app.models import GoldStandard, GoldStandardChoices
+
+
+class PriceTable:
+    """
+    Актуальная цена по каждой пробе (GoldStandardChoices).
+
+    Цены хранятся в памяти процесса вместе с номером версии. Номер версии
+    лежит в общем кэше (settings.CACHES) и увеличивается при изменении цен
+    (PriceChangesView.form_valid), поэтому каждый процесс перечитывает цены
+    из БД на первом запросе после изменения, а в остальное время отдает их
+    без запросов к БД.
+    """
+
+    version_key = "gold_standard_prices_version"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._rows = []
+        self._prices = {}
+
+    def _current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = self.bump()
+        return version
+
+    def bump(self):
+        """Увеличивает версию цен, чтобы все процессы перечитали таблицу."""
+        try:
+            return cache.incr(self.version_key)
+        except ValueError:
+            # Версии в кэше нет (первый запуск или вытеснение): начинаем
+            # с уникального значения, чтобы не совпасть со старой версией.
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            return cache.get(self.version_key)
+
+    def _load(self, version):
+        latest = {}
+        for row in GoldStandard.objects.order_by("gold_standard", "shift_date", "id"):
+            latest[row.gold_standard] = row
+
+        with self._lock:
+            self._rows = list(latest.values())
+            self._prices = {
+                standard: latest[standard].price_rubles if standard in latest else None
+                for standard in GoldStandardChoices.values
+            }
+            self._version = version
+
+    def _ensure_fresh(self):
+        version = self._current_version()
+        if version != self._version:
+            self._load(version)
+
+    def prices(self):
+        """
+        Словарь {проба: цена в рублях}. Для проб без цены значение None.
+        """
+        self._ensure_fresh()
+        return dict(self._prices)
+
+    def price(self, gold_standard):
+        """Актуальная цена пробы или None."""
+        return self.prices().get(gold_standard)
+
+    def rows(self):
+        """Актуальные записи GoldStandard (по одной на пробу) для вывода в шаблоны."""
+        self._ensure_fresh()
+        return list(self._rows)
+
+
+price_table = PriceTable()
@@ -0,0 +1,188 @@
+"""
+Сверка непрерывности остатков касс.
+
+Остаток на начало смены должен равняться остатку на конец предыдущей смены
+той же кассы адреса. Проверка выполняется одним запросом с оконной функцией
+LAG() по (id_address, cas_register); найденные разрывы хранятся в BalanceBreak.
+"""
+
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import (
+    DecimalField,
+    F,
+    Min,
+    Q,
+    Subquery,
+    Value,
+    Window,
+)
+from django.db.models.functions import Coalesce, Lag
+
+from cashbox_app.models import (
+    BalanceBreak,
+    CashRegisterChoices,
+    CashReport,
+    ReconciliationRun,
+    RegisterBalance,
+)
+
+
+def chain_window(expression):
+    """Выражение по предыдущей смене той же кассы адреса."""
+    return Window(
+        expression,
+        partition_by=[F("id_address"), F("cas_register")],
+        order_by=[F("shift_day").asc(), F("id").asc()],
+    )
+
+
+def changed_scopes(since):
+    """
+    Кассы с отчетами, измененными после since.
+
+    :return: dict
+        {(id адреса, касса): самый ранний день смены среди измененных отчетов}.
+    """
+    changed = (
+        CashReport.objects.filter(
+            # Условие по кассе позволяет использовать индекс (cas_register, updated_at).
+            cas_register__in=CashRegisterChoices.values,
+            updated_at__gte=since,
+        )
+        .values("id_address_id", "cas_register")
+        .annotate(first_day=Min("shift_day"))
+        .order_by()
+    )
+    return {
+        (row["id_address_id"], row["cas_register"]): row["first_day"] for row in changed
+    }
+
+
+def scope_condition(scopes, field="shift_day", include_previous=False):
+    """Условие на отчеты касс scopes начиная с первого дня (или предыдущей смены)."""
+    condition = Q()
+    for (address_id, register), day in scopes.items():
+        first_day = Value(day)
+        if include_previous:
+            previous_day = (
+                CashReport.objects.filter(
+                    id_address_id=address_id, cas_register=register, shift_day__lt=day
+                )
+                .order_by("-shift_day")
+                .values("shift_day")[:1]
+            )
+            first_day = Coalesce(Subquery(previous_day), first_day)
+        condition |= Q(id_address_id=address_id, cas_register=register) & Q(
+            **{f"{field}__gte": first_day}
+        )
+    return condition
+
+
+def find_breaks(scopes=None):
+    """
+    Ищет разрывы цепочки остатков.
+
+    :param scopes: None - проверить всю историю; иначе словарь
+        {(id адреса, касса): первый день} - проверяются смены начиная с этого
+        дня, предыдущая смена читается только как начало цепочки.
+    :return: list
+        Словари с ключами id, previous_id, id_address_id, cas_register,
+        shift_day, previous_day, expected, cash_balance_beginning.
+    """
+    reports = CashReport.objects.all()
+    if scopes is not None:
+        if not scopes:
+            return []
+        reports = reports.filter(scope_condition(scopes, include_previous=True))
+
+    zero = Value(0, output_field=DecimalField())
+    breaks = (
+        reports.annotate(
+            previous_id=chain_window(Lag("id")),
+            previous_day=chain_window(Lag("shift_day")),
+            expected=chain_window(Lag("cash_register_end")),
+        )
+        .annotate(
+            gap=Coalesce("cash_balance_beginning", zero)
+            - Coalesce(F("expected"), zero)
+        )
+        .filter(previous_id__isnull=False)
+        .exclude(gap=0)
+        .values(
+            "id",
+            "previous_id",
+            "id_address_id",
+            "cas_register",
+            "shift_day",
+            "previous_day",
+            "expected",
+            "cash_balance_beginning",
+        )
+        .order_by()
+    )
+    if scopes is None:
+        return list(breaks)
+    return [
+        row
+        for row in breaks
+        if row["shift_day"] >= scopes[(row["id_address_id"], row["cas_register"])]
+    ]
+
+
+def run_reconciliation(full=False):
+    """
+    Выполняет сверку и сохраняет найденные разрывы.
+
+    По умолчанию проверяются только кассы с отчетами, измененными после
+    начала последней завершенной сверки, начиная с первого измененного дня.
+    Удаление отчетов так не обнаруживается - для этого есть full=True.
+
+    :return: ReconciliationRun
+    """
+    started_at = datetime.now()
+    last_run = ReconciliationRun.objects.filter(finished_at__isnull=False).first()
+    if full or last_run is None:
+        since = None
+        scopes = None
+    else:
+        since = last_run.started_at
+        scopes = changed_scopes(since)
+
+    breaks = find_breaks(scopes)
+
+    with transaction.atomic():
+        run = ReconciliationRun.objects.create(
+            started_at=started_at,
+            full=scopes is None,
+            checked_since=since,
+            checked_registers=(
+                RegisterBalance.objects.count() if scopes is None else len(scopes)
+            ),
+            breaks_found=len(breaks),
+        )
+        stale = BalanceBreak.objects.all()
+        if scopes is not None:
+            stale = stale.filter(scope_condition(scopes))
+        if scopes is None or scopes:
+            stale.delete()
+        BalanceBreak.objects.bulk_create(
+            [
+                BalanceBreak(
+                    report_id=row["id"],
+                    previous_report_id=row["previous_id"],
+                    id_address_id=row["id_address_id"],
+                    cas_register=row["cas_register"],
+                    shift_day=row["shift_day"],
+                    previous_day=row["previous_day"],
+                    expected=row["expected"],
+                    actual=row["cash_balance_beginning"],
+                    run=run,
+                )
+                for row in breaks
+            ]
+        )
+        run.finished_at = datetime.now()
+        run.save(update_fields=["finished_at"])
+    return run
@@ -0,0 +1,280 @@
+"""Отчеты руководителя, которые считаются одним запросом к БД."""
+
+from calendar import monthrange
+from datetime import date
+
+from django.db.models import (
+    Case,
+    CharField,
+    Count,
+    F,
+    FilteredRelation,
+    Func,
+    IntegerField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import TruncTime
+from django.db.models.lookups import GreaterThan
+
+from cashbox_app.addresses import address_directory
+from cashbox_app.models import (
+    DAYS_OF_WEEK,
+    CashRegisterChoices,
+    CashReport,
+    CashReportStatusChoices,
+)
+
+
+def minutes_between(start, end):
+    """Количество целых минут от start до end (PostgreSQL, TIME - TIME)."""
+    return Func(
+        end,
+        start,
+        template="CAST(FLOOR(EXTRACT(EPOCH FROM (%(expressions)s)) / 60) AS integer)",
+        arg_joiner=" - ",
+        output_field=IntegerField(),
+    )
+
+
+def positive_minutes(minutes):
+    """Минуты нарушения: 0, если нарушения нет, NULL, если нет расписания."""
+    return Case(
+        When(schedule__id__isnull=True, then=Value(None)),
+        When(GreaterThan(minutes, 0), then=minutes),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def schedule_report_queryset(date_from, date_to, address_ids=None):
+    """
+    Смены скупки за период вместе с расписанием адреса на день недели смены.
+
+    Расписание присоединяется к смене через LEFT JOIN по (адрес, день недели),
+    опоздание и ранний уход в минутах считаются в БД, поэтому отчет по всем
+    адресам за любой период выполняется одним запросом.
+
+    :param date_from: первый день периода (включительно).
+    :param date_to: последний день периода (включительно).
+    :param address_ids: список id адресов или None для всех адресов.
+    """
+    reports = CashReport.objects.filter(
+        cas_register=CashRegisterChoices.BUYING_UP,
+        shift_day__range=(date_from, date_to),
+    )
+    if address_ids:
+        reports = reports.filter(id_address_id__in=address_ids)
+
+    opening_time_fact = TruncTime("shift_date")
+    closing_time_fact = TruncTime("updated_at")
+    return (
+        reports.annotate(
+            weekday=Case(
+                *[
+                    When(shift_day__iso_week_day=number, then=Value(day))
+                    for number, (day, _) in enumerate(DAYS_OF_WEEK, start=1)
+                ],
+                output_field=CharField(),
+            ),
+            schedule=FilteredRelation(
+                "id_address__address_schedules",
+                condition=Q(id_address__address_schedules__day_of_week=F("weekday")),
+            ),
+        )
+        .annotate(
+            opening_time_fact=opening_time_fact,
+            closing_time_fact=closing_time_fact,
+            opening_time=F("schedule__opening_time"),
+            closing_time=F("schedule__closing_time"),
+            late_minutes=positive_minutes(
+                minutes_between(F("schedule__opening_time"), opening_time_fact)
+            ),
+            early_minutes=positive_minutes(
+                minutes_between(closing_time_fact, F("schedule__closing_time"))
+            ),
+        )
+        .values(
+            "id_address_id",
+            "id_address__street",
+            "id_address__home",
+            "author__username",
+            "shift_day",
+            "weekday",
+            "opening_time_fact",
+            "closing_time_fact",
+            "opening_time",
+            "closing_time",
+            "late_minutes",
+            "early_minutes",
+        )
+        .order_by("shift_day", "id_address__street", "id_address__home", "id")
+    )
+
+
+def attendance_queryset(date_from, date_to, address_ids=None):
+    """
+    Смены скупки за период, сгруппированные по (сотрудник, адрес, день смены).
+
+    Одна строка результата - один отработанный сотрудником день на адресе,
+    поэтому размер результата ограничен числом смен, а не отчетов.
+
+    :param date_from: первый день периода (включительно).
+    :param date_to: последний день периода (включительно).
+    :param address_ids: список id адресов или None для всех адресов.
+    """
+    reports = CashReport.objects.filter(
+        cas_register=CashRegisterChoices.BUYING_UP,
+        shift_day__range=(date_from, date_to),
+        author__isnull=False,
+    )
+    if address_ids:
+        reports = reports.filter(id_address_id__in=address_ids)
+    return (
+        reports.values("author_id", "author__username", "id_address_id", "shift_day")
+        .annotate(reports=Count("id"))
+        .order_by("author__username", "author_id", "shift_day", "id_address_id")
+    )
+
+
+def address_label(address_id):
+    """Короткое название адреса для ячеек отчета."""
+    address = address_directory.get(address_id)
+    if address is None:
+        return str(address_id)
+    return f"{address.street}, {address.home}"
+
+
+class Attendance:
+    """
+    Посещаемость сотрудников за месяц.
+
+    Строится по строкам attendance_queryset (одним запросом, если строки не
+    переданы) и используется и кратким, и полным отчетом посещений.
+
+    Attributes:
+        days (range): Номера дней месяца.
+        employees (list): Словари сотрудников:
+            username - имя пользователя,
+            days - {номер дня: [id адресов]},
+            total_days - количество отработанных дней (COUNT DISTINCT день смены),
+            addresses - {id адреса: количество дней на адресе}.
+    """
+
+    def __init__(self, year, month, rows=None, address_ids=None):
+        self.year = year
+        self.month = month
+        self.days = range(1, monthrange(year, month)[1] + 1)
+        if rows is None:
+            rows = attendance_queryset(
+                date(year, month, 1), date(year, month, self.days[-1]), address_ids
+            )
+        self.employees = self._load(rows)
+
+    @staticmethod
+    def _load(rows):
+        employees = {}
+        for row in rows:
+            employee = employees.setdefault(
+                row["author_id"],
+                {"username": row["author__username"], "days": {}, "addresses": {}},
+            )
+            employee["days"].setdefault(row["shift_day"].day, []).append(
+                row["id_address_id"]
+            )
+            addresses = employee["addresses"]
+            addresses[row["id_address_id"]] = addresses.get(row["id_address_id"], 0) + 1
+
+        for employee in employees.values():
+            employee["total_days"] = len(employee["days"])
+        return sorted(employees.values(), key=lambda e: e["username"])
+
+    def brief_columns(self):
+        return [
+            ("username", "Сотрудник"),
+            ("total_days", "Количество отработанных дней"),
+            ("addresses", "По адресам"),
+        ]
+
+    def brief_rows(self):
+        """Итоги по сотрудникам: дни всего и по каждому адресу."""
+        for employee in sorted(self.employees, key=lambda e: -e["total_days"]):
+            yield {
+                "username": employee["username"],
+                "total_days": employee["total_days"],
+                "addresses": "; ".join(
+                    f"{address_label(address_id)}: {days}"
+                    for address_id, days in sorted(
+                        employee["addresses"].items(), key=lambda item: -item[1]
+                    )
+                ),
+            }
+
+    def matrix_columns(self):
+        return [
+            ("username", "Сотрудник"),
+            *[(day, str(day)) for day in self.days],
+            ("total_days", "Итого дней"),
+        ]
+
+    def matrix_rows(self):
+        """Матрица сотрудник × день: в ячейке адреса, где сотрудник работал."""
+        for employee in self.employees:
+            row = {
+                "username": employee["username"],
+                "total_days": employee["total_days"],
+            }
+            for day, address_ids in employee["days"].items():
+                row[day] = " / ".join(address_label(a) for a in address_ids)
+            yield row
+
+
+# Колонки выгрузки кассовых отчетов для бухгалтерии.
+CASH_REPORT_EXPORT_COLUMNS = [
+    ("shift_day", "День смены"),
+    ("id_address__city", "Город"),
+    ("id_address__street", "Улица"),
+    ("id_address__home", "Дом"),
+    ("cas_register", "Касса"),
+    ("author__username", "Сотрудник"),
+    ("cash_balance_beginning", "Остаток на начало"),
+    ("introduced", "Внесено"),
+    ("interest_return", "Проценты и возврат займов"),
+    ("loans_issued", "Выдано займов"),
+    ("used_farming", "Хоз. нужды, оплата труда"),
+    ("boss_took_it", "Выемка руководителем"),
+    ("cash_register_end", "Остаток на конец"),
+    ("status", "Статус"),
+    ("updated_at", "Дата изменения"),
+]
+
+
+def cash_report_export_rows(date_from, date_to, address_ids=None, chunk_size=2000):
+    """
+    Кассовые отчеты за период вместе с адресом и сотрудником.
+
+    Строки читаются с сервера порциями (QuerySet.iterator), поэтому память
+    не зависит от длины периода, а первые строки доступны до окончания
+    выборки.
+
+    :param date_from: первый день периода (включительно).
+    :param date_to: последний день периода (включительно).
+    :param address_ids: список id адресов или None для всех адресов.
+    :param chunk_size: количество строк, читаемых за одно обращение к БД.
+    """
+    reports = CashReport.objects.filter(shift_day__range=(date_from, date_to))
+    if address_ids:
+        reports = reports.filter(id_address_id__in=address_ids)
+
+    registers = dict(CashRegisterChoices.choices)
+    statuses = dict(CashReportStatusChoices.choices)
+    rows = (
+        reports.values(*[key for key, _ in CASH_REPORT_EXPORT_COLUMNS])
+        .order_by("shift_day", "id_address_id", "cas_register", "id")
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        row["cas_register"] = registers.get(row["cas_register"], row["cas_register"])
+        row["status"] = statuses.get(row["status"], row["status"])
+        yield row
@@ -0,0 +1,179 @@
+"""
+Замороженные итоги закрытых месяцев (MonthlyRollup).
+
+Месяц замораживается, когда он уже прошел и все его отчеты закрыты:
+посещаемость и соблюдение расписания считаются один раз и сохраняются
+по адресам (обороты касс за любой период берутся из DailyRegisterTotals).
+Отчеты за такие месяцы читаются из monthly_rollup, за текущий и
+незамороженные месяцы - считаются по cash_report.
+
+Замораживает месяцы только команда build_monthly_rollups (по расписанию):
+страницы отчетов итоги не записывают, поэтому месяц без строк итогов
+не пересчитывается на каждом запросе.
+"""
+
+from calendar import monthrange
+from datetime import date, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from cashbox_app.models import (
+    CashReport,
+    CashReportStatusChoices,
+    MonthlyRollup,
+)
+from cashbox_app.reports import (
+    Attendance,
+    attendance_queryset,
+    schedule_report_queryset,
+)
+
+# JSONField хранит даты и время строками, при чтении они восстанавливаются.
+RESTORE_FIELDS = {
+    "shift_day": date.fromisoformat,
+    "opening_time_fact": time.fromisoformat,
+    "closing_time_fact": time.fromisoformat,
+    "opening_time": time.fromisoformat,
+    "closing_time": time.fromisoformat,
+}
+
+LIVE_QUERYSETS = {
+    "attendance": attendance_queryset,
+    "schedule": schedule_report_queryset,
+}
+
+
+def month_end(month):
+    """Последний день месяца."""
+    return month.replace(day=monthrange(month.year, month.month)[1])
+
+
+def months_between(date_from, date_to):
+    """Первые числа месяцев, которые пересекаются с периодом."""
+    months = []
+    month = date_from.replace(day=1)
+    while month <= date_to:
+        months.append(month)
+        month = month_end(month) + timedelta(days=1)
+    return months
+
+
+def current_month():
+    return date.today().replace(day=1)
+
+
+def is_month_closed(month):
+    """Месяц прошел, в нем есть отчеты, и все они закрыты."""
+    if month >= current_month():
+        return False
+    counts = CashReport.objects.filter(
+        shift_day__range=(month, month_end(month))
+    ).aggregate(
+        total=Count("id"),
+        not_closed=Count("id", filter=~Q(status=CashReportStatusChoices.CLOSED)),
+    )
+    return counts["total"] > 0 and counts["not_closed"] == 0
+
+
+def freeze_month(month):
+    """
+    Считает и сохраняет итоги месяца по всем адресам.
+
+    :return: bool
+        True, если месяц закрыт и итоги сохранены.
+    """
+    if not is_month_closed(month):
+        return False
+
+    date_from, date_to = month, month_end(month)
+    rollups = {}
+
+    def rollup(address_id):
+        if address_id not in rollups:
+            rollups[address_id] = MonthlyRollup(month=month, id_address_id=address_id)
+        return rollups[address_id]
+
+    for row in attendance_queryset(date_from, date_to):
+        rollup(row["id_address_id"]).attendance.append(row)
+    for row in schedule_report_queryset(date_from, date_to):
+        rollup(row["id_address_id"]).schedule.append(row)
+
+    with transaction.atomic():
+        MonthlyRollup.objects.filter(month=month).delete()
+        MonthlyRollup.objects.bulk_create(rollups.values())
+    return True
+
+
+def restore(row):
+    return {
+        key: RESTORE_FIELDS[key](value)
+        if key in RESTORE_FIELDS and isinstance(value, str)
+        else value
+        for key, value in row.items()
+    }
+
+
+def frozen_rollups(kind, months):
+    """Строки отчета kind замороженных месяцев: {месяц: [(id адреса, строки)]}."""
+    frozen = {}
+    for rollup in MonthlyRollup.objects.filter(month__in=months).values(
+        "month", "id_address_id", kind
+    ):
+        frozen.setdefault(rollup["month"], []).append(
+            (rollup["id_address_id"], rollup[kind])
+        )
+    return frozen
+
+
+def report_rows(kind, date_from, date_to, address_ids=None):
+    """
+    Строки отчета "attendance" или "schedule" за период.
+
+    Только читает: замороженные месяцы берутся из monthly_rollup, подряд
+    идущие незамороженные месяцы считаются по cash_report одним запросом.
+    """
+    months = months_between(date_from, date_to)
+    frozen = frozen_rollups(kind, months)
+
+    rows = []
+    live_from = None
+    for month in [*months, None]:
+        if month is not None and month not in frozen:
+            live_from = live_from or max(month, date_from)
+            continue
+        if live_from is not None:
+            live_to = min(month - timedelta(days=1), date_to) if month else date_to
+            rows.extend(LIVE_QUERYSETS[kind](live_from, live_to, address_ids))
+            live_from = None
+        if month is None:
+            break
+        for address_id, address_rows in frozen[month]:
+            if address_ids and address_id not in address_ids:
+                continue
+            for row in map(restore, address_rows):
+                if date_from <= row["shift_day"] <= date_to:
+                    rows.append(row)
+    return rows
+
+
+def monthly_attendance(year, month, address_ids=None):
+    """Посещаемость за месяц (cashbox_app.reports.Attendance)."""
+    month = date(year, month, 1)
+    return Attendance(
+        year,
+        month.month,
+        rows=report_rows("attendance", month, month_end(month), address_ids),
+    )
+
+
+def schedule_rows(date_from, date_to, address_ids=None):
+    """Строки отчета соблюдения расписания за период."""
+    return sorted(
+        report_rows("schedule", date_from, date_to, address_ids),
+        key=lambda row: (
+            row["shift_day"],
+            row["id_address__street"],
+            row["id_address__home"],
+        ),
+    )
@@ -0,0 +1,147 @@
+"""Сериализаторы API: пакетная запись кассовых отчетов и скупок."""
+
+from rest_framework import serializers
+
+from cashbox_app.addresses import address_directory
+from cashbox_app.balances import REPORT_FIELDS, save_cash_reports
+from cashbox_app.models import (
+    Address,
+    CashReport,
+    CashReportStatusChoices,
+    SecretRoom,
+)
+
+# Наибольшее количество записей в одном запросе.
+MAX_BATCH_SIZE = 500
+
+
+class AddressField(serializers.PrimaryKeyRelatedField):
+    """Адрес по id из справочника адресов, без запроса к БД на каждую запись."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", Address.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        address = address_directory.get(data)
+        if address is None:
+            self.fail("does_not_exist", pk_value=data)
+        return address
+
+
+class CashReportListSerializer(serializers.ListSerializer):
+    """Пакет отчетов касс: несколько смен и касс одного или разных адресов."""
+
+    def validate(self, attrs):
+        shifts = [
+            (report["id_address"].id, report["cas_register"], report["shift_day"])
+            for report in attrs
+        ]
+        if len(set(shifts)) != len(shifts):
+            raise serializers.ValidationError(
+                "Отчет по одной кассе за один день передан несколько раз."
+            )
+
+        # Закрытые отчеты не перезаписываются. Один запрос на весь пакет.
+        closed = set(
+            CashReport.objects.filter(
+                id_address_id__in={address_id for address_id, _, _ in shifts},
+                shift_day__in={day for _, _, day in shifts},
+                status=CashReportStatusChoices.CLOSED,
+            ).values_list("id_address_id", "cas_register", "shift_day")
+        )
+        closed.intersection_update(shifts)
+        if closed:
+            raise serializers.ValidationError(
+                [
+                    f"Отчет закрыт: адрес {address_id}, касса {register}, {day}."
+                    for address_id, register, day in sorted(closed)
+                ]
+            )
+        return attrs
+
+    def create(self, validated_data):
+        return save_cash_reports([CashReport(**attrs) for attrs in validated_data])
+
+
+class CashReportSerializer(serializers.ModelSerializer):
+    """
+    Отчет кассы за день смены.
+
+    Остаток на конец дня считается сервером так же, как в форме отчета.
+    Отчет, уже записанный по этой кассе и дню, перезаписывается.
+    """
+
+    id_address = AddressField()
+
+    class Meta:
+        model = CashReport
+        fields = [
+            "id",
+            "id_address",
+            "cas_register",
+            "shift_day",
+            *REPORT_FIELDS,
+            "status",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "cash_register_end", "updated_at"]
+        extra_kwargs = {"shift_day": {"required": True}}
+        # Отчет записывается поверх существующего (INSERT ... ON CONFLICT).
+        validators = []
+        list_serializer_class = CashReportListSerializer
+
+    def validate(self, attrs):
+        income = ("cash_balance_beginning", "introduced", "interest_return")
+        expense = ("loans_issued", "used_farming", "boss_took_it")
+        for field in (*income, *expense):
+            if attrs.get(field) is None:
+                attrs[field] = 0
+        attrs["cash_register_end"] = sum(attrs[field] for field in income) - sum(
+            attrs[field] for field in expense
+        )
+        return attrs
+
+
+class SecretRoomListSerializer(serializers.ListSerializer):
+    """Пакет скупок: записывается одним INSERT (SecretRoomQuerySet.bulk_create)."""
+
+    def create(self, validated_data):
+        return SecretRoom.objects.bulk_create(
+            [SecretRoom(**attrs) for attrs in validated_data]
+        )
+
+
+class SecretRoomSerializer(serializers.ModelSerializer):
+    """Скупка. Конвертеры пробы считаются сервером."""
+
+    id_address = AddressField()
+
+    class Meta:
+        model = SecretRoom
+        fields = [
+            "id",
+            "shift_date",
+            "id_address",
+            "client",
+            "nomenclature",
+            "gold_standard",
+            "price",
+            "weight_clean",
+            "weight_fact",
+            "sum",
+            "converter585",
+            "converter925",
+            "not_standard",
+            "status",
+        ]
+        read_only_fields = [
+            "id",
+            "shift_date",
+            "converter585",
+            "converter925",
+            "status",
+        ]
+        list_serializer_class = SecretRoomListSerializer
@@ -0,0 +1,42 @@
+"""
+Скользящий срок жизни сессии без записи сессии на каждом запросе.
+
+Сессия сохраняется только при изменении (SESSION_SAVE_EVERY_REQUEST
+выключен). Чтобы сессия активного сотрудника не истекала, раз в
+SESSION_REFRESH_INTERVAL секунд в нее записывается время обновления:
+сессия сохраняется, и срок жизни отсчитывается заново. Между обновлениями
+запрос только читает сессию (для cached_db - из кэша, без запросов к БД).
+"""
+
+import time
+
+from django.conf import settings
+
+# Ключ сессии со временем последнего продления.
+SESSION_REFRESHED_KEY = "_refreshed_at"
+
+
+class SessionRefreshMiddleware:
+    """
+    Продлевает сессию не чаще раза в SESSION_REFRESH_INTERVAL секунд.
+    Подключается после SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.interval = getattr(settings, "SESSION_REFRESH_INTERVAL", 15 * 60)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, "session", None)
+        # Пустую сессию (анонимный посетитель без данных) не создаем.
+        if session is None or session.is_empty():
+            return response
+        now = int(time.time())
+        # Измененная сессия сохраняется в любом случае - отметка ничего не стоит.
+        if (
+            session.modified
+            or now - session.get(SESSION_REFRESHED_KEY, 0) >= self.interval
+        ):
+            session[SESSION_REFRESHED_KEY] = now
+        return response
@@ -0,0 +1,96 @@
+from datetime import date
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from cashbox_app.addresses import address_directory
+from cashbox_app.changes import record_deletion
+from cashbox_app.models import (
+    METAL_SUM_FIELDS,
+    Address,
+    CashReport,
+    DailyRegisterTotals,
+    GoldStandard,
+    MetalStock,
+    MonthlyRollup,
+    RegisterBalance,
+    Schedule,
+    SecretRoom,
+)
+from cashbox_app.versions import address_versions
+
+
+@receiver([post_save, post_delete], sender=Address)
+def clear_address_directory(sender, instance, **kwargs):
+    """Сбрасывает справочник адресов при изменении или удалении адреса."""
+    address_directory.clear()
+    address_versions.bump_on_commit([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Schedule)
+def bump_schedule_version(sender, instance, **kwargs):
+    """Расписание входит в отчеты руководителя по всем адресам."""
+    address_versions.bump_on_commit()
+
+
+@receiver(post_delete, sender=CashReport)
+@receiver(post_delete, sender=SecretRoom)
+def bump_deleted_address_version(sender, instance, **kwargs):
+    """Удаление отчета или скупки меняет страницы адреса."""
+    address_versions.bump_on_commit([instance.id_address_id])
+
+
+@receiver(post_delete, sender=CashReport)
+def update_deleted_report_balance(sender, instance, **kwargs):
+    """
+    Снимок баланса кассы не должен хранить остаток удаленного отчета
+    (RegisterBalance.report обнуляется, а сумма остается).
+    """
+    RegisterBalance.update_after_delete(instance.id_address_id, instance.cas_register)
+
+
+@receiver(post_delete, sender=CashReport)
+def remove_deleted_report_day(sender, instance, **kwargs):
+    """
+    Удаляет день отчета из итогов касс за день и пересчитывает нарастающие
+    итоги следующих дней, как при записи отчета задним числом. Удаление
+    отчета прошлого месяца размораживает итоги месяца.
+    """
+    DailyRegisterTotals.update_from_reports(
+        [],
+        deleted=[(instance.id_address_id, instance.cas_register, instance.shift_day)],
+    )
+    month = instance.shift_day.replace(day=1)
+    if month < date.today().replace(day=1):
+        MonthlyRollup.objects.filter(month=month).delete()
+
+
+@receiver(post_delete, sender=SecretRoom)
+def remove_from_metal_stock(sender, instance, **kwargs):
+    """
+    Вычитает удаленную скупку из остатков металла.
+
+    Только UPDATE существующей строки: при удалении адреса его остатки
+    удаляются каскадно, и создавать их заново не нужно.
+    """
+    MetalStock.objects.filter(
+        id_address_id=instance.id_address_id,
+        gold_standard=instance.gold_standard,
+        status=instance.status,
+    ).update(
+        items=F("items") - 1,
+        **{
+            field: F(field) - (getattr(instance, field) or 0)
+            for field in METAL_SUM_FIELDS
+        },
+    )
+
+
+@receiver(post_delete, sender=CashReport)
+@receiver(post_delete, sender=SecretRoom)
+@receiver(post_delete, sender=Schedule)
+@receiver(post_delete, sender=GoldStandard)
+def record_deleted_row(sender, instance, **kwargs):
+    """Удаление строки попадает в ленту изменений deleted (cashbox_app.changes)."""
+    record_deletion(instance)
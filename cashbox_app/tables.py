@@ -0,0 +1,123 @@
+"""Таблицы отчетов: вывод строк QuerySet.values() в HTML-шаблон и CSV."""
+
+import csv
+from datetime import date, datetime, time
+
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Место строк таблицы в шаблоне потоковой HTML-страницы.
+ROWS_MARKER = "<!-- rows -->"
+
+
+def format_cell(value):
+    """Приводит значение ячейки к строке для HTML и CSV."""
+    if value is None:
+        return "-"
+    if isinstance(value, datetime):
+        return value.strftime("%d.%m.%Y %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%d.%m.%Y")
+    if isinstance(value, time):
+        return value.strftime("%H:%M:%S")
+    return str(value)
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ReportTable:
+    """
+    Таблица отчета.
+
+    Строки не копируются и не загружаются целиком: при выводе в CSV они
+    читаются по одной, поэтому вместо списка можно передать QuerySet.
+
+    :param columns: список пар (ключ строки, заголовок колонки).
+    :param rows: итерируемый набор словарей.
+    """
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+
+    def headers(self):
+        return [title for _, title in self.columns]
+
+    def __iter__(self):
+        """Строки таблицы в виде списков отформатированных ячеек."""
+        for row in self.rows:
+            yield [format_cell(row.get(key)) for key, _ in self.columns]
+
+    def csv_lines(self):
+        """Строки CSV по одной, начиная с заголовка."""
+        writer = csv.writer(Echo(), delimiter=";")
+        # BOM, чтобы Excel открывал файл в UTF-8.
+        yield "\ufeff"
+        yield writer.writerow(self.headers())
+        for cells in self:
+            yield writer.writerow(cells)
+
+    def csv_chunks(self, lines_per_chunk=500):
+        """
+        Строки CSV пачками, чтобы не отправлять клиенту каждую строку отдельно.
+        Заголовок отдается сразу, до чтения первых строк отчета.
+        """
+        lines = self.csv_lines()
+        yield next(lines) + next(lines)
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= lines_per_chunk:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+
+    def html_chunks(self, template_name, context=None, request=None, rows_per_chunk=500):
+        """
+        HTML-страница по частям: шаблон до {{ rows_marker }}, строки таблицы
+        пачками и остаток шаблона. Шаблон не должен перебирать строки сам.
+        """
+        page = render_to_string(
+            template_name,
+            {**(context or {}), "table": self, "rows_marker": mark_safe(ROWS_MARKER)},
+            request,
+        )
+        head, tail = page.split(ROWS_MARKER, 1)
+        yield head
+        chunk = []
+        for cells in self:
+            chunk.append(
+                "<tr>" + "".join(f"<td>{escape(cell)}</td>" for cell in cells) + "</tr>\n"
+            )
+            if len(chunk) >= rows_per_chunk:
+                yield "".join(chunk)
+                chunk = []
+        yield "".join(chunk) + tail
+
+    def html_response(self, template_name, context=None, request=None):
+        """Отдает HTML-страницу с таблицей, формируя ее по мере отправки."""
+        return StreamingHttpResponse(
+            self.html_chunks(template_name, context, request),
+            content_type="text/html; charset=utf-8",
+        )
+
+    def write_csv(self, file):
+        """Записывает таблицу в открытый текстовый файл построчно."""
+        for line in self.csv_lines():
+            file.write(line)
+
+    def csv_response(self, filename):
+        """Отдает таблицу файлом CSV, формируя его по мере отправки."""
+        response = StreamingHttpResponse(
+            self.csv_chunks(), content_type="text/csv; charset=utf-8"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -1,3 +1,1520 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cashbox_app.addresses import AddressDirectory
+from cashbox_app.balances import (
+    check_register_balances,
+    latest_reports,
+    latest_reports_queryset,
+    rebuild_daily_register_totals,
+    rebuild_register_balances,
+    register_totals,
+    save_cash_reports,
+)
+from cashbox_app.changes import changes_page, changes_queryset
+from cashbox_app.forms import PriceChangesForm
+from cashbox_app.hashers import (
+    MIN_ITERATIONS,
+    TunablePBKDF2PasswordHasher,
+    check_password_hash_iterations,
+)
+from cashbox_app.harvest import (
+    collect_harvest,
+    harvest_page,
+    harvest_queryset,
+    rebuild_metal_stock,
+)
+from cashbox_app.management.commands.bench_startup import HEAVY_MODULES
+from cashbox_app.models import (
+    FLOW_FIELDS,
+    METAL_SUM_FIELDS,
+    Address,
+    CashRegisterChoices,
+    CashReport,
+    CashReportStatusChoices,
+    CustomUser,
+    BalanceBreak,
+    DailyRegisterTotals,
+    DeletedRow,
+    GoldStandard,
+    GoldStandardChoices,
+    HarvestManifest,
+    LocationStatusChoices,
+    MetalStock,
+    MonthlyRollup,
+    RegisterBalance,
+    Schedule,
+    SecretRoom,
+)
+from cashbox_app.prices import PriceTable, price_table
+from cashbox_app.reconciliation import find_breaks, run_reconciliation
+from cashbox_app.reports import (
+    Attendance,
+    attendance_queryset,
+    cash_report_export_rows,
+    schedule_report_queryset,
+)
+from cashbox_app.rollups import freeze_month, monthly_attendance, schedule_rows
+from cashbox_app.sessions import SESSION_REFRESHED_KEY, SessionRefreshMiddleware
+from cashbox_app.tables import ReportTable
+from cashbox_app.views import current_balance, open_reports
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN проверяется на PostgreSQL.")
+class QueryPlanTests(TestCase):
+    """
+    Основные запросы к cash_report читают таблицу по индексам.
+
+    Таблица заполняется историей за год по нескольким адресам и
+    анализируется (ANALYZE), поэтому планировщик выбирает план по
+    реальной статистике, а не по пустой таблице.
+    """
+
+    addresses_count = 20
+    days = 365
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        cls.addresses = Address.objects.bulk_create(
+            [
+                Address(city="test", street=f"street {number}", home=str(number))
+                for number in range(cls.addresses_count)
+            ]
+        )
+        cls.authors = CustomUser.objects.bulk_create(
+            [CustomUser(username=f"plan_test_{number}") for number in range(5)]
+        )
+
+        reports = []
+        for offset in range(cls.days, -1, -1):
+            day = cls.today - timedelta(days=offset)
+            for number, address in enumerate(cls.addresses):
+                for register in CashRegisterChoices.values:
+                    reports.append(
+                        CashReport(
+                            id_address=address,
+                            cas_register=register,
+                            shift_day=day,
+                            shift_date=datetime.combine(day, time(9)),
+                            author=cls.authors[(number + offset) % len(cls.authors)],
+                            # Открыты только отчеты последних дней.
+                            status=(
+                                CashReportStatusChoices.OPEN
+                                if offset < 2
+                                else CashReportStatusChoices.CLOSED
+                            ),
+                            cash_balance_beginning=1000,
+                            introduced=10,
+                            interest_return=5,
+                            loans_issued=3,
+                            used_farming=2,
+                            boss_took_it=1,
+                            cash_register_end=1009,
+                        )
+                    )
+        CashReport.objects.bulk_create(reports, batch_size=5000)
+        # Отчеты изменялись в день смены, а не в момент заполнения таблицы.
+        CashReport.objects.update(updated_at=F("shift_date") + timedelta(hours=10))
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {CashReport._meta.db_table}")
+
+    def hot_querysets(self):
+        """Запросы страниц и API в том виде, в каком их выполняет приложение."""
+        address = self.addresses[0]
+        # Отчеты руководителя: прошлый и текущий месяц.
+        month_start = (self.today.replace(day=1) - timedelta(days=1)).replace(day=1)
+        week_ago = datetime.combine(self.today - timedelta(days=7), time.min)
+        return {
+            # Основная страница сотрудника, корректировка, сохранение.
+            "latest_reports": latest_reports_queryset([address.id]),
+            # ReportSubmittedView.post.
+            "open_reports": open_reports(address.id, self.authors[0]),
+            # CountVisitsBriefView и CountVisitsFullView.
+            "count_visits": attendance_queryset(month_start, self.today),
+            # ScheduleReportView.
+            "schedule_report": schedule_report_queryset(month_start, self.today),
+            # Лента изменений API (ChangeFeedAPIView).
+            "change_feed": changes_queryset(
+                "cash_reports", f"{week_ago.isoformat()}_0"
+            )[:500],
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_querysets().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertNotIn(
+                    f"Seq Scan on {CashReport._meta.db_table}", plan, msg=plan
+                )
+
+
+# Выполняется в отдельном процессе: импорт ROOT_URLCONF "с нуля".
+# Запросы к БД не выполняются, а записываются и прерывают импорт.
+STARTUP_SCRIPT = """
+import json, sys
+import django
+from django.db import connection
+
+django.setup()
+queries = []
+
+def forbid_queries(execute, sql, params, many, context):
+    queries.append(sql)
+    raise RuntimeError("Запрос к БД при импорте")
+
+error = None
+with connection.execute_wrapper(forbid_queries):
+    try:
+        import {urlconf}
+    except Exception as exc:
+        error = repr(exc)
+print(json.dumps({{
+    "queries": queries,
+    "error": error,
+    "heavy_modules": [name for name in {heavy_modules!r} if name in sys.modules],
+}}))
+"""
+
+
+class StartupTests(SimpleTestCase):
+    """Импорт URLconf в новом процессе (см. также команду bench_startup)."""
+
+    def test_urlconf_import_has_no_queries_and_heavy_modules(self):
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                STARTUP_SCRIPT.format(
+                    urlconf=settings.ROOT_URLCONF, heavy_modules=HEAVY_MODULES
+                ),
+            ],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE},
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        self.assertEqual(result["queries"], [])
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["heavy_modules"], [])
+
+
+# Версии адресов, справочник адресов и троттлинг API - в памяти процесса,
+# а не в файловом кэше проекта.
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tests",
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tests-sessions",
+    },
+}
+
+
+def cash_report(address, day, register=CashRegisterChoices.BUYING_UP, **values):
+    """Несохраненный отчет кассы за день с оборотами по умолчанию."""
+    values = {
+        "cash_balance_beginning": 1000,
+        "introduced": 10,
+        "interest_return": 5,
+        "loans_issued": 3,
+        "used_farming": 2,
+        "boss_took_it": 1,
+        **values,
+    }
+    values.setdefault(
+        "cash_register_end",
+        values["cash_balance_beginning"]
+        + values["introduced"]
+        + values["interest_return"]
+        - values["loans_issued"]
+        - values["used_farming"]
+        - values["boss_took_it"],
+    )
+    return CashReport(
+        id_address=address, cas_register=register, shift_day=day, **values
+    )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RegisterBalanceTests(TestCase):
+    """Снимок баланса кассы (RegisterBalance) при записи и удалении отчетов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="balance", home="1")
+        cls.days = [date(2026, 9, 1) + timedelta(days=offset) for offset in range(3)]
+
+    def balance(self, register=CashRegisterChoices.BUYING_UP):
+        return RegisterBalance.objects.filter(
+            id_address=self.address, cas_register=register
+        ).first()
+
+    def test_save_updates_snapshot(self):
+        report = cash_report(self.address, date.today(), cash_register_end=700)
+        report.save()
+        self.assertEqual(self.balance().report_id, report.id)
+        self.assertEqual(self.balance().cash_register_end, 700)
+
+        report.cash_register_end = 650
+        report.save()
+        self.assertEqual(self.balance().cash_register_end, 650)
+        self.assertEqual(
+            current_balance(self.address.id),
+            {"buying_up": 650, "pawnshop": 0, "technique": 0},
+        )
+
+    def test_save_cash_reports_keeps_latest_report(self):
+        reports = save_cash_reports(
+            [
+                cash_report(self.address, day, register, cash_register_end=number)
+                for number, day in enumerate(self.days)
+                for register in (
+                    CashRegisterChoices.BUYING_UP,
+                    CashRegisterChoices.PAWNSHOP,
+                )
+            ]
+        )
+        self.assertEqual(RegisterBalance.objects.count(), 2)
+        self.assertEqual(self.balance().report_id, reports[-2].id)
+        pawnshop = self.balance(CashRegisterChoices.PAWNSHOP)
+        self.assertEqual(pawnshop.cash_register_end, 2)
+
+    def test_delete_latest_report_moves_snapshot_to_previous(self):
+        reports = save_cash_reports(
+            [
+                cash_report(self.address, day, cash_register_end=day.day)
+                for day in self.days
+            ]
+        )
+
+        reports[2].delete()
+        self.assertEqual(self.balance().report_id, reports[1].id)
+        self.assertEqual(self.balance().cash_register_end, 2)
+
+        reports[1].delete()
+        reports[0].delete()
+        self.assertIsNone(self.balance())
+
+
+@skipUnless(connection.vendor == "postgresql", "DISTINCT ON есть только в PostgreSQL.")
+@override_settings(CACHES=TEST_CACHES)
+class LatestReportsTests(TestCase):
+    """Последние отчеты касс одним запросом DISTINCT ON (latest_reports)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Одинаковые адреса: порядок должен идти по id, а не по названию.
+        cls.addresses = [
+            Address.objects.create(city="test", street="latest", home="1")
+            for _ in range(2)
+        ]
+        cls.first_address = Address.objects.create(city="a", street="a", home="1")
+        cls.user = CustomUser.objects.create_user(username="latest_test")
+        cls.days = [date(2026, 9, 1) + timedelta(days=offset) for offset in range(3)]
+        cls.reports = save_cash_reports(
+            [
+                cash_report(address, day, register, cash_register_end=number)
+                for address in (*cls.addresses, cls.first_address)
+                for number, day in enumerate(cls.days)
+                for register in CashRegisterChoices.values
+            ]
+        )
+
+    def test_latest_reports(self):
+        reports = latest_reports()
+        self.assertEqual(len(reports), 9)
+        for (_, register), report in reports.items():
+            self.assertEqual(report.shift_day, self.days[-1])
+            self.assertEqual(report.cas_register, register)
+
+        address_id = self.addresses[1].id
+        self.assertEqual(
+            {key[0] for key in latest_reports([address_id])}, {address_id}
+        )
+
+    def test_check_and_rebuild_register_balances(self):
+        self.assertEqual(check_register_balances(), [])
+
+        RegisterBalance.objects.filter(id_address=self.addresses[0]).update(
+            cash_register_end=0
+        )
+        self.assertEqual(len(check_register_balances()), 3)
+        self.assertEqual(rebuild_register_balances(), 9)
+        self.assertEqual(check_register_balances(), [])
+
+    def test_report_pages_show_latest_reports(self):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["selected_address_id"] = self.addresses[1].id
+        session.save()
+        for name in ("report_submitted", "saved"):
+            with self.subTest(name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                initial = response.context["form"].initial
+                self.assertEqual(initial["cash_register_end_pawnshop"], 2)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AddressDirectoryTests(TestCase):
+    """Справочник адресов в памяти процесса и общая версия в кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="directory", home="1")
+
+    def directory(self):
+        # Отдельный экземпляр - как справочник другого процесса.
+        directory = AddressDirectory()
+        directory.check_interval = 0
+        return directory
+
+    def test_reads_without_queries_until_version_changes(self):
+        directory = self.directory()
+        self.assertEqual(directory.get(self.address.id), self.address)
+        with self.assertNumQueries(0):
+            self.assertEqual(directory.get(str(self.address.id)), self.address)
+            # Неизвестный id не перечитывает справочник.
+            self.assertIsNone(directory.get(self.address.id + 1000))
+            self.assertIsNone(directory.get("abc"))
+            self.assertEqual(directory.all(), [self.address])
+
+    def test_changes_are_seen_by_other_processes_after_commit(self):
+        directory = self.directory()
+        directory.all()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added = Address.objects.create(city="test", street="directory", home="2")
+            self.address.home = "1a"
+            self.address.save()
+        self.assertEqual(directory.get(added.id), added)
+        self.assertEqual(directory.get(self.address.id).home, "1a")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added.delete()
+        self.assertIsNone(directory.get(added.id))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PriceTableTests(TestCase):
+    """Цены на металл в памяти процесса, версия цен - в общем кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.price = GoldStandard.objects.create(
+            gold_standard=GoldStandardChoices.GOLD585, price_rubles=5000
+        )
+
+    def setUp(self):
+        # Версия цен прошлых тестов не должна совпасть с текущей.
+        cache.clear()
+
+    def test_prices_are_reloaded_only_after_bump(self):
+        table = PriceTable()
+        prices = table.prices()
+        self.assertEqual(prices[GoldStandardChoices.GOLD585], 5000)
+        self.assertIsNone(prices[GoldStandardChoices.SILVER925])
+
+        self.price.price_rubles = 5500
+        self.price.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(table.price(GoldStandardChoices.GOLD585), 5000)
+            self.assertEqual(table.rows(), [self.price])
+
+        # Версию меняет другой процесс (например, страница изменения цен).
+        PriceTable().bump()
+        self.assertEqual(table.price(GoldStandardChoices.GOLD585), 5500)
+
+    def test_price_changes_view_bumps_version(self):
+        self.assertEqual(price_table.price(GoldStandardChoices.GOLD585), 5000)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("price_changes"), {"gold_585": "6000", "silver_925": "80"}
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(price_table.price(GoldStandardChoices.GOLD585), 6000)
+        self.assertEqual(price_table.price(GoldStandardChoices.SILVER925), 80)
+        self.assertEqual(PriceChangesForm().fields["gold_585"].initial, 6000)
+
+
+def shift(
+    address, day, opened, closed, register=CashRegisterChoices.BUYING_UP, **values
+):
+    """
+    Отчет смены: пришел в opened, последний раз изменил отчет в closed.
+    shift_date и updated_at проставляются при записи, поэтому меняются UPDATE.
+    """
+    report = save_cash_reports([cash_report(address, day, register, **values)])[0]
+    CashReport.objects.filter(pk=report.pk).update(
+        shift_date=datetime.combine(day, opened),
+        updated_at=datetime.combine(day, closed),
+    )
+    return report
+
+
+@skipUnless(connection.vendor == "postgresql", "Минуты считаются в PostgreSQL.")
+@override_settings(CACHES=TEST_CACHES)
+class ScheduleReportTests(TestCase):
+    """Смены скупки с расписанием адреса на день недели (одним запросом)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="schedule", home="1")
+        cls.other = Address.objects.create(city="test", street="schedule", home="2")
+        cls.user = CustomUser.objects.create_user(username="schedule_test")
+        Schedule.objects.create(
+            address=cls.address,
+            day_of_week="monday",
+            opening_time=time(9),
+            closing_time=time(18),
+        )
+        cls.monday = date(2026, 9, 7)
+
+    def rows(self):
+        week_later = self.monday + timedelta(days=7)
+        return list(schedule_report_queryset(self.monday, week_later))
+
+    def test_late_and_early_minutes(self):
+        shift(
+            self.address, self.monday, time(9, 25, 30), time(17, 40), author=self.user
+        )
+        # Вовремя: пришел раньше, ушел позже.
+        shift(self.address, self.monday + timedelta(days=7), time(8, 50), time(18, 5))
+
+        late, on_time = self.rows()
+        self.assertEqual(late["weekday"], "monday")
+        self.assertEqual(late["opening_time"], time(9))
+        self.assertEqual(late["closing_time"], time(18))
+        self.assertEqual(late["opening_time_fact"], time(9, 25, 30))
+        self.assertEqual((late["late_minutes"], late["early_minutes"]), (25, 20))
+        self.assertEqual(late["author__username"], "schedule_test")
+        self.assertEqual((on_time["late_minutes"], on_time["early_minutes"]), (0, 0))
+
+    def test_shift_without_schedule(self):
+        # Расписания на вторник нет, у второго адреса расписания нет вовсе.
+        shift(self.address, self.monday + timedelta(days=1), time(10), time(12))
+        shift(self.other, self.monday, time(10), time(12))
+        # Другие кассы в отчет не попадают.
+        shift(
+            self.address, self.monday, time(10), time(12), CashRegisterChoices.PAWNSHOP
+        )
+
+        rows = self.rows()
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertIsNone(row["opening_time"])
+            self.assertIsNone(row["late_minutes"])
+            self.assertIsNone(row["early_minutes"])
+        self.assertEqual(
+            [row["id_address_id"] for row in rows], [self.other.id, self.address.id]
+        )
+
+
+class ReportTableTests(SimpleTestCase):
+    """Таблица отчета: форматирование ячеек и вывод в CSV."""
+
+    columns = [("name", "Имя"), ("day", "День"), ("at", "Время"), ("sum", "Сумма")]
+    rows = [
+        {"name": "Иванов", "day": date(2026, 9, 7), "at": time(9, 5), "sum": 10},
+        {"name": "Петров; мл.", "day": None, "at": datetime(2026, 9, 7, 18, 0, 1)},
+    ]
+
+    def test_cells(self):
+        table = ReportTable(self.columns, self.rows)
+        self.assertEqual(table.headers(), ["Имя", "День", "Время", "Сумма"])
+        self.assertEqual(
+            list(table),
+            [
+                ["Иванов", "07.09.2026", "09:05:00", "10"],
+                ["Петров; мл.", "-", "07.09.2026 18:00:01", "-"],
+            ],
+        )
+
+    def test_csv(self):
+        lines = list(ReportTable(self.columns, iter(self.rows)).csv_lines())
+        self.assertEqual(
+            lines,
+            [
+                "\ufeff",
+                "Имя;День;Время;Сумма\r\n",
+                "Иванов;07.09.2026;09:05:00;10\r\n",
+                '"Петров; мл.";-;07.09.2026 18:00:01;-\r\n',
+            ],
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AttendanceTests(TestCase):
+    """Посещаемость сотрудник × день одним сгруппированным запросом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="Ленина", home="1")
+        cls.other = Address.objects.create(city="test", street="Мира", home="2")
+        cls.ivanov = CustomUser.objects.create_user(username="ivanov")
+        cls.petrov = CustomUser.objects.create_user(username="petrov")
+
+    def work(self, user, address, day, registers=(CashRegisterChoices.BUYING_UP,)):
+        save_cash_reports(
+            [cash_report(address, day, register, author=user) for register in registers]
+        )
+
+    def test_matrix(self):
+        september = [date(2026, 9, day) for day in range(1, 31)]
+        # Отчеты других касс не добавляют ни дней, ни строк.
+        self.work(self.ivanov, self.address, september[0], CashRegisterChoices.values)
+        self.work(self.ivanov, self.address, september[1])
+        self.work(self.ivanov, self.other, september[1])
+        self.work(self.petrov, self.other, september[2])
+        self.work(self.petrov, self.other, date(2026, 10, 1))
+
+        with self.assertNumQueries(1):
+            attendance = Attendance(2026, 9)
+        self.assertEqual(attendance.days, range(1, 31))
+        ivanov, petrov = attendance.employees
+        self.assertEqual(ivanov["username"], "ivanov")
+        self.assertEqual(ivanov["total_days"], 2)
+        self.assertEqual(
+            ivanov["days"], {1: [self.address.id], 2: [self.address.id, self.other.id]}
+        )
+        self.assertEqual(ivanov["addresses"], {self.address.id: 2, self.other.id: 1})
+        self.assertEqual(petrov["days"], {3: [self.other.id]})
+
+        brief = list(attendance.brief_rows())
+        self.assertEqual(
+            brief[0],
+            {
+                "username": "ivanov",
+                "total_days": 2,
+                "addresses": "Ленина, 1: 2; Мира, 2: 1",
+            },
+        )
+        matrix = list(attendance.matrix_rows())
+        self.assertEqual(matrix[0][2], "Ленина, 1 / Мира, 2")
+        self.assertNotIn(1, matrix[1])
+        self.assertEqual(len(attendance.matrix_columns()), 32)
+
+    def test_count_visits_csv(self):
+        today = date.today()
+        self.work(self.petrov, self.other, today)
+        response = self.client.get(
+            reverse("count_visits_full"),
+            {"year": today.year, "month": today.month, "format": "csv"},
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("petrov;"))
+        self.assertIn("Мира, 2", lines[1])
+
+        response = self.client.get(reverse("count_visits_brief"), {"year": "x"})
+        self.assertEqual(response.status_code, 404)
+
+
+
+class CashReportExportTests(TestCase):
+    """Выгрузка кассовых отчетов за период порциями и файлом CSV."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="Ленина", home="1")
+        cls.other = Address.objects.create(city="test", street="Мира", home="2")
+        cls.user = CustomUser.objects.create_user(username="export_test")
+        save_cash_reports(
+            [
+                cash_report(cls.other, date(2026, 9, 2), author=cls.user),
+                cash_report(cls.address, date(2026, 9, 2), author=cls.user),
+                cash_report(
+                    cls.address,
+                    date(2026, 9, 1),
+                    CashRegisterChoices.PAWNSHOP,
+                    author=cls.user,
+                ),
+                cash_report(cls.address, date(2026, 10, 1), author=cls.user),
+            ]
+        )
+
+    def test_rows(self):
+        rows = list(
+            cash_report_export_rows(date(2026, 9, 1), date(2026, 9, 30), chunk_size=1)
+        )
+        self.assertEqual(
+            [(row["shift_day"], row["id_address__street"]) for row in rows],
+            [
+                (date(2026, 9, 1), "Ленина"),
+                (date(2026, 9, 2), "Ленина"),
+                (date(2026, 9, 2), "Мира"),
+            ],
+        )
+        self.assertEqual(rows[0]["cas_register"], CashRegisterChoices.PAWNSHOP.label)
+        self.assertEqual(rows[0]["author__username"], "export_test")
+
+        september = (date(2026, 9, 1), date(2026, 9, 30))
+        rows = list(cash_report_export_rows(*september, [self.other.id]))
+        self.assertEqual([row["id_address__street"] for row in rows], ["Мира"])
+
+    def test_view(self):
+        url = reverse("cash_report_export")
+        params = {"date_from": "2026-09-01", "date_to": "2026-09-30"}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "cash_reports_2026-09-01_2026-09-30.csv", response["Content-Disposition"]
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith("01.09.2026;test;Ленина;1;Ломбард;"))
+
+        response = self.client.get(
+            url, {"date_from": "2026-09-30", "date_to": "2026-09-01"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+
+
+@skipUnless(connection.vendor == "postgresql", "Итоги включают отчет по расписанию.")
+@override_settings(CACHES=TEST_CACHES)
+class MonthlyRollupTests(TestCase):
+    """Итоги закрытых месяцев: заморозка командой, чтение без пересчета."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="rollup", home="1")
+        cls.user = CustomUser.objects.create_user(username="rollup_test")
+        cls.month = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        cls.reports = [
+            shift(
+                cls.address,
+                cls.month + timedelta(days=offset),
+                time(9),
+                time(18),
+                author=cls.user,
+                status=CashReportStatusChoices.CLOSED,
+            )
+            for offset in range(3)
+        ]
+
+    def test_build_monthly_rollups_freezes_closed_months(self):
+        live = monthly_attendance(self.month.year, self.month.month).employees
+        call_command("build_monthly_rollups", stdout=StringIO())
+        self.assertEqual(MonthlyRollup.objects.filter(month=self.month).count(), 1)
+
+        # Замороженный месяц читается одним запросом из monthly_rollup.
+        with self.assertNumQueries(1):
+            frozen = monthly_attendance(self.month.year, self.month.month).employees
+        self.assertEqual(frozen, live)
+        with self.assertNumQueries(1):
+            rows = schedule_rows(self.month, self.month + timedelta(days=1))
+        self.assertEqual(
+            [row["shift_day"] for row in rows],
+            [self.month, self.month + timedelta(days=1)],
+        )
+
+        # Исправление отчета размораживает месяц.
+        report = self.reports[0]
+        report.boss_took_it = 7
+        save_cash_reports([report])
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+    def test_open_and_current_months_are_not_frozen(self):
+        CashReport.objects.filter(pk=self.reports[1].pk).update(
+            status=CashReportStatusChoices.OPEN
+        )
+        self.assertFalse(freeze_month(self.month))
+        self.assertFalse(freeze_month(date.today().replace(day=1)))
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+    def test_report_pages_do_not_freeze(self):
+        response = self.client.get(
+            reverse("count_visits_brief"),
+            {"year": self.month.year, "month": self.month.month},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+
+def daily_totals():
+    """Строки DailyRegisterTotals без id - для сравнения с пересборкой."""
+    return list(
+        DailyRegisterTotals.objects.order_by("id_address_id", "cas_register", "day")
+        .values_list(
+            "id_address",
+            "cas_register",
+            "day",
+            "cash_balance_beginning",
+            "cash_register_end",
+            *FLOW_FIELDS,
+            *[f"cum_{field}" for field in FLOW_FIELDS],
+        )
+    )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RegisterTotalsTests(TestCase):
+    """Итоги касс за день (DailyRegisterTotals) при записи, удалении и пересборке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="totals", home="1")
+        cls.other = Address.objects.create(city="test", street="totals", home="2")
+        cls.days = [date(2026, 9, 1) + timedelta(days=offset) for offset in range(5)]
+
+    def save_days(self, days, address=None, **values):
+        return save_cash_reports(
+            [cash_report(address or self.address, day, **values) for day in days]
+        )
+
+    def assertTotalsMatchRebuild(self):
+        totals = daily_totals()
+        rebuild_daily_register_totals()
+        self.assertEqual(totals, daily_totals())
+
+    def test_save_cash_reports_updates_totals(self):
+        self.save_days(self.days[:3])
+        self.save_days(self.days[:2], address=self.other, introduced=100)
+        self.assertEqual(DailyRegisterTotals.objects.count(), 5)
+        self.assertTotalsMatchRebuild()
+
+    def test_backdated_report_recomputes_following_days(self):
+        self.save_days(self.days[2:])
+        self.save_days(self.days[:1], introduced=50)
+        # Исправление дня в середине истории.
+        self.save_days(self.days[3:4], introduced=70, loans_issued=20)
+        self.assertTotalsMatchRebuild()
+
+    def test_rebuild_keeps_identical_addresses_apart(self):
+        twin = Address.objects.create(city="test", street="totals", home="1")
+        for day in self.days:
+            self.save_days([day], introduced=10)
+            self.save_days([day], address=twin, introduced=1)
+        self.assertTotalsMatchRebuild()
+
+        last = DailyRegisterTotals.objects.filter(day=self.days[-1])
+        self.assertEqual(
+            dict(last.values_list("id_address", "cum_introduced")),
+            {self.address.id: 50, twin.id: 5},
+        )
+
+    def test_register_totals_for_period(self):
+        self.save_days(self.days[:2])
+        self.save_days(self.days[2:4], introduced=100, cash_balance_beginning=500)
+
+        totals = register_totals(self.days[2], self.days[4])
+        row = next(row for row in totals if row["id_address"] == self.address.id)
+        self.assertEqual(row["introduced"], 200)
+        self.assertEqual(row["loans_issued"], 6)
+        self.assertEqual(row["cash_balance_beginning"], 500)
+        self.assertEqual(row["cash_register_end"], 500 + 100 + 5 - 3 - 2 - 1)
+
+        # Без отчетов в периоде остаток переносится с последнего дня до него.
+        row = register_totals(self.days[4], self.days[4])[0]
+        self.assertEqual(row["introduced"], 0)
+        self.assertEqual(row["cash_balance_beginning"], row["cash_register_end"])
+
+    def test_delete_report_removes_day_from_totals(self):
+        reports = self.save_days(self.days, introduced=10)
+        self.save_days(self.days[1:3], introduced=40)
+
+        reports[2].delete()
+        self.assertFalse(DailyRegisterTotals.objects.filter(day=self.days[2]).exists())
+        self.assertTotalsMatchRebuild()
+
+        reports[4].delete()
+        self.assertTotalsMatchRebuild()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReconciliationTests(TestCase):
+    """Разрывы цепочки остатков: LAG() по смене той же кассы адреса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="reconcile", home="1")
+        # Адрес с тем же названием - цепочки касс не должны смешиваться.
+        cls.twin = Address.objects.create(city="test", street="reconcile", home="1")
+        cls.days = [date(2026, 9, 1) + timedelta(days=offset) for offset in range(4)]
+
+    def chain(self, address, register=CashRegisterChoices.BUYING_UP, gaps=None):
+        """Смены подряд, остаток на начало = остаток на конец прошлой смены + gap."""
+        gaps = gaps or {}
+        reports = []
+        beginning = 1000
+        for day in self.days:
+            beginning += gaps.get(day, 0)
+            report = cash_report(
+                address, day, register, cash_balance_beginning=beginning
+            )
+            reports.append(report)
+            beginning = report.cash_register_end
+        return save_cash_reports(reports)
+
+    def test_find_breaks(self):
+        reports = self.chain(self.address, gaps={self.days[2]: 50})
+        self.chain(self.twin)
+        self.chain(self.address, CashRegisterChoices.PAWNSHOP)
+
+        breaks = find_breaks()
+        self.assertEqual(len(breaks), 1)
+        row = breaks[0]
+        self.assertEqual(row["id"], reports[2].id)
+        self.assertEqual(row["previous_id"], reports[1].id)
+        self.assertEqual(row["previous_day"], self.days[1])
+        self.assertEqual(row["expected"], reports[1].cash_register_end)
+        self.assertEqual(row["cash_balance_beginning"], row["expected"] + 50)
+
+        scope = {(self.address.id, CashRegisterChoices.BUYING_UP): self.days[2]}
+        self.assertEqual([row["id"] for row in find_breaks(scope)], [reports[2].id])
+        scope = {(self.address.id, CashRegisterChoices.BUYING_UP): self.days[3]}
+        self.assertEqual(find_breaks(scope), [])
+
+    def test_incremental_run_rechecks_changed_registers(self):
+        reports = self.chain(self.address, gaps={self.days[1]: 10})
+        twin_reports = self.chain(self.twin, gaps={self.days[3]: 20})
+
+        run = run_reconciliation()
+        self.assertTrue(run.full)
+        self.assertEqual(run.breaks_found, 2)
+
+        # Исправление остатка закрывает разрыв только своей кассы.
+        report = reports[1]
+        report.cash_balance_beginning -= 10
+        report.introduced += 10
+        save_cash_reports([report])
+
+        run = run_reconciliation()
+        self.assertFalse(run.full)
+        self.assertEqual(run.checked_registers, 1)
+        self.assertEqual(run.breaks_found, 0)
+        self.assertEqual(
+            list(BalanceBreak.objects.values_list("report_id", flat=True)),
+            [twin_reports[3].id],
+        )
+
+    def test_command_fails_on_breaks(self):
+        self.chain(self.address, gaps={self.days[3]: 5})
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("reconcile_balances", "--full", "--fail-on-breaks", stdout=out)
+        self.assertIn("новых разрывов: 1", out.getvalue())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HarvestPageTests(TestCase):
+    """Страницы урожая по курсору (shift_date, id): без пропусков и повторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="harvest", home="1")
+        cls.other = Address.objects.create(city="test", street="harvest", home="2")
+        cls.moment = datetime(2026, 9, 1, 12)
+        cls.purchases = purchases = SecretRoom.objects.bulk_create(
+            [
+                SecretRoom(
+                    id_address=cls.other if number == 6 else cls.address,
+                    nomenclature=f"скупка {number}",
+                    price=1,
+                    weight_clean=1,
+                    weight_fact=1,
+                    sum=1,
+                )
+                for number in range(7)
+            ]
+        )
+        # Одинаковые даты у нескольких скупок: порядок внутри даты - по id.
+        for number, purchase in enumerate(purchases):
+            SecretRoom.objects.filter(pk=purchase.pk).update(
+                shift_date=cls.moment + timedelta(days=number // 3)
+            )
+        SecretRoom.objects.filter(pk=purchases[0].pk).update(
+            status=LocationStatusChoices.GATHER
+        )
+        cls.expected = list(
+            SecretRoom.objects.order_by("-shift_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+    def test_pages(self):
+        rows, cursor, pages = [], None, 0
+        while True:
+            page, cursor = harvest_page(harvest_queryset(), cursor, size=3)
+            rows.extend(page)
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual([row["id"] for row in rows], self.expected)
+        self.assertEqual(pages, 3)
+        self.assertEqual(rows[0]["address"], self.other)
+        self.assertEqual(harvest_page(harvest_queryset(), "broken")[0], rows)
+
+    def test_filters(self):
+        purchases = harvest_queryset(
+            status=LocationStatusChoices.LOCAL,
+            address_ids=[self.address.id],
+            date_from=self.moment.date(),
+            date_to=self.moment.date() + timedelta(days=1),
+        )
+        self.assertEqual(
+            [row["id"] for row in purchases],
+            [purchase.id for purchase in reversed(self.purchases[1:6])],
+        )
+
+    def test_view_queries_do_not_depend_on_rows(self):
+        url = reverse("harvest_views")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as one_row:
+            response = self.client.get(url, {"addresses": self.other.id})
+        self.assertEqual(len(response.context["table"].rows), 1)
+        with CaptureQueriesContext(connection) as all_rows:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context["table"].rows), 7)
+        self.assertIsNone(response.context["next_query"])
+        self.assertEqual(len(all_rows), len(one_row))
+
+        after = f"{self.moment.isoformat()}_{self.purchases[1].id}"
+        response = self.client.get(url, {"after": after})
+        self.assertEqual(
+            [row["id"] for row in response.context["table"].rows],
+            [self.purchases[0].id],
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HarvestViewTests(TestCase):
+    """Сбор урожая со страницы: только руководитель, автор - он же."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="harvest", home="1")
+        cls.purchases = SecretRoom.objects.bulk_create(
+            [
+                SecretRoom(
+                    id_address=cls.address,
+                    nomenclature="кольцо",
+                    gold_standard=GoldStandardChoices.GOLD585,
+                    price=5000,
+                    weight_clean=2,
+                    weight_fact=2,
+                    sum=10000,
+                )
+                for _ in range(3)
+            ]
+        )
+        cls.staff = CustomUser.objects.create_user(
+            username="harvest_boss", is_staff=True
+        )
+        cls.cashier = CustomUser.objects.create_user(username="harvest_cashier")
+
+    def collect(self):
+        return self.client.post(
+            reverse("harvest"),
+            {
+                "from_status": LocationStatusChoices.LOCAL,
+                "addresses": [self.address.id],
+            },
+        )
+
+    def assertNothingMoved(self):
+        self.assertFalse(HarvestManifest.objects.exists())
+        self.assertFalse(
+            SecretRoom.objects.exclude(status=LocationStatusChoices.LOCAL).exists()
+        )
+
+    def test_anonymous_is_redirected_to_login(self):
+        response = self.collect()
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(settings.LOGIN_URL, response["Location"])
+        self.assertNothingMoved()
+
+    def test_cashier_is_forbidden(self):
+        self.client.force_login(self.cashier)
+        self.assertEqual(self.collect().status_code, 403)
+        self.assertEqual(self.client.get(reverse("harvest")).status_code, 403)
+        self.assertNothingMoved()
+
+    def test_staff_collects_harvest(self):
+        self.client.force_login(self.staff)
+        response = self.collect()
+        manifest = HarvestManifest.objects.get()
+        self.assertRedirects(
+            response,
+            f"{reverse('harvest')}?manifest={manifest.id}",
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(manifest.author, self.staff)
+        self.assertEqual(manifest.items, 3)
+        self.assertEqual(
+            SecretRoom.objects.filter(status=LocationStatusChoices.GATHER).count(), 3
+        )
+
+
+def metal_stock():
+    """Ненулевые остатки металла: {(адрес, проба, статус): (скупок, *суммы)}."""
+    stock = {}
+    for row in MetalStock.objects.all():
+        values = (row.items, *[getattr(row, field) for field in METAL_SUM_FIELDS])
+        if any(values):
+            stock[(row.id_address_id, row.gold_standard, row.status)] = values
+    return stock
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MetalStockTests(TestCase):
+    """Остатки металла при каждом способе записи скупок совпадают с пересчетом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="stock", home="1")
+        cls.other = Address.objects.create(city="test", street="stock", home="2")
+
+    def purchase(self, address=None, weight="10.00", **values):
+        return SecretRoom(
+            id_address=address or self.address,
+            nomenclature="кольцо",
+            price=5000,
+            weight_clean=Decimal(weight),
+            weight_fact=Decimal(weight) + 1,
+            sum=Decimal(weight) * 5000,
+            **values,
+        )
+
+    def assertStockMatchesRebuild(self):
+        stock = metal_stock()
+        rebuild_metal_stock()
+        self.assertEqual(stock, metal_stock())
+
+    def test_save_update_and_delete(self):
+        purchase = self.purchase(gold_standard=GoldStandardChoices.GOLD375)
+        purchase.save()
+        self.assertEqual(purchase.converter585, Decimal("6.41"))
+        self.assertStockMatchesRebuild()
+
+        purchase.gold_standard = GoldStandardChoices.SILVER925
+        purchase.weight_clean = Decimal("12.50")
+        purchase.save()
+        self.assertIsNone(purchase.converter585)
+        self.assertStockMatchesRebuild()
+
+        purchase.weight_clean = Decimal("3.00")
+        purchase.save(update_fields=["weight_clean"])
+        self.assertStockMatchesRebuild()
+
+        purchase.id_address = self.other
+        purchase.save(update_fields=["id_address"])
+        self.assertStockMatchesRebuild()
+
+        purchase.delete()
+        self.assertStockMatchesRebuild()
+
+    def test_bulk_create_and_harvest(self):
+        SecretRoom.objects.bulk_create(
+            [
+                self.purchase(weight="1.50"),
+                self.purchase(weight="2.25", gold_standard=GoldStandardChoices.GOLD750),
+                self.purchase(self.other, weight="4.00"),
+                self.purchase(self.other, gold_standard=GoldStandardChoices.SILVER875),
+            ]
+        )
+        gold = SecretRoom.objects.filter(converter585__isnull=False)
+        self.assertEqual(gold.count(), 3)
+        self.assertStockMatchesRebuild()
+
+        manifest = collect_harvest([self.address.id])
+        self.assertEqual(manifest.items, 2)
+        self.assertStockMatchesRebuild()
+
+        manifest = collect_harvest(
+            [self.address.id, self.other.id], from_status=LocationStatusChoices.GATHER
+        )
+        self.assertEqual(manifest.items, 2)
+        self.assertEqual(
+            set(SecretRoom.objects.values_list("status", flat=True)),
+            {LocationStatusChoices.LOCAL, LocationStatusChoices.ISSUED},
+        )
+        self.assertStockMatchesRebuild()
+        self.assertIsNone(collect_harvest([self.address.id]))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BatchAPITests(TestCase):
+    """Пакетная запись отчетов и скупок через API терминалов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="api", home="1")
+        cls.user = CustomUser.objects.create_user(username="api_test")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def report_data(self, day, register=CashRegisterChoices.BUYING_UP, **values):
+        return {
+            "id_address": self.address.id,
+            "cas_register": register,
+            "shift_day": day.isoformat(),
+            "cash_balance_beginning": "1000.00",
+            "introduced": "10.00",
+            "loans_issued": "3.00",
+            **values,
+        }
+
+    def test_cash_reports_batch(self):
+        response = self.client.post(
+            reverse("api_cash_reports"),
+            [
+                self.report_data(date(2026, 9, 1)),
+                self.report_data(date(2026, 9, 2), introduced="50.00"),
+                self.report_data(date(2026, 9, 2), CashRegisterChoices.PAWNSHOP),
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(Decimal(response.data[1]["cash_register_end"]), 1047)
+        self.assertEqual(CashReport.objects.filter(author=self.user).count(), 3)
+        self.assertEqual(RegisterBalance.objects.count(), 2)
+        self.assertEqual(DailyRegisterTotals.objects.count(), 3)
+
+        # Повторная передача дня перезаписывает отчет.
+        response = self.client.post(
+            reverse("api_cash_reports"),
+            [self.report_data(date(2026, 9, 2), introduced="60.00")],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(CashReport.objects.count(), 3)
+        balance = RegisterBalance.objects.get(
+            cas_register=CashRegisterChoices.BUYING_UP
+        )
+        self.assertEqual(balance.cash_register_end, 1057)
+
+    def test_cash_reports_batch_rejects_duplicates_and_closed(self):
+        day = date(2026, 9, 1)
+        response = self.client.post(
+            reverse("api_cash_reports"),
+            [self.report_data(day), self.report_data(day, introduced="1.00")],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        save_cash_reports(
+            [cash_report(self.address, day, status=CashReportStatusChoices.CLOSED)]
+        )
+        response = self.client.post(
+            reverse("api_cash_reports"),
+            [self.report_data(date(2026, 9, 2)), self.report_data(day)],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        # Ошибка в одной записи отменяет весь пакет.
+        self.assertEqual(CashReport.objects.count(), 1)
+
+    def test_secret_room_batch(self):
+        response = self.client.post(
+            reverse("api_secret_room"),
+            [
+                {
+                    "id_address": self.address.id,
+                    "nomenclature": "цепь",
+                    "gold_standard": standard,
+                    "price": "5000.00",
+                    "weight_clean": "3.00",
+                    "weight_fact": "3.20",
+                    "sum": "15000.00",
+                }
+                for standard in (
+                    GoldStandardChoices.GOLD750,
+                    GoldStandardChoices.SILVER925,
+                )
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data[0]["converter585"], "3.85")
+        self.assertEqual(response.data[1]["converter925"], "3.00")
+        stock = metal_stock()
+        rebuild_metal_stock()
+        self.assertEqual(stock, metal_stock())
+
+    def test_requires_authentication(self):
+        client = APIClient()
+        for name in ("api_cash_reports", "api_secret_room"):
+            with self.subTest(name):
+                response = client.post(reverse(name), [], format="json")
+                self.assertEqual(response.status_code, 401)
+
+    def test_backdated_report_keeps_its_day_on_save(self):
+        day = date.today() - timedelta(days=3)
+        response = self.client.post(
+            reverse("api_cash_reports"), [self.report_data(day)], format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+        # Закрытие отчета обычным save() не переносит его на день записи.
+        report = CashReport.objects.get()
+        report.status = CashReportStatusChoices.CLOSED
+        report.save()
+        report.refresh_from_db()
+        self.assertEqual(report.shift_day, day)
+        self.assertEqual(
+            list(DailyRegisterTotals.objects.values_list("day", flat=True)), [day]
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ChangeFeedTests(TestCase):
+    """Лента изменений для терминалов: курсор (updated_at, id) без пропусков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="feed", home="1")
+        cls.other = Address.objects.create(city="test", street="feed", home="2")
+        cls.moment = datetime(2026, 9, 1, 12)
+
+    def pages(self, fetch):
+        """Все строки, полученные по цепочке курсоров, и число страниц."""
+        rows, cursor, pages = [], None, 0
+        while True:
+            page_rows, next_cursor, more = fetch(cursor)
+            rows.extend(page_rows)
+            pages += 1
+            if not more:
+                return rows, pages
+            cursor = next_cursor
+
+    def test_change_feed_pages(self):
+        reports = save_cash_reports(
+            [
+                cash_report(address, date(2026, 9, day))
+                for address in (self.address, self.other)
+                for day in range(1, 4)
+            ]
+        )
+        for number, report in enumerate(reports):
+            CashReport.objects.filter(pk=report.pk).update(
+                updated_at=self.moment + timedelta(minutes=number // 2)
+            )
+
+        def fetch(cursor):
+            page = changes_page("cash_reports", cursor, limit=4)
+            return page["results"], page["next"], page["has_more"]
+
+        rows, pages = self.pages(fetch)
+        self.assertEqual([row["id"] for row in rows], [report.id for report in reports])
+        self.assertEqual(pages, 2)
+
+        page = changes_page("cash_reports", address_id=self.other.id)
+        self.assertEqual(
+            [row["id"] for row in page["results"]],
+            [report.id for report in reports[3:]],
+        )
+
+        # Свежее изменение отдается только после окна CHANGE_FEED_SETTLE_SECONDS.
+        cursor = page["next"]
+        CashReport.objects.filter(pk=reports[0].pk).update(
+            updated_at=datetime.now() - timedelta(seconds=5)
+        )
+        page = changes_page("cash_reports", cursor)
+        self.assertEqual(page, {"results": [], "next": cursor, "has_more": False})
+        with override_settings(CHANGE_FEED_SETTLE_SECONDS=0):
+            page = changes_page("cash_reports", cursor)
+        self.assertEqual([row["id"] for row in page["results"]], [reports[0].id])
+
+    def test_deleted_feed(self):
+        report = save_cash_reports([cash_report(self.address, date(2026, 9, 1))])[0]
+        report_id = report.id
+        report.delete()
+        self.assertEqual(changes_page("deleted")["results"], [])
+
+        DeletedRow.objects.update(deleted_at=self.moment)
+        rows = changes_page("deleted")["results"]
+        self.assertEqual(
+            [(row["feed"], row["object_id"], row["address_id"]) for row in rows],
+            [("cash_reports", report_id, self.address.id)],
+        )
+
+    def test_api(self):
+        client = APIClient()
+        url = reverse("api_changes", args=["cash_reports"])
+        self.assertEqual(client.get(url).status_code, 401)
+
+        client.force_authenticate(CustomUser.objects.create_user(username="feed"))
+        response = client.get(reverse("api_changes", args=["unknown"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(client.get(url, {"since": "bad"}).status_code, 400)
+
+        report = save_cash_reports([cash_report(self.address, date(2026, 9, 1))])[0]
+        CashReport.objects.filter(pk=report.pk).update(updated_at=self.moment)
+        response = client.get(url, {"address": self.other.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+        response = client.get(url)
+        self.assertEqual([row["id"] for row in response.data["results"]], [report.id])
+        self.assertFalse(response.data["has_more"])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConditionalGetTests(TestCase):
+    """Страницы с ETag из версий адресов и цен: 304, пока данные не менялись."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.address = Address.objects.create(city="test", street="etag", home="1")
+        cls.other = Address.objects.create(city="test", street="etag", home="2")
+        cls.user = CustomUser.objects.create_user(username="etag_test")
+
+    def setUp(self):
+        cache.clear()
+
+    def save_report(self, address):
+        with self.captureOnCommitCallbacks(execute=True):
+            save_cash_reports([cash_report(address, date.today())])
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_reports_page(self):
+        url = reverse("supervisor_cash_report")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag = response["ETag"]
+
+        # Проверка ETag не обращается к БД.
+        with self.assertNumQueries(0):
+            response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.save_report(self.other)
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        price_table.bump()
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_address_page(self):
+        url = reverse("secret_room")
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+
+        session = self.client.session
+        session["selected_address_id"] = self.address.id
+        session.save()
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+        # Отчет другого адреса страницу не меняет, своего - меняет.
+        self.save_report(self.other)
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        self.save_report(self.address)
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+
+@override_settings(CACHES=TEST_CACHES, SESSION_REFRESH_INTERVAL=60)
+class SessionRefreshTests(TestCase):
+    """Сессия сохраняется при изменении и раз в SESSION_REFRESH_INTERVAL."""
+
+    def process(self, session, now, view_changes=None):
+        request = RequestFactory().get("/")
+        request.session = session
+
+        def view(request):
+            if view_changes:
+                request.session.update(view_changes)
+            return HttpResponse()
+
+        with mock.patch("cashbox_app.sessions.time.time", return_value=now):
+            SessionRefreshMiddleware(view)(request)
+        return session
+
+    def stored_session(self, refreshed_at):
+        session = SessionStore()
+        session.update({"selected_address_id": 1, SESSION_REFRESHED_KEY: refreshed_at})
+        session.save()
+        return SessionStore(session.session_key)
+
+    def test_empty_session_is_not_created(self):
+        session = self.process(SessionStore(), 1000)
+        self.assertFalse(session.modified)
+        self.assertIsNone(session.session_key)
+
+    def test_refresh_once_per_interval(self):
+        session = self.process(self.stored_session(1000), 1059)
+        self.assertFalse(session.modified)
+
+        session = self.process(self.stored_session(1000), 1060)
+        self.assertTrue(session.modified)
+        self.assertEqual(session[SESSION_REFRESHED_KEY], 1060)
+
+    def test_changed_session_gets_refresh_mark(self):
+        session = self.process(
+            self.stored_session(1000), 1001, {"selected_address_id": 2}
+        )
+        self.assertEqual(session[SESSION_REFRESHED_KEY], 1001)
+
+    def test_cookie_is_not_resent_between_refreshes(self):
+        user = CustomUser.objects.create_user(username="session_test")
+        self.client.force_login(user)
+        url = reverse("supervisor_cash_report")
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+class PasswordHasherTests(SimpleTestCase):
+    """Число итераций PBKDF2 не ниже значения Django."""
+
+    def test_iterations_floor(self):
+        self.assertGreaterEqual(TunablePBKDF2PasswordHasher.iterations, MIN_ITERATIONS)
+        for iterations in (None, MIN_ITERATIONS, MIN_ITERATIONS * 2):
+            with self.subTest(iterations), override_settings(
+                PASSWORD_HASH_ITERATIONS=iterations
+            ):
+                self.assertEqual(check_password_hash_iterations(None), [])
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            errors = check_password_hash_iterations(None)
+        self.assertEqual([error.id for error in errors], ["cashbox_app.E001"])
+
+    def test_weaker_hash_is_upgraded(self):
+        hasher = TunablePBKDF2PasswordHasher()
+        encoded = hasher.encode("password", hasher.salt(), iterations=1)
+        self.assertTrue(encoded.startswith("pbkdf2_sha256$1$"))
+        self.assertTrue(hasher.verify("password", encoded))
+        self.assertTrue(hasher.must_update(encoded))
+
+    def test_bench_login_rejects_low_iterations(self):
+        with self.assertRaisesMessage(CommandError, "1000"):
+            call_command("bench_login", "--iterations", "1000", str(MIN_ITERATIONS))
@@ -0,0 +1,72 @@
+"""
+Версии данных адресов для условных GET-запросов (ETag).
+
+Версия адреса лежит в общем кэше (settings.CACHES) и меняется после
+фиксации каждой транзакции, которая записала отчеты касс или скупки
+адреса. Отдельная общая версия меняется при любом таком изменении и
+используется отчетами руководителя по всем адресам. Цены на металл
+версионируются в cashbox_app.prices.
+
+Страница с ETag из этих версий (cashbox_app.views.page_etag) отвечает на
+If-None-Match кодом 304 после одного обращения к кэшу, без запросов к БД.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class AddressVersions:
+    """Номера версий данных по адресам и общий номер версии."""
+
+    prefix = "address_version"
+    all_key = "address_version:all"
+
+    def key(self, address_id):
+        if address_id is None:
+            return self.all_key
+        return f"{self.prefix}:{address_id}"
+
+    def get(self, address_id=None, *extra_keys):
+        """
+        Версия адреса (None - общая версия) и версии extra_keys из кэша
+        одним обращением. Отсутствующие версии создаются заново.
+
+        :return: list
+            Версии в порядке ключей.
+        """
+        keys = [self.key(address_id), *extra_keys]
+        versions = cache.get_many(keys)
+        missing = [key for key in keys if key not in versions]
+        if missing:
+            # Новое уникальное значение не совпадет ни с одним выданным ETag.
+            token = time.time_ns()
+            for key in missing:
+                cache.add(key, token, timeout=None)
+            versions.update(cache.get_many(missing))
+        return [versions.get(key) for key in keys]
+
+    def bump(self, address_ids):
+        """Меняет версии адресов и общую версию."""
+        token = time.time_ns()
+        cache.set_many(
+            {
+                self.all_key: token,
+                **{self.key(address_id): token for address_id in address_ids},
+            },
+            timeout=None,
+        )
+
+    def bump_on_commit(self, address_ids=()):
+        """
+        Меняет версии после фиксации текущей транзакции: иначе параллельный
+        запрос мог бы запомнить под новой версией еще старые данные.
+        Без address_ids меняется только общая версия.
+        """
+        address_ids = set(address_ids)
+        transaction.on_commit(lambda: self.bump(address_ids))
+
+
+address_versions = AddressVersions()
+
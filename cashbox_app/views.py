@@ -1,35 +1,18 @@
 from django.contrib.auth.views import LoginView
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth import login, authenticate
-from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth import login
 from django.http import Http404
 from django.shortcuts import render, redirect
 from django.views import View
 from django.views.generic import FormView, TemplateView
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_protect
+from django.middleware.csrf import CSRF_SESSION_KEY
+from django.views.decorators.http import condition
 from django.utils.decorators import method_decorator
 from django.utils.timezone import now
 from django.utils import timezone
 from django.urls import reverse_lazy, reverse
-from django.db.models import Prefetch
-from django.db.models import Count
-from django.db.models import Max
-from django.db.models.fields import CharField
-from django.db.models import (
-    Case,
-    Value,
-    When,
-    Func,
-    Subquery,
-    OuterRef,
-    F,
-)
-from django.db.models.functions import (
-    ExtractYear,
-    ExtractMonth,
-    ExtractDay,
-    ExtractWeekDay,
-)
 from cashbox_app.forms import (
     CustomAuthenticationForm,
     AddressSelectionForm,
@@ -37,95 +20,159 @@ from cashbox_app.forms import (
     MultiCashReportForm,
     YearMonthForm,
     ScheduleForm,
+    CashReportExportForm,
+    CashDashboardForm,
+    HarvestFilterForm,
+    HarvestRunForm,
     SecretRoomForm,
     PriceChangesForm,
+    REPORT_FORM_FIELDS,
 )
 from cashbox_app.models import (
     Address,
     CashReport,
     CashRegisterChoices,
     CashReportStatusChoices,
-    CustomUser,
-    Schedule,
+    DAYS_OF_WEEK,
+    FLOW_FIELDS,
+    BalanceBreak,
+    ReconciliationRun,
+    HarvestManifest,
     GoldStandard,
     SecretRoom,
+    RegisterBalance,
+)
+from cashbox_app.addresses import address_directory, selected_address
+from cashbox_app.balances import latest_reports, register_totals
+from cashbox_app.prices import price_table
+from cashbox_app.reports import CASH_REPORT_EXPORT_COLUMNS, cash_report_export_rows
+from cashbox_app.harvest import (
+    HARVEST_COLUMNS,
+    METAL_STOCK_COLUMNS,
+    collect_harvest,
+    harvest_page,
+    harvest_queryset,
+    harvest_rows,
+    metal_stock_rows,
 )
+from cashbox_app.reconciliation import run_reconciliation
+from cashbox_app.rollups import monthly_attendance, schedule_rows
+from cashbox_app.tables import ReportTable
+from cashbox_app.sessions import SESSION_REFRESHED_KEY
+from cashbox_app.versions import address_versions
 from datetime import date
-import pandas as pd
+import hashlib
 import logging
 from django.db import transaction
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG)
 
-# Увеличиваем максимальное количество отображаемых столбцов в pandas
-pd.set_option("display.max_columns", None)
-# Увеличиваем ширину вывода в pandas
-pd.set_option("display.width", 1000)
+
+class CsvExportMixin:
+    """
+    Отдает таблицу отчета (context["table"]) файлом CSV, если в запросе
+    передан параметр format=csv.
+    """
+
+    csv_filename = "report.csv"
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get("format") == "csv" and "table" in context:
+            return context["table"].csv_response(self.csv_filename)
+        return super().render_to_response(context, **response_kwargs)
+
+
+def page_etag(request, address_id=None):
+    """
+    ETag страницы: версии данных адреса (None - всех адресов) и цен из кэша,
+    текущий день (страницы подставляют дату) и сессия (отчеты берут
+    из сессии адрес и параметры).
+    Запросов к БД, кроме чтения сессии, не выполняет.
+    """
+    version, prices = address_versions.get(address_id, price_table.version_key)
+    # CSRF-токен попадает в сессию только после первого ответа и меняется
+    # вместе с ключом сессии, время продления сессии на страницу не влияет.
+    session = sorted(
+        item
+        for item in request.session.items()
+        if item[0] not in (CSRF_SESSION_KEY, SESSION_REFRESHED_KEY)
+    )
+    raw = f"{version}:{prices}:{date.today()}:{request.session.session_key}:{session}"
+    return '"' + hashlib.md5(raw.encode()).hexdigest() + '"'
+
+
+def address_page_etag(request, *args, **kwargs):
+    """ETag страницы сотрудника по выбранному адресу."""
+    address_id = request.session.get("selected_address_id")
+    if address_id is None:
+        return None
+    return page_etag(request, address_id)
+
+
+def reports_page_etag(request, *args, **kwargs):
+    """ETag отчета руководителя по всем адресам."""
+    return page_etag(request)
+
+
+# Декораторы get(): браузер перепроверяет страницу при каждом открытии,
+# а если данные не менялись, получает 304 без повторного построения.
+address_page_cache = [
+    cache_control(private=True, no_cache=True),
+    condition(etag_func=address_page_etag),
+]
+reports_page_cache = [
+    cache_control(private=True, no_cache=True),
+    condition(etag_func=reports_page_etag),
+]
 
 
 def current_balance(address_id):
-    """Функция для получения текущего баланса кассы"""
+    """
+    Функция для получения текущего баланса кассы.
+
+    Балансы берутся из снимка RegisterBalance, который обновляется при каждой
+    записи CashReport. Если по кассе еще нет отчетов, баланс равен 0.
+    """
     # Создаю словарь с балансами касс.
-    balance = {"buying_up": None, "pawnshop": None, "technique": None}
+    balance = {"buying_up": 0, "pawnshop": 0, "technique": 0}
 
-    # BUYING_UP ORM зарос
-    buying_up_reports_BUYING_UP = (
-        CashReport.objects.filter(
-            cas_register=CashRegisterChoices.BUYING_UP, id_address_id=address_id
-        )
-        .values("cash_register_end")
-        .annotate(last_updated=Max("updated_at"))
-        .order_by("-last_updated")
-        .first()
+    snapshots = RegisterBalance.objects.filter(id_address_id=address_id).values_list(
+        "cas_register", "cash_register_end"
     )
+    for cas_register, cash_register_end in snapshots:
+        balance[cas_register.lower()] = cash_register_end
 
-    if buying_up_reports_BUYING_UP:
-        # Если результат есть, добавляю его в словарь.
-        balance["buying_up"] = buying_up_reports_BUYING_UP["cash_register_end"]
-        print(f"Текущий баланс BUYING_UP: {balance.get('buying_up')}")
-    else:
-        # Если значения нет. Устанавливаю 0
-        balance["buying_up"] = 0
-        print(f"Отчетов по Скупке для адреса {address_id} не найдено")
-
-    # PAWNSHOP ORM зарос
-    buying_up_reports_PAWNSHOP = (
-        CashReport.objects.filter(
-            cas_register=CashRegisterChoices.PAWNSHOP, id_address_id=address_id
-        )
-        .values("cash_register_end")
-        .annotate(last_updated=Max("updated_at"))
-        .order_by("-last_updated")
-        .first()
-    )
+    return balance
 
-    if buying_up_reports_PAWNSHOP:
-        balance["pawnshop"] = buying_up_reports_PAWNSHOP["cash_register_end"]
-        print(f"Текущий баланс PAWNSHOP: {balance.get('pawnshop')}")
-    else:
-        balance["pawnshop"] = 0
-        print(f"Отчетов по Ломбарду для адреса {address_id} не найдено")
-
-    # TECHNIQUE ORM зарос
-    buying_up_reports_TECHNIQUE = (
-        CashReport.objects.filter(
-            cas_register=CashRegisterChoices.TECHNIQUE, id_address_id=address_id
-        )
-        .values("cash_register_end")
-        .annotate(last_updated=Max("updated_at"))
-        .order_by("-last_updated")
-        .first()
+
+def open_reports(address_id, author):
+    """Открытые отчеты сотрудника на адресе (частичный индекс cash_report_open_idx)."""
+    return CashReport.objects.filter(
+        id_address=address_id,
+        author=author,
+        status=CashReportStatusChoices.OPEN,
     )
 
-    if buying_up_reports_TECHNIQUE:
-        balance["technique"] = buying_up_reports_TECHNIQUE["cash_register_end"]
-        print(f"Текущий баланс TECHNIQUE: {balance.get('technique')}")
-    else:
-        balance["technique"] = 0
-        print(f"Отчетов по Технике для адреса {address_id} не найдено")
 
-    return balance
+def fill_latest_reports(form, address_id, fields=REPORT_FORM_FIELDS):
+    """
+    Заполняет начальные значения формы последними отчетами всех касс адреса.
+
+    Отчеты загружаются одним запросом через latest_reports(). Поля формы
+    называются по шаблону "<поле>_<касса>", например introduced_pawnshop.
+    """
+    reports = latest_reports([address_id]) if address_id else {}
+
+    for register in CashRegisterChoices:
+        suffix = register.value.lower()
+        form.initial[f"cas_register_{suffix}"] = register.value
+
+        report = reports.get((address_id, register.value))
+        if report is None:
+            continue
+        for field in fields:
+            form.initial[f"{field}_{suffix}"] = getattr(report, field)
 
 
 class CustomLoginView(LoginView):
@@ -146,27 +193,19 @@ class CustomLoginView(LoginView):
         :param form: Объект формы Django, содержащий очищенные данные
         :return: True, если форма валидна, False в противном случае
         """
-        username = form.cleaned_data.get("username")
-        password = form.cleaned_data.get("password")
-
-        # Authenticate the user
-        user = authenticate(username=username, password=password)
+        # Пароль уже проверен в AuthenticationForm.clean(): повторный
+        # authenticate() хешировал бы его второй раз.
+        user = form.get_user()
+        login(self.request, user)
 
-        if user is not None:
-            login(self.request, user)
+        user_str = str(user.username)
 
-            user_str = str(user.username)
+        print(f"Вошел пользователь: {user_str}")
 
-            print(f"Вошел пользователь: {user_str}")
-
-            if user_str == "Руководитель":
-                return redirect(reverse_lazy("supervisor"))
-            else:
-                return redirect(reverse_lazy("address_selection"))
+        if user_str == "Руководитель":
+            return redirect(reverse_lazy("supervisor"))
         else:
-            # Handle invalid credentials
-            print("Неверные учетные данные")
-            return self.form_invalid(form)
+            return redirect(reverse_lazy("address_selection"))
 
 
 class AddressSelectionView(FormView):
@@ -216,9 +255,9 @@ class CashReportView(LoginRequiredMixin, FormView):
         включая выбранный адрес и автора (текущего пользователя).
         """
         initial = {}
-        selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            initial["id_address"] = Address.objects.get(id=selected_address_id)
+        address = selected_address(self.request)
+        if address:
+            initial["id_address"] = address
         initial["author"] = self.request.user
         return initial
 
@@ -231,12 +270,11 @@ class CashReportView(LoginRequiredMixin, FormView):
 
         # Адрес для формы из сессии пользователя.
         selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            form.fields["id_address"].queryset = Address.objects.filter(
-                id=selected_address_id
-            )
+        address = selected_address(self.request)
+        if address:
+            form.fields["id_address"].addresses = [address]
         else:
-            form.fields["id_address"].queryset = Address.objects.all()[:1]
+            form.fields["id_address"].addresses = address_directory.all()[:1]
 
         # Получаем актуальные балансы касс
         current_balance_ = current_balance(selected_address_id)
@@ -292,6 +330,7 @@ class CashReportView(LoginRequiredMixin, FormView):
         return reverse_lazy("report_submitted")
 
 
+@method_decorator(address_page_cache, name="get")
 class ReportSubmittedView(FormView):
     """
     Основная страница сотрудника.
@@ -314,9 +353,9 @@ class ReportSubmittedView(FormView):
         - author: текущий пользователь, который отправил форму.
         """
         initial = {}
-        selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            initial["id_address"] = Address.objects.get(id=selected_address_id)
+        address = selected_address(self.request)
+        if address:
+            initial["id_address"] = address
         initial["author"] = self.request.user
 
         return initial
@@ -329,108 +368,15 @@ class ReportSubmittedView(FormView):
 
         # Адрес для формы из сессии пользователя.
         selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            form.fields["id_address"].queryset = Address.objects.filter(
-                id=selected_address_id
-            )
+        address = selected_address(self.request)
+        if address:
+            form.fields["id_address"].addresses = [address]
         else:
-            form.fields["id_address"].queryset = Address.objects.all()[:1]
-
-        address_id = selected_address_id
-
-        # ПОЛУЧАЮ ДАННЫЕ ИЗ БД.
-        # BUYING_UP.
-        buying_up_reports_BUYING_UP = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.BUYING_UP, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
-        # PAWNSHOP.
-        buying_up_reports_PAWNSHOP = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.PAWNSHOP, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
-        # TECHNIQUE.
-        buying_up_reports_TECHNIQUE = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.TECHNIQUE, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
+            form.fields["id_address"].addresses = address_directory.all()[:1]
 
         # Устанавливаю значения для полей.
-        # Общее
         form.initial["data"] = now().strftime("%Y-%m-%d")
-        # BUYING_UP.
-        form.initial["cas_register_buying_up"] = (
-            buying_up_reports_BUYING_UP.cas_register
-        )
-        form.initial["cash_balance_beginning_buying_up"] = (
-            buying_up_reports_BUYING_UP.cash_balance_beginning
-        )
-        form.initial["introduced_buying_up"] = buying_up_reports_BUYING_UP.introduced
-        form.initial["interest_return_buying_up"] = (
-            buying_up_reports_BUYING_UP.interest_return
-        )
-        form.initial["loans_issued_buying_up"] = (
-            buying_up_reports_BUYING_UP.loans_issued
-        )
-        form.initial["used_farming_buying_up"] = (
-            buying_up_reports_BUYING_UP.used_farming
-        )
-        form.initial["boss_took_it_buying_up"] = (
-            buying_up_reports_BUYING_UP.boss_took_it
-        )
-        form.initial["cash_register_end_buying_up"] = (
-            buying_up_reports_BUYING_UP.cash_register_end
-        )
-        # PAWNSHOP.
-        form.initial["cas_register_pawnshop"] = buying_up_reports_PAWNSHOP.cas_register
-        form.initial["cash_balance_beginning_pawnshop"] = (
-            buying_up_reports_PAWNSHOP.cash_balance_beginning
-        )
-        form.initial["introduced_pawnshop"] = buying_up_reports_PAWNSHOP.introduced
-        form.initial["interest_return_pawnshop"] = (
-            buying_up_reports_PAWNSHOP.interest_return
-        )
-        form.initial["loans_issued_pawnshop"] = buying_up_reports_PAWNSHOP.loans_issued
-        form.initial["used_farming_pawnshop"] = buying_up_reports_PAWNSHOP.used_farming
-        form.initial["boss_took_it_pawnshop"] = buying_up_reports_PAWNSHOP.boss_took_it
-        form.initial["cash_register_end_pawnshop"] = (
-            buying_up_reports_PAWNSHOP.cash_register_end
-        )
-        # TECHNIQUE.
-        form.initial["cas_register_technique"] = (
-            buying_up_reports_TECHNIQUE.cas_register
-        )
-        form.initial["cash_balance_beginning_technique"] = (
-            buying_up_reports_TECHNIQUE.cash_balance_beginning
-        )
-        form.initial["introduced_technique"] = buying_up_reports_TECHNIQUE.introduced
-        form.initial["interest_return_technique"] = (
-            buying_up_reports_TECHNIQUE.interest_return
-        )
-        form.initial["loans_issued_technique"] = (
-            buying_up_reports_TECHNIQUE.loans_issued
-        )
-        form.initial["used_farming_technique"] = (
-            buying_up_reports_TECHNIQUE.used_farming
-        )
-        form.initial["boss_took_it_technique"] = (
-            buying_up_reports_TECHNIQUE.boss_took_it
-        )
-        form.initial["cash_register_end_technique"] = (
-            buying_up_reports_TECHNIQUE.cash_register_end
-        )
+        fill_latest_reports(form, selected_address_id)
 
         # ОТКЛЮЧАЮ ПОЛЯ ДЛЯ РЕДАКТИРОВАНИЯ.
         form.fields["author"].disabled = True
@@ -477,10 +423,8 @@ class ReportSubmittedView(FormView):
             submit_button = request.POST.get("submit_button")
             if submit_button == "Корректировать":
                 # Получаем текущий отчет из базы данных по трем кассам.
-                cash_report = CashReport.objects.filter(
-                    id_address=self.request.session.get("selected_address_id"),
-                    author=self.request.user,
-                    status=CashReportStatusChoices.OPEN,
+                cash_report = open_reports(
+                    self.request.session.get("selected_address_id"), self.request.user
                 )
 
                 if cash_report:
@@ -492,10 +436,8 @@ class ReportSubmittedView(FormView):
 
             elif submit_button == "Сохранить":
                 # Получаем текущий отчет из базы данных по трем кассам.
-                cash_report = CashReport.objects.filter(
-                    id_address=self.request.session.get("selected_address_id"),
-                    author=self.request.user,
-                    status=CashReportStatusChoices.OPEN,
+                cash_report = open_reports(
+                    self.request.session.get("selected_address_id"), self.request.user
                 )
 
                 if cash_report:
@@ -504,7 +446,10 @@ class ReportSubmittedView(FormView):
                     print("\nИзменяем статус на CLOSED")
                     CashReport.objects.filter(
                         id__in=cash_report.values_list("id")
-                    ).update(status=CashReportStatusChoices.CLOSED)
+                    ).update(status=CashReportStatusChoices.CLOSED, updated_at=now())
+                    address_versions.bump_on_commit(
+                        [self.request.session.get("selected_address_id")]
+                    )
 
                     return redirect(reverse_lazy("saved"))
                 else:
@@ -541,9 +486,9 @@ class CorrectedView(FormView):
         включая выбранный адрес и автора (текущего пользователя).
         """
         initial = {}
-        selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            initial["id_address"] = Address.objects.get(id=selected_address_id)
+        address = selected_address(self.request)
+        if address:
+            initial["id_address"] = address
         initial["author"] = self.request.user
 
         return initial
@@ -572,104 +517,15 @@ class CorrectedView(FormView):
 
         # Адрес для формы из сессии пользователя.
         selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            form.fields["id_address"].queryset = Address.objects.filter(
-                id=selected_address_id
-            )
+        address = selected_address(self.request)
+        if address:
+            form.fields["id_address"].addresses = [address]
         else:
-            form.fields["id_address"].queryset = Address.objects.all()[:1]
-
-        address_id = selected_address_id
-
-        # BUYING_UP ORM запрос
-        buying_up_reports_BUYING_UP = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.BUYING_UP, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
-
-        # PAWNSHOP ORM запрос
-        buying_up_reports_PAWNSHOP = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.PAWNSHOP, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
-
-        # TECHNIQUE ORM запрос
-        buying_up_reports_TECHNIQUE = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.TECHNIQUE, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
+            form.fields["id_address"].addresses = address_directory.all()[:1]
 
         # Устанавливаю значения для полей.
         form.initial["data"] = now().strftime("%Y-%m-%d")
-
-        form.initial["cas_register_buying_up"] = CashRegisterChoices.BUYING_UP
-        form.initial["cash_balance_beginning_buying_up"] = (
-            buying_up_reports_BUYING_UP.cash_balance_beginning
-        )
-        form.initial["introduced_buying_up"] = buying_up_reports_BUYING_UP.introduced
-        form.initial["interest_return_buying_up"] = (
-            buying_up_reports_BUYING_UP.interest_return
-        )
-        form.initial["loans_issued_buying_up"] = (
-            buying_up_reports_BUYING_UP.loans_issued
-        )
-        form.initial["used_farming_buying_up"] = (
-            buying_up_reports_BUYING_UP.used_farming
-        )
-        form.initial["boss_took_it_buying_up"] = (
-            buying_up_reports_BUYING_UP.boss_took_it
-        )
-        form.initial["cash_register_end_buying_up"] = (
-            buying_up_reports_BUYING_UP.cash_register_end
-        )
-
-        form.initial["cas_register_pawnshop"] = CashRegisterChoices.PAWNSHOP
-        form.initial["cash_balance_beginning_pawnshop"] = (
-            buying_up_reports_PAWNSHOP.cash_balance_beginning
-        )
-        form.initial["introduced_pawnshop"] = buying_up_reports_PAWNSHOP.introduced
-        form.initial["interest_return_pawnshop"] = (
-            buying_up_reports_PAWNSHOP.interest_return
-        )
-        form.initial["loans_issued_pawnshop"] = buying_up_reports_PAWNSHOP.loans_issued
-        form.initial["used_farming_pawnshop"] = buying_up_reports_PAWNSHOP.used_farming
-        form.initial["boss_took_it_pawnshop"] = buying_up_reports_PAWNSHOP.boss_took_it
-        form.initial["cash_register_end_pawnshop"] = (
-            buying_up_reports_PAWNSHOP.cash_register_end
-        )
-
-        form.initial["cas_register_technique"] = CashRegisterChoices.TECHNIQUE
-        form.initial["cash_balance_beginning_technique"] = (
-            buying_up_reports_TECHNIQUE.cash_balance_beginning
-        )
-        form.initial["introduced_technique"] = buying_up_reports_TECHNIQUE.introduced
-        form.initial["interest_return_technique"] = (
-            buying_up_reports_TECHNIQUE.interest_return
-        )
-        form.initial["loans_issued_technique"] = (
-            buying_up_reports_TECHNIQUE.loans_issued
-        )
-        form.initial["used_farming_technique"] = (
-            buying_up_reports_TECHNIQUE.used_farming
-        )
-        form.initial["boss_took_it_technique"] = (
-            buying_up_reports_TECHNIQUE.boss_took_it
-        )
-        form.initial["cash_register_end_technique"] = (
-            buying_up_reports_TECHNIQUE.cash_register_end
-        )
+        fill_latest_reports(form, selected_address_id)
 
         # Отключаю поля для редактирования
         form.fields["id_address"].disabled = True
@@ -695,6 +551,7 @@ class CorrectedView(FormView):
         return reverse_lazy("report_submitted")
 
 
+@method_decorator(address_page_cache, name="get")
 class SavedView(FormView):
     """
     Страница сохранения.
@@ -719,9 +576,9 @@ class SavedView(FormView):
         включая выбранный адрес и автора (текущего пользователя).
         """
         initial = {}
-        selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            initial["id_address"] = Address.objects.get(id=selected_address_id)
+        address = selected_address(self.request)
+        if address:
+            initial["id_address"] = address
         initial["author"] = self.request.user
 
         return initial
@@ -735,62 +592,15 @@ class SavedView(FormView):
 
         # Адрес для формы из сессии пользователя.
         selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            form.fields["id_address"].queryset = Address.objects.filter(
-                id=selected_address_id
-            )
+        address = selected_address(self.request)
+        if address:
+            form.fields["id_address"].addresses = [address]
         else:
-            form.fields["id_address"].queryset = Address.objects.all()[:1]
-
-        address_id = selected_address_id
-
-        # BUYING_UP ORM зарос
-        buying_up_reports_BUYING_UP = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.BUYING_UP, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
-
-        # PAWNSHOP ORM зарос
-        buying_up_reports_PAWNSHOP = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.PAWNSHOP, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
-
-        # TECHNIQUE ORM зарос
-        buying_up_reports_TECHNIQUE = (
-            CashReport.objects.filter(
-                cas_register=CashRegisterChoices.TECHNIQUE, id_address_id=address_id
-            )
-            .annotate(last_updated=Max("updated_at"))
-            .order_by("-last_updated")
-            .first()
-        )
+            form.fields["id_address"].addresses = address_directory.all()[:1]
 
         # Устанавливаю значения для полей.
         form.initial["data"] = now().strftime("%Y-%m-%d")
-
-        form.initial["cas_register_buying_up"] = CashRegisterChoices.BUYING_UP
-        form.initial["cash_register_end_buying_up"] = (
-            buying_up_reports_BUYING_UP.cash_register_end
-        )
-
-        form.initial["cas_register_pawnshop"] = CashRegisterChoices.PAWNSHOP
-        form.initial["cash_register_end_pawnshop"] = (
-            buying_up_reports_PAWNSHOP.cash_register_end
-        )
-
-        form.initial["cas_register_technique"] = CashRegisterChoices.TECHNIQUE
-        form.initial["cash_register_end_technique"] = (
-            buying_up_reports_TECHNIQUE.cash_register_end
-        )
+        fill_latest_reports(form, selected_address_id, fields=("cash_register_end",))
 
         # Отключаю поля для редактирования
         form.fields["id_address"].disabled = True
@@ -875,10 +685,11 @@ class ScheduleView(TemplateView):
         form = self.form_class(request.POST)
         if request.POST.get("action") == "Получить отчет":
             if form.is_valid():
+                address = form.cleaned_data["addresses"]
                 schedule_data = {
-                    "addresses": form.cleaned_data["addresses"].id,
-                    "year": form.cleaned_data["year"],
-                    "month": form.cleaned_data["month"],
+                    "addresses": [address.id] if address else None,
+                    "date_from": form.cleaned_data["date_from"].isoformat(),
+                    "date_to": form.cleaned_data["date_to"].isoformat(),
                 }
 
                 print("Полученные данные:", schedule_data)
@@ -887,108 +698,61 @@ class ScheduleView(TemplateView):
                 request.session["schedule_form_data"] = schedule_data
 
                 return redirect("schedule_report")
+        return self.render_to_response({"form": form})
 
 
-def format_date_expr(date_expr):
-    """Конвертирует время в формат DATE"""
-    return Func(date_expr, function="DATE", template="%(function)s(%(expressions)s)")
-
-
-def format_time_expr(date_expr):
-    """Конвертирует время в формат TAME"""
-    return Func(
-        date_expr, function="TO_CHAR", template="TO_CHAR(%(expressions)s, 'HH24:MI:SS')"
-    )
-
-
-class ScheduleReportView(TemplateView):
+@method_decorator(reports_page_cache, name="get")
+class ScheduleReportView(CsvExportMixin, TemplateView):
     """Отчет по соблюдению расписания.
 
+    Смены, расписание адреса на день недели смены, опоздания и ранние уходы
+    выбираются одним запросом (cashbox_app.reports.schedule_report_queryset),
+    закрытые месяцы читаются из итогов месяцев (cashbox_app.rollups).
+
     Attributes:
         template_name (str): Имя шаблона для отображения формы.
+        columns (list): Колонки таблицы отчета.
 
     Methods:
         get():
     """
 
     template_name = "schedule_report.html"
+    csv_filename = "schedule_report.csv"
+    columns = [
+        ("id_address__street", "Улица"),
+        ("id_address__home", "Дом"),
+        ("author__username", "Автор"),
+        ("shift_day", "Дата"),
+        ("opening_time_fact", "Пришел"),
+        ("closing_time_fact", "Ушел"),
+        ("day_of_week", "День недели"),
+        ("opening_time", "Время открытия"),
+        ("closing_time", "Время закрытия"),
+        ("late_minutes", "Опоздание, мин"),
+        ("early_minutes", "Ранний уход, мин"),
+    ]
 
     def get(self, request, *args, **kwargs):
-        if "schedule_form_data" in request.session:
-            session_data = request.session.pop("schedule_form_data")
+        # Параметры остаются в сессии, чтобы отчет можно было скачать в CSV.
+        session_data = request.session.get("schedule_form_data")
+        if session_data:
             print(f"schedule_data: {session_data}")
-            addresses = session_data["addresses"]
-            year = session_data["year"]
-            month = session_data["month"]
-
-            days_of_week = [
-                "Воскресенье",
-                "Понедельник",
-                "Вторник",
-                "Среда",
-                "Четверг",
-                "Пятница",
-                "Суббота",
-            ]
 
-            schedule_subquery = Schedule.objects.filter(
-                address_id=OuterRef("id_address"), day_of_week=F("day_of_week")
-            ).values("opening_time", "closing_time")
-
-            schedule_report = (
-                CashReport.objects.filter(
-                    updated_at__year=year,
-                    updated_at__month=month,
-                    cas_register=CashRegisterChoices.BUYING_UP,
-                    id_address=addresses,
-                )
-                .select_related("id_address")
-                .annotate(
-                    shift_date_all=F("shift_date"),
-                    updated_at_all=F("updated_at"),
-                    date=format_date_expr("shift_date"),
-                    opening_time_fact=format_time_expr("shift_date"),
-                    closing_time_fact=format_time_expr("updated_at"),
-                    day_number=ExtractWeekDay(F("shift_date")),
-                    day_of_week=Case(
-                        *[
-                            When(day_number=i, then=Value(days_of_week[i - 1]))
-                            for i in range(1, 8)
-                        ],
-                        output_field=CharField(),
-                    ),
-                )
-                .values(
-                    "id_address__street",
-                    "id_address__home",
-                    "shift_date_all",
-                    "updated_at_all",
-                    "date",
-                    "opening_time_fact",
-                    "closing_time_fact",
-                    "author__username",
-                    "day_of_week",
-                )
+            schedule_report = schedule_rows(
+                date.fromisoformat(session_data["date_from"]),
+                date.fromisoformat(session_data["date_to"]),
+                session_data["addresses"],
             )
-
-            schedule_report_with_schedule = schedule_report.annotate(
-                opening_time=Subquery(schedule_subquery.values("opening_time")[:1]),
-                closing_time=Subquery(schedule_subquery.values("closing_time")[:1]),
-            ).order_by("date")
-
-            print("\nSQL запрос:")
-            print(schedule_report_with_schedule.query)
-
-            df = pd.DataFrame(list(schedule_report_with_schedule))
-
-            print("\nРезультат в формате DataFrame:")
-            print(df)
+            days_of_week = dict(DAYS_OF_WEEK)
+            for row in schedule_report:
+                row["day_of_week"] = days_of_week.get(row["weekday"])
 
             return self.render_to_response(
                 {
-                    "schedule_report": schedule_report_with_schedule,
-                    "df": df.to_html(index=False),
-                    "days_of_week": days_of_week,
+                    "table": ReportTable(self.columns, schedule_report),
+                    "date_from": session_data["date_from"],
+                    "date_to": session_data["date_to"],
                 }
             )
         return render(request, self.template_name)
@@ -1039,142 +803,224 @@ class CountVisitsView(TemplateView):
             elif action == "Полный отчет":
                 print(f'Нажали "Полный отчет"')
                 return redirect(
-                    reverse("count_visits_full") + f"?year={month}&month={year}"
+                    reverse("count_visits_full") + f"?year={year}&month={month}"
                 )
 
         return self.render_to_response({"form": form})
 
 
-class CountVisitsBriefView(TemplateView):
+class AttendanceReportMixin(CsvExportMixin):
     """
-    Выводит пользователю краткий отчет посещения
-    сотрудниками конкретного филиала в указанный период.
+    Общая часть краткого и полного отчета посещений: разбор года и месяца
+    из GET-запроса и расчет посещаемости (cashbox_app.reports.Attendance).
+    Закрытые месяцы читаются из итогов месяцев (cashbox_app.rollups).
     """
 
-    template_name = "count_visits_brief.html"
-
-    def get_context_data(self, **kwargs):
-        """
-        Отчет показывает сколько дней отработал сотрудник
-        """
-        # Вызываем метод родительского класса для получения начального контекста
-        context = super().get_context_data(**kwargs)
-
-        # Получаем год и месяц из запроса GET
+    def get_attendance(self):
         year = self.request.GET.get("year")
         month = self.request.GET.get("month")
 
-        print(f"Получаем Год, месяц 1: {year}.{month}")
+        print(f"Получаем Год, месяц: {year}.{month}")
 
         try:
-            year_int = int(year)
-            month_int = int(month)
-
-            filtered_records = (
-                CashReport.objects.filter(
-                    updated_at__year=year_int,
-                    updated_at__month=month_int,
-                    cas_register=CashRegisterChoices.BUYING_UP,
-                )
-                .select_related("author")
-                .prefetch_related(
-                    Prefetch("author", queryset=CustomUser.objects.only("username"))
-                )
-                .values("author__username")
-                .annotate(count_author__username=Count("author"))
-                .order_by("count_author__username")
-            )
-
-            print(f"Фильтрованные записи: {filtered_records}")
-
-            # Для понятного вывода в консоль используем pandas.
-            # df = pd.DataFrame(filtered_records)
-            # df_sorted = df.sort_values("count_author__username")
-            # print("\nУпорядоченный порядок:")
-            # print(df_sorted)
-
-            # Преобразуем QuerySet в список объектов для HTML.
-            records_list = list(filtered_records)
-
-            context["records_list"] = records_list
-
-        except ValueError:
+            return monthly_attendance(int(year), int(month))
+        except (TypeError, ValueError):
             # Обрабатываем ошибку при неверном формате года или месяца.
             logger.error(f"Invalid year or month format: {year}, {month}")
             raise Http404("Неверный формат года или месяца")
 
+
+@method_decorator(reports_page_cache, name="get")
+class CountVisitsBriefView(AttendanceReportMixin, TemplateView):
+    """
+    Выводит пользователю краткий отчет посещения
+    сотрудниками филиалов в указанный месяц.
+    """
+
+    template_name = "count_visits_brief.html"
+    csv_filename = "count_visits_brief.csv"
+
+    def get_context_data(self, **kwargs):
+        """
+        Отчет показывает сколько дней отработал сотрудник, всего и на каждом адресе.
+        """
+        context = super().get_context_data(**kwargs)
+        attendance = self.get_attendance()
+        context["table"] = ReportTable(
+            attendance.brief_columns(), list(attendance.brief_rows())
+        )
         return context
 
 
-class CountVisitsFullView(TemplateView):
+@method_decorator(reports_page_cache, name="get")
+class CountVisitsFullView(AttendanceReportMixin, TemplateView):
     """
-    Выводит пользователю полный отчет посещения
-    сотрудниками конкретного филиала в указанный период.
+    Выводит пользователю полный отчет посещения: матрицу
+    сотрудник × день месяца с адресами, где сотрудник работал.
     """
 
     template_name = "count_visits_full.html"
+    csv_filename = "count_visits_full.csv"
 
     def get_context_data(self, **kwargs):
-        # Вызываем метод родительского класса для получения начального контекста
         context = super().get_context_data(**kwargs)
+        attendance = self.get_attendance()
+        context["table"] = ReportTable(
+            attendance.matrix_columns(), list(attendance.matrix_rows())
+        )
+        return context
 
-        # Получаем год и месяц из запроса GET
-        # Не понятно почему, но здесь приходится менять местами год с месяцем.
-        year = self.request.GET.get("month")
-        month = self.request.GET.get("year")
 
-        print(f"Получаем Год,месяц 2: {year}.{month}")
+class BalanceBreaksView(CsvExportMixin, TemplateView):
+    """
+    Разрывы цепочки остатков касс: остаток на начало смены не равен
+    остатку на конец предыдущей смены. Кнопка "Проверить" запускает
+    сверку отчетов, измененных после прошлой сверки.
+    """
 
-        try:
-            year_int = int(year)
-            month_int = int(month)
-
-            filtered_records = (
-                CashReport.objects.filter(
-                    updated_at__year=year_int,  # Фильтруем записи по году и месяцу
-                    updated_at__month=month_int,
-                    cas_register=CashRegisterChoices.BUYING_UP,  # Оставляем результат только одной кассы.
-                )
-                .select_related("author")
-                .prefetch_related(  # Джойним CustomUser что бы получить username
-                    Prefetch("author", queryset=CustomUser.objects.only("username"))
-                )
-                .values(  # Выводим следующие столбцы.
-                    # 'updated_at',
-                    # 'author__username'
-                    year=ExtractYear("updated_at"),
-                    month=ExtractMonth("updated_at"),
-                    day=ExtractDay("updated_at"),
-                    author__username=F("author__username"),
-                )
-                .order_by("author__username")
-            )  # Упорядочим по автору.
+    template_name = "balance_breaks.html"
+    csv_filename = "balance_breaks.csv"
+    columns = [
+        ("id_address", "Адрес"),
+        ("cas_register", "Касса"),
+        ("previous_day", "Предыдущая смена"),
+        ("expected", "Остаток на конец"),
+        ("shift_day", "Смена"),
+        ("actual", "Остаток на начало"),
+    ]
 
-            print(f"Фильтрованные записи: {filtered_records}")
+    @method_decorator(csrf_protect)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
 
-            # Для понятного вывода в консоль используем pandas.
-            # df = pd.DataFrame(filtered_records)
-            # df_sorted = df.sort_values("author__username")
-            # print("\nУпорядоченный порядок:")
-            # print(df_sorted)
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        registers = dict(CashRegisterChoices.choices)
+        rows = [
+            {
+                "id_address": address_directory.get(item["id_address"]) or item["id_address"],
+                "cas_register": registers.get(item["cas_register"]),
+                "previous_day": item["previous_day"],
+                "expected": item["expected"],
+                "shift_day": item["shift_day"],
+                "actual": item["actual"],
+            }
+            for item in BalanceBreak.objects.values(*[key for key, _ in self.columns])
+        ]
+        context["table"] = ReportTable(self.columns, rows)
+        context["last_run"] = ReconciliationRun.objects.first()
+        return context
 
-            # Преобразуем QuerySet в список объектов для HTML.
-            records_list = list(filtered_records)
+    def post(self, request, *args, **kwargs):
+        run = run_reconciliation()
+        logger.info(f"Сверка остатков: новых разрывов {run.breaks_found}")
+        return redirect("balance_breaks")
 
-            context["records_list"] = records_list
 
-        except ValueError:
-            # Обрабатываем ошибку при неверном формате года или месяца.
-            logger.error(f"Invalid year or month format: {year}, {month}")
-            raise Http404("Неверный формат года или месяца")
+class CashReportExportView(LoginRequiredMixin, TemplateView):
+    """
+    Выгрузка кассовых отчетов за период в CSV для бухгалтерии.
 
-        return context
+    Без параметров показывает форму выбора периода. С параметрами отдает
+    файл потоком (StreamingHttpResponse): отчеты читаются из БД порциями,
+    поэтому память не зависит от длины периода.
+    """
+
+    template_name = "cash_report_export.html"
+    chunk_size = 2000
 
+    def get(self, request, *args, **kwargs):
+        if not request.GET:
+            return self.render_to_response({"form": CashReportExportForm()})
+
+        form = CashReportExportForm(request.GET)
+        if not form.is_valid():
+            return self.render_to_response({"form": form})
+
+        address = form.cleaned_data["addresses"]
+        date_from = form.cleaned_data["date_from"]
+        date_to = form.cleaned_data["date_to"]
+        logger.info(f"Выгрузка кассовых отчетов: {address}, {date_from} - {date_to}")
+
+        rows = cash_report_export_rows(
+            date_from,
+            date_to,
+            [address.id] if address else None,
+            chunk_size=self.chunk_size,
+        )
+        table = ReportTable(CASH_REPORT_EXPORT_COLUMNS, rows)
+        return table.csv_response(f"cash_reports_{date_from}_{date_to}.csv")
+
+
+@method_decorator(reports_page_cache, name="get")
+class SupervisorCashReportView(CsvExportMixin, TemplateView):
+    """
+    Кассовый отчет руководителя: все кассы всех адресов за день или период.
 
-class SupervisorCashReportView(TemplateView):  # Не доделан.
-    """Отчет по кассам."""
+    Строится по итогам касс за день (DailyRegisterTotals) двумя запросами,
+    без просмотра cash_report, поэтому время не зависит от длины периода.
+    """
 
     template_name = "supervisor_cash_report.html"
+    csv_filename = "cash_report.csv"
+    columns = [
+        ("address", "Адрес"),
+        ("register", "Касса"),
+        ("cash_balance_beginning", "Остаток на начало"),
+        ("introduced", "Внесено"),
+        ("interest_return", "Проценты и возврат займов"),
+        ("loans_issued", "Выдано займов"),
+        ("used_farming", "Хоз. нужды, оплата труда"),
+        ("boss_took_it", "Выемка руководителем"),
+        ("cash_register_end", "Остаток на конец"),
+    ]
+    sum_fields = (
+        "cash_balance_beginning",
+        *FLOW_FIELDS,
+        "cash_register_end",
+    )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = CashDashboardForm(self.request.GET or None)
+        context["form"] = form
+        if self.request.GET and not form.is_valid():
+            return context
+
+        if form.is_bound:
+            date_from = form.cleaned_data["date_from"]
+            date_to = form.cleaned_data["date_to"]
+        else:
+            date_from = date_to = date.today()
+
+        registers = dict(CashRegisterChoices.choices)
+        rows = []
+        totals = {}
+        for total in register_totals(date_from, date_to):
+            address = address_directory.get(total["id_address"])
+            rows.append(
+                {
+                    **total,
+                    "address": address or total["id_address"],
+                    "register": registers.get(total["cas_register"]),
+                }
+            )
+            register_total = totals.setdefault(
+                total["cas_register"],
+                {
+                    "address": "Итого",
+                    "register": registers.get(total["cas_register"]),
+                    **{field: 0 for field in self.sum_fields},
+                },
+            )
+            for field in self.sum_fields:
+                register_total[field] += total[field] or 0
+
+        rows.sort(key=lambda row: (str(row["address"]), row["cas_register"]))
+        context["table"] = ReportTable(self.columns, [*rows, *totals.values()])
+        context["date_from"] = date_from
+        context["date_to"] = date_to
+        return context
 
 
 def extract_and_convert(key):
@@ -1209,32 +1055,33 @@ class PriceChangesView(FormView):
             for key, value in cleaned_data.items():
                 if key.startswith(('gold_', 'silver_')):
                     numeric_key = extract_and_convert(key)
+                    if value is None:
+                        logger.warning(f"Получен None значение для цены для пробы {numeric_key}, пропуск.")
+                        continue
                     try:
                         instance, created = GoldStandard.objects.get_or_create(
                             gold_standard=numeric_key,
-                            defaults={'price_rubles': None, 'shift_date': timezone.now()}
+                            defaults={'price_rubles': value, 'shift_date': timezone.now()}
                         )
                         if created:
                             logger.info(f"Создана новая запись для пробы {numeric_key}.")
                         else:
                             logger.info(f"Обновлена цена {value} для пробы {numeric_key}.")
 
-                            # Check if value is None before converting to float
-                            if value is not None:
-                                instance.price_rubles = float(value)
-                            else:
-                                logger.warning(f"Получен None значение для цены для пробы {numeric_key}, пропуск.")
-
+                            instance.price_rubles = value
                             instance.shift_date = timezone.now()
                             instance.save(update_fields=['price_rubles', 'shift_date'])
                     except GoldStandard.DoesNotExist:
                         logger.error(f"Записи не найдены для {numeric_key}, создание нового записи.")
 
+            # Все процессы перечитают цены на следующем запросе.
+            transaction.on_commit(price_table.bump)
+
         return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["tabl"] = GoldStandard.objects.all()
+        context["tabl"] = price_table.rows()
         return context
 
     def form_invalid(self, form):
@@ -1242,6 +1089,7 @@ class PriceChangesView(FormView):
         return super().form_invalid(form)
 
 
+@method_decorator(address_page_cache, name="get")
 class SecretRoomView(FormView):
     """
     Реализует логику для создания SecretRoom.
@@ -1265,9 +1113,9 @@ class SecretRoomView(FormView):
 
     def get_initial(self):
         initial = super().get_initial()
-        selected_address_id = self.request.session.get("selected_address_id")
-        if selected_address_id:
-            initial["id_address"] = Address.objects.get(id=selected_address_id)
+        address = selected_address(self.request)
+        if address:
+            initial["id_address"] = address
         initial["author"] = self.request.user
         current_date = date.today().strftime("%Y-%m-%d")
         initial["data"] = current_date
@@ -1278,10 +1126,10 @@ class SecretRoomView(FormView):
 
         selected_address_id = self.request.session.get("selected_address_id")
         if selected_address_id:
-            try:
-                address = Address.objects.get(id=selected_address_id)
+            address = selected_address(self.request)
+            if address:
                 form.instance.id_address = address
-            except ObjectDoesNotExist:
+            else:
                 # Обработка случая, если адрес не найден
                 print(f"Адрес с id {selected_address_id} не найден.")
 
@@ -1291,7 +1139,7 @@ class SecretRoomView(FormView):
     def get_context_data(self, **kwargs):
         selected_address_id = self.request.session.get("selected_address_id")
         context = super().get_context_data(**kwargs)
-        context["GoldStandard"] = GoldStandard.objects.all()
+        context["GoldStandard"] = price_table.rows()
         context["SecretRoom"] = SecretRoom.objects.filter(
             id_address=selected_address_id
         )
@@ -1302,15 +1150,136 @@ class SecretRoomView(FormView):
         return reverse_lazy("secret_room")
 
 
-class HarvestView(TemplateView):
+class HarvestView(
+    LoginRequiredMixin, UserPassesTestMixin, CsvExportMixin, TemplateView
+):
+    """
+    Сбор урожая с адресов маршрута.
+
+    POST переводит все скупки выбранных адресов в следующий статус одним
+    UPDATE и записывает манифест (cashbox_app.harvest.collect_harvest).
+    GET показывает форму, последние сборы и итоги выбранного (?manifest=id),
+    без выбранного сбора - остатки металла в филиалах.
+
+    Доступна только руководителям (is_staff); остальным - 403.
+    """
+
     template_name = "harvest.html"
+    csv_filename = "harvest.csv"
+    recent_manifests = 10
+    columns = [
+        ("address", "Адрес"),
+        ("gold_standard", "Проба"),
+        ("items", "Скупок"),
+        ("weight_clean", "Чистый вес"),
+        ("weight_fact", "Фактический вес"),
+        ("sum", "Выдано денег"),
+        ("converter585", "В 585 пробе"),
+        ("converter925", "В 925 пробе"),
+    ]
 
+    @method_decorator(csrf_protect)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
 
-class HarvestPrintViews(TemplateView):
-    template_name = "harvest_views.html"
+    def test_func(self):
+        return self.request.user.is_staff
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["SecretRoom"] = SecretRoom.objects.all()
-        print(f"context: {context}")
+        context.setdefault("form", HarvestRunForm())
+        context["manifests"] = HarvestManifest.objects.select_related("author")[
+            : self.recent_manifests
+        ]
+
+        manifest_id = self.request.GET.get("manifest", "")
+        manifest = None
+        if manifest_id.isdigit():
+            manifest = HarvestManifest.objects.filter(id=manifest_id).first()
+        if manifest is not None:
+            rows = [
+                {
+                    **line,
+                    "address": address_directory.get(line["id_address_id"])
+                    or line["id_address_id"],
+                }
+                for line in manifest.lines.values(
+                    "id_address_id", *[key for key, _ in self.columns[1:]]
+                )
+            ]
+            context["manifest"] = manifest
+            context["table"] = ReportTable(self.columns, rows)
+        else:
+            # Планирование сбора: что сейчас лежит в филиалах (MetalStock).
+            context["table"] = ReportTable(METAL_STOCK_COLUMNS, metal_stock_rows())
         return context
+
+    def post(self, request, *args, **kwargs):
+        form = HarvestRunForm(request.POST)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(form=form))
+
+        manifest = collect_harvest(
+            [address.id for address in form.cleaned_data["addresses"]],
+            from_status=form.cleaned_data["from_status"],
+            author=request.user,
+        )
+        if manifest is None:
+            form.add_error(None, "У выбранных адресов нет скупок в этом статусе.")
+            return self.render_to_response(self.get_context_data(form=form))
+        logger.info(f"Сбор урожая {manifest.id}: скупок {manifest.items}")
+        return redirect(f"{reverse('harvest')}?manifest={manifest.id}")
+
+
+class HarvestPrintViews(TemplateView):
+    """
+    Урожай: скупки с фильтром по статусу, адресу и периоду.
+
+    Страницы выводятся keyset-пагинацией по (shift_date, id), адрес и
+    сотрудник берутся без отдельных запросов на строку. Режим печати
+    (?print=all) и CSV (?format=csv) отдают все подходящие скупки потоком.
+    """
+
+    template_name = "harvest_views.html"
+    print_template_name = "harvest_print.html"
+    page_size = 100
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        form = HarvestFilterForm(request.GET or None)
+        filters = {}
+        if form.is_bound and form.is_valid():
+            address = form.cleaned_data["addresses"]
+            filters = {
+                "status": form.cleaned_data["status"],
+                "address_ids": [address.id] if address else None,
+                "date_from": form.cleaned_data["date_from"],
+                "date_to": form.cleaned_data["date_to"],
+            }
+        purchases = harvest_queryset(**filters)
+
+        if request.GET.get("print") == "all" or request.GET.get("format") == "csv":
+            table = ReportTable(
+                HARVEST_COLUMNS,
+                harvest_rows(purchases.iterator(chunk_size=self.chunk_size)),
+            )
+            if request.GET.get("format") == "csv":
+                return table.csv_response("harvest.csv")
+            return table.html_response(self.print_template_name, request=request)
+
+        rows, next_cursor = harvest_page(
+            purchases, request.GET.get("after"), self.page_size
+        )
+        query = request.GET.copy()
+        query.pop("after", None)
+        next_query = None
+        if next_cursor:
+            query["after"] = next_cursor
+            next_query = query.urlencode()
+        return self.render_to_response(
+            {
+                "form": form,
+                "table": ReportTable(HARVEST_COLUMNS, rows),
+                "next_query": next_query,
+            }
+        )
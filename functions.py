@@ -1,3 +1,9 @@
+from decimal import Decimal
+
+GOLD_STANDARDS = (750, 585, 500, 375)
+SILVER_STANDARDS = (925, 875)
+
+
 def probe_converter_gold(weight, gold_standard):
     gold_sample858 = 585
 
@@ -10,3 +16,48 @@ def probe_converter_silver(weight, gold_standard):
 
     result = weight * gold_standard / silver_sample858
     return round(result, 2)
+
+
+def probe_converter_many(weights, gold_standards):
+    """
+    Пересчитывает массив весов в 585 пробу (золото) и 925 пробу (серебро).
+
+    Вычисления идут в целых сотых долях грамма, поэтому результат совпадает
+    с probe_converter_gold/probe_converter_silver до копейки, но считается
+    одним проходом NumPy по всему массиву.
+
+    :param weights: последовательность весов (Decimal, str или число).
+    :param gold_standards: последовательность проб той же длины.
+    :return: tuple
+        Два списка одинаковой длины: вес в 585 пробе и вес в 925 пробе
+        (Decimal с двумя знаками или None, если проба другого металла).
+    """
+    # NumPy импортируется здесь, чтобы не замедлять импорт моделей.
+    import numpy as np
+
+    cents = np.array(
+        [int((Decimal(str(weight)) * 100).to_integral_value()) for weight in weights],
+        dtype=np.int64,
+    )
+    standards = np.asarray(gold_standards, dtype=np.int64)
+
+    is_gold = np.isin(standards, GOLD_STANDARDS)
+    is_silver = np.isin(standards, SILVER_STANDARDS)
+    base = np.where(is_gold, 585, 925)
+
+    # round(x, 2) для Decimal: делитель нечетный, поэтому "ровно половины"
+    # не бывает и достаточно округления к ближайшему.
+    numerator = cents * standards
+    quotient, remainder = np.divmod(np.abs(numerator), base)
+    quotient += 2 * remainder > base
+    converted = np.sign(numerator) * quotient
+
+    converter585 = [
+        Decimal(int(value)).scaleb(-2) if gold else None
+        for value, gold in zip(converted, is_gold)
+    ]
+    converter925 = [
+        Decimal(int(value)).scaleb(-2) if silver else None
+        for value, silver in zip(converted, is_silver)
+    ]
+    return converter585, converter925